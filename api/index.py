@@ -3,18 +3,40 @@
 Rentabilidad G4U - Simple P&L Dashboard
 """
 import os
+import re
 import sys
-from pathlib import Path
+import time
+import random
+import gzip
+import zlib
+import atexit
+import traceback
+import importlib.util
 from datetime import datetime, date, timedelta
+from collections import Counter
+from itertools import islice
 from urllib.parse import quote
-from functools import wraps
-from flask import Flask, jsonify, request, render_template_string, redirect, make_response
+from functools import lru_cache, partial, wraps
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, redirect, make_response, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
 import httpx
 import jwt as pyjwt
 from authlib.integrations.flask_client import OAuth
 
 # Add parent to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder/decoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # index.html is then only served gzip-compressed
+    brotli = None
 
 app = Flask(__name__)
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-production")
@@ -25,6 +47,91 @@ app.config['SESSION_COOKIE_SECURE'] = True  # HTTPS only
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'  # Required for OAuth redirects
 
+
+ERROR_TRACE_MAX_CHARS = 2048  # tail of the traceback included in debug error responses
+
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """Return any unhandled route error as a JSON 500 (HTTP errors pass through).
+
+    The traceback is logged. Responses only carry its tail in debug mode, in
+    development, or when the request asks for it with ?debug=1.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    app.logger.error("Unhandled error in %s", request.path, exc_info=e)
+    body = {"error": str(e), "type": type(e).__name__}
+    if app.debug or os.getenv("APP_ENV") == "development" or request.args.get("debug"):
+        body["trace"] = "".join(traceback.format_exception(type(e), e, e.__traceback__))[-ERROR_TRACE_MAX_CHARS:]
+    return jsonify(body), 500
+
+# ==================== JSON ====================
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify()/request.json backed by orjson.
+
+    Output matches the default provider: sorted keys, and dates/Decimals go
+    through DefaultJSONProvider.default.
+    """
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of decoding them
+        # to str in dumps() only for Flask to encode them back
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.option | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option), mimetype=self.mimetype
+        )
+
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+
+def _parse(r):
+    """Decode an httpx response body as JSON (orjson when available)."""
+    return orjson.loads(r.content) if orjson else r.json()
+
+
+def _dumpb(obj):
+    """Encode obj as JSON bytes for streamed responses (orjson when available)."""
+    return orjson.dumps(obj, default=app.json.default) if orjson else app.json.dumps(obj).encode()
+
+
+def _gzip_stream(chunks):
+    """Gzip-compress an iterable of byte chunks as it is consumed.
+
+    Each chunk is flushed on its own so the client keeps receiving data as
+    it is produced instead of when the compressor's buffer fills.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 16+15: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _conditional_jsonify(payload):
+    """jsonify() with an ETag of the body, answering 304 when the client already holds it."""
+    response = jsonify(payload)
+    response.add_etag()
+    # Per-user data: the browser may keep it, but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 # ==================== OAuth Configuration ====================
 
 oauth = OAuth(app)
@@ -52,6 +159,60 @@ def _extract_linked_or_string(record: dict, field_names: list) -> str:
             return val
     return ""
 
+
+def _present_fields(table_fields, candidates: list) -> list:
+    """Narrow candidate field names to those that exist in the table schema, keeping order.
+
+    If the schema is unknown (table_fields is None), all candidates are kept.
+    """
+    if table_fields is None:
+        return candidates
+    return [c for c in candidates if c in table_fields]
+
+
+def _first_value(record: dict, field_names: list, default=""):
+    """Return the first truthy value among field_names, like `r.get(a) or r.get(b) or default`."""
+    for name in field_names:
+        val = record.get(name)
+        if val:
+            return val
+    return default
+
+
+def _field_getter(field_names: list, default=""):
+    """Build a record -> value function equivalent to _first_value(record, field_names, default).
+
+    Built once per resolved schema; the common single-field case becomes one
+    dict lookup per row.
+    """
+    if not field_names:
+        return lambda record: default
+    if len(field_names) == 1:
+        name = field_names[0]
+        return lambda record: record.get(name) or default
+    names = tuple(field_names)
+    return lambda record: _first_value(record, names, default)
+
+
+def _formula_str(value) -> str:
+    """Quote a value as a string literal for an Airtable filterByFormula expression."""
+    return "'%s'" % str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _blank_formula(fields: list):
+    """filterByFormula matching records whose fields are all empty (or 0), or None if no fields are given."""
+    if not fields:
+        return None
+    return "AND(%s)" % ",".join("NOT({%s})" % f for f in fields)
+
+
+def _to_float(value) -> float:
+    """Convert an Airtable number/text value to float, treating blanks and junk as 0."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
 # ==================== Auth Helpers ====================
 
 def require_auth(f):
@@ -81,26 +242,23 @@ def require_auth(f):
     return decorated
 
 
-def render_login_page(error=None):
-    """Render the login page HTML."""
-    error_html = f"<div class='error'>{error}</div>" if error else ""
-    return f'''<!DOCTYPE html>
+LOGIN_PAGE_HTML = '''<!DOCTYPE html>
 <html>
 <head>
     <title>G4U - Login</title>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <style>
-        * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-        body {{
+        * { box-sizing: border-box; margin: 0; padding: 0; }
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
             display: flex;
             align-items: center;
             justify-content: center;
-        }}
-        .login-container {{
+        }
+        .login-container {
             background: white;
             border-radius: 16px;
             padding: 48px;
@@ -108,10 +266,10 @@ def render_login_page(error=None):
             text-align: center;
             max-width: 400px;
             width: 90%;
-        }}
-        .logo {{ font-size: 32px; font-weight: 700; color: #4f46e5; margin-bottom: 8px; }}
-        .subtitle {{ color: #64748b; margin-bottom: 32px; font-size: 14px; }}
-        .google-btn {{
+        }
+        .logo { font-size: 32px; font-weight: 700; color: #4f46e5; margin-bottom: 8px; }
+        .subtitle { color: #64748b; margin-bottom: 32px; font-size: 14px; }
+        .google-btn {
             display: inline-flex;
             align-items: center;
             gap: 12px;
@@ -125,15 +283,15 @@ def render_login_page(error=None):
             cursor: pointer;
             text-decoration: none;
             transition: all 0.2s;
-        }}
-        .google-btn:hover {{
+        }
+        .google-btn:hover {
             background: #f8fafc;
             border-color: #4f46e5;
             transform: translateY(-2px);
             box-shadow: 0 4px 12px rgba(79, 70, 229, 0.15);
-        }}
-        .google-btn svg {{ width: 20px; height: 20px; }}
-        .error {{
+        }
+        .google-btn svg { width: 20px; height: 20px; }
+        .error {
             background: #fef2f2;
             color: #dc2626;
             padding: 12px 16px;
@@ -141,13 +299,13 @@ def render_login_page(error=None):
             margin-bottom: 24px;
             font-size: 14px;
             border: 1px solid #fecaca;
-        }}
-        .domain-note {{
+        }
+        .domain-note {
             margin-top: 32px;
             font-size: 13px;
             color: #94a3b8;
-        }}
-        .domain-note strong {{ color: #64748b; }}
+        }
+        .domain-note strong { color: #64748b; }
     </style>
 </head>
 <body>
@@ -155,7 +313,7 @@ def render_login_page(error=None):
         <div class="logo">G4U Finance</div>
         <p class="subtitle">Dashboard de Rentabilidad</p>
 
-        {error_html}
+        <!--error-->
 
         <a href="/auth/login" class="google-btn">
             <svg viewBox="0 0 24 24"><path fill="#4285F4" d="M22.56 12.25c0-.78-.07-1.53-.2-2.25H12v4.26h5.92c-.26 1.37-1.04 2.53-2.21 3.31v2.77h3.57c2.08-1.92 3.28-4.74 3.28-8.09z"/><path fill="#34A853" d="M12 23c2.97 0 5.46-.98 7.28-2.66l-3.57-2.77c-.98.66-2.23 1.06-3.71 1.06-2.86 0-5.29-1.93-6.16-4.53H2.18v2.84C3.99 20.53 7.7 23 12 23z"/><path fill="#FBBC05" d="M5.84 14.09c-.22-.66-.35-1.36-.35-2.09s.13-1.43.35-2.09V7.07H2.18C1.43 8.55 1 10.22 1 12s.43 3.45 1.18 4.93l2.85-2.22.81-.62z"/><path fill="#EA4335" d="M12 5.38c1.62 0 3.06.56 4.21 1.64l3.15-3.15C17.45 2.09 14.97 1 12 1 7.7 1 3.99 3.47 2.18 7.07l3.66 2.84c.87-2.6 3.3-4.53 6.16-4.53z"/></svg>
@@ -169,6 +327,16 @@ def render_login_page(error=None):
 </body>
 </html>'''
 
+_LOGIN_PAGE_HEAD, _, _LOGIN_PAGE_TAIL = LOGIN_PAGE_HTML.partition("<!--error-->")
+_LOGIN_PAGE_DEFAULT = _LOGIN_PAGE_HEAD + _LOGIN_PAGE_TAIL
+
+
+def render_login_page(error=None):
+    """Render the login page HTML (static page split once around the error slot)."""
+    if not error:
+        return _LOGIN_PAGE_DEFAULT
+    return f"{_LOGIN_PAGE_HEAD}<div class='error'>{error}</div>{_LOGIN_PAGE_TAIL}"
+
 
 # ==================== Auth Routes ====================
 
@@ -256,7 +424,6 @@ def auth_callback():
         return response
 
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return render_login_page(error=f"Error de autenticacion: {str(e)}")
 
@@ -321,81 +488,251 @@ def auth_me():
     except:
         return jsonify({"authenticated": False}), 401
 
+# ==================== HTTP Client ====================
+
+# One pooled client shared by Airtable, Qonto, the AI providers and the routes
+# below, so keep-alive connections (and their TLS sessions) survive across calls
+# and requests on a warm container. Headers are passed per call. With the h2
+# package installed (httpx[http2]) concurrent calls to the same host multiplex
+# over one HTTP/2 connection. Without h2 every in-flight call holds its own
+# connection, so the cap leaves room for all the worker pools below plus the
+# request threads at once instead of making calls wait for a free connection.
+# Up to 20 idle connections are held long enough to be reused by the next
+# request instead of paying a new TLS handshake.
+_http_client = httpx.Client(
+    timeout=30,
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=40, max_keepalive_connections=20, keepalive_expiry=30),
+)
+atexit.register(_http_client.close)
+
+# Reads that hit a rate limit (429) or a briefly unavailable API (503) are
+# retried instead of failing the whole listing or sync. Writes keep their own
+# retry in _write_batches. Each wait is capped, and so is the total per read,
+# so a read retried from a request thread or pool worker still fits in the
+# request's time budget.
+HTTP_RETRY_STATUSES = (429, 503)
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BASE_DELAY = 0.5  # seconds, doubled on every attempt
+HTTP_RETRY_MAX_DELAY = 5  # seconds
+HTTP_RETRY_MAX_TOTAL_DELAY = 10  # seconds spent waiting across one read's retries
+
+
+def _retry_delay(r, attempt):
+    """Seconds to wait before retrying r: its Retry-After, else exponential backoff with jitter."""
+    retry_after = r.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        delay = int(retry_after)
+    else:
+        delay = HTTP_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, HTTP_RETRY_BASE_DELAY)
+    return min(delay, HTTP_RETRY_MAX_DELAY)
+
+
+def _get_with_retry(url, **kwargs):
+    """_http_client.get(), retrying HTTP_RETRY_STATUSES answers up to HTTP_MAX_RETRIES times.
+
+    Gives up early rather than wait more than HTTP_RETRY_MAX_TOTAL_DELAY in
+    all. Returns the last response, so callers check its status as before.
+    """
+    waited = 0
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        r = _http_client.get(url, **kwargs)
+        if r.status_code not in HTTP_RETRY_STATUSES or attempt == HTTP_MAX_RETRIES:
+            return r
+        delay = _retry_delay(r, attempt)
+        if waited + delay > HTTP_RETRY_MAX_TOTAL_DELAY:
+            return r
+        time.sleep(delay)
+        waited += delay
+
+# Worker threads for fanning out independent blocking HTTP calls (Airtable
+# tables and lookups). Sized, with the pools below, to stay well under the
+# client's connection limit.
+_io_pool = ThreadPoolExecutor(max_workers=8)
+
+# Separate threads for fetching the next Airtable page ahead of the reader. Kept
+# apart from _io_pool because iter_all itself often runs on an _io_pool worker,
+# and waiting on the same pool from inside it could deadlock.
+_prefetch_pool = ThreadPoolExecutor(max_workers=4)
+
+# ==================== Metadata Caches ====================
+
+# Airtable table schemas change on the order of days, so they are kept
+# in-process instead of re-fetched on every request. A bank account's slug never
+# changes for its IBAN, so it is kept for the life of the process.
+META_CACHE_TTL = 600  # seconds
+_meta_cache = {}       # base_id -> (tables, expires_at)
+_bank_slug_cache = {}  # (org, iban) -> slug
+
+# The dashboard loads /api/salary-allocations and /api/project-costs together,
+# so their Salary Allocations reads are shared for a short while. Writes clear it.
+SALARY_ALLOC_CACHE_TTL = 30  # seconds
+_salary_alloc_cache = {}  # (base_id, month) -> (records, expires_at)
+
+# Team Members, Projects and Categories are read on nearly every page load and
+# edited rarely; the routes that write them drop the cached copy.
+REFERENCE_CACHE_TTL = 120  # seconds
+_reference_cache = {}  # (base_id, table) -> (records, expires_at)
+
+# /api/data's table discovery and transaction field-name resolution only depend
+# on the schema, so they are redone only when get_tables() returns a new list.
+_data_tables_cache = {}  # base_id -> (tables, (table_map, table_fields, tx_keys))
+
+# Last validator and decoded body per metadata URL. Once a TTL above expires the
+# resource is revalidated, and an unchanged one comes back as a bodiless 304.
+_validator_cache = {}  # (url, credentials) -> (etag, last_modified, body)
+
+
+def _get_revalidated(url, headers):
+    """GET a JSON resource, sending If-None-Match/If-Modified-Since from the last response.
+
+    Returns the decoded body, or None on any other status than 200/304. A 304
+    returns the body decoded last time (the same object), so caches keyed on
+    it stay valid.
+    """
+    cache_key = (url, headers.get("Authorization"))
+    cached = _validator_cache.get(cache_key)
+    request_headers = dict(headers)
+    if cached:
+        if cached[0]:
+            request_headers["If-None-Match"] = cached[0]
+        if cached[1]:
+            request_headers["If-Modified-Since"] = cached[1]
+    r = _get_with_retry(url, headers=request_headers)
+    if r.status_code == 304 and cached:
+        return cached[2]
+    if r.status_code != 200:
+        return None
+    body = _parse(r)
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validator_cache[cache_key] = (etag, last_modified, body)
+    return body
+
 # ==================== Airtable Client ====================
 
+@lru_cache(maxsize=64)
+def _quote_path_segment(name):
+    """URL-encode a name as one path segment. The app uses a handful of table names, so this is memoized."""
+    return quote(name, safe='')
+
+
 class Airtable:
     def __init__(self):
         self.token = os.getenv("AIRTABLE_TOKEN", "")
         self.base_id = os.getenv("AIRTABLE_BASE_ID", "")
         self.base_url = f"https://api.airtable.com/v0/{self.base_id}"
+        # httpx adds Content-Type itself to requests sent with json=; reads don't need it
+        self.headers = {"Authorization": f"Bearer {self.token}"}
 
-    @property
-    def headers(self):
-        return {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+    def table_url(self, table):
+        """URL of a table's records endpoint (table names may contain spaces and accents)."""
+        return f"{self.base_url}/{_quote_path_segment(table)}"
 
-    def get_all(self, table, formula=None):
-        records = []
-        params = {}
+    def get_all(self, table, formula=None, fields=None, page_size=100):
+        return list(self.iter_all(table, formula, fields, page_size))
+
+    def iter_all(self, table, formula=None, fields=None, page_size=100):
+        """Yield records ({"id": ..., **fields}) page by page as Airtable returns them.
+
+        The next page is requested as soon as the current one's offset is known,
+        so it downloads while the caller works through the current records.
+
+        fields: optional list of field names to return (others are left out of
+        the payload). Every name must exist in the table or Airtable returns 422.
+        """
+        params = {"pageSize": page_size}
         if formula:
             params["filterByFormula"] = formula
+        if fields:
+            params["fields[]"] = list(fields)
 
-        offset = None
-        # URL-encode table name for special characters
-        encoded_table = quote(table, safe='')
-        while True:
-            if offset:
-                params["offset"] = offset
+        url = self.table_url(table)
+
+        def fetch(offset):
+            page_params = {**params, "offset": offset} if offset else params
+            r = _get_with_retry(url, headers=self.headers, params=page_params)
+            r.raise_for_status()
+            return _parse(r)
 
-            with httpx.Client(timeout=30) as client:
-                r = client.get(f"{self.base_url}/{encoded_table}", headers=self.headers, params=params)
-                r.raise_for_status()
-                data = r.json()
+        data = fetch(None)
+        while True:
+            offset = data.get("offset")
+            next_page = _prefetch_pool.submit(fetch, offset) if offset else None
 
             for rec in data.get("records", []):
-                records.append({"id": rec["id"], **rec.get("fields", {})})
+                yield {"id": rec["id"], **rec.get("fields", {})}
 
-            offset = data.get("offset")
-            if not offset:
+            if not next_page:
                 break
+            data = next_page.result()
+
+    def get_by_values(self, table, field, values, fields=None, chunk_size=95):
+        """Get the records whose `field` equals any of `values`.
+
+        Values are matched with OR(...) formulas of up to chunk_size terms, keeping
+        each request URL well under Airtable's length limit. Chunks are fetched
+        concurrently, paced like _write_batches to stay under Airtable's
+        per-base rate limit.
+        """
+        values = [str(v) for v in dict.fromkeys(values) if v]
+
+        def fetch(chunk):
+            terms = ",".join("{%s}=%s" % (field, _formula_str(v)) for v in chunk)
+            return self.get_all(table, formula=f"OR({terms})", fields=fields)
 
-        return records
+        futures = []
+        with ThreadPoolExecutor(max_workers=AIRTABLE_MAX_CONCURRENCY) as pool:
+            for i in range(0, len(values), chunk_size):
+                if i:
+                    time.sleep(AIRTABLE_REQUEST_INTERVAL)
+                futures.append(pool.submit(fetch, values[i:i+chunk_size]))
+        return [rec for future in futures for rec in future.result()]
 
     def create(self, table, fields):
-        encoded_table = quote(table, safe='')
-        with httpx.Client(timeout=30) as client:
-            r = client.post(f"{self.base_url}/{encoded_table}", headers=self.headers, json={"fields": fields})
-            r.raise_for_status()
-            return r.json()
+        r = _http_client.post(self.table_url(table), headers=self.headers, json={"fields": fields})
+        r.raise_for_status()
+        return _parse(r)
 
     def create_batch(self, table, records_list):
         """Create up to 10 records at once."""
-        encoded_table = quote(table, safe='')
-        with httpx.Client(timeout=30) as client:
-            payload = {"records": [{"fields": f} for f in records_list]}
-            r = client.post(f"{self.base_url}/{encoded_table}", headers=self.headers, json=payload)
-            r.raise_for_status()
-            return r.json()
+        payload = {"records": [{"fields": f} for f in records_list]}
+        r = _http_client.post(self.table_url(table), headers=self.headers, json=payload)
+        r.raise_for_status()
+        return _parse(r)
+
+    def batch_upsert(self, table, records_list, merge_on):
+        """Create or update up to 10 records at once, matching existing records on the merge_on fields."""
+        payload = {
+            "performUpsert": {"fieldsToMergeOn": list(merge_on)},
+            "records": [{"fields": f} for f in records_list],
+        }
+        r = _http_client.patch(self.table_url(table), headers=self.headers, json=payload)
+        r.raise_for_status()
+        return _parse(r)
 
     def update(self, table, record_id, fields):
-        encoded_table = quote(table, safe='')
-        with httpx.Client(timeout=30) as client:
-            r = client.patch(f"{self.base_url}/{encoded_table}/{record_id}", headers=self.headers, json={"fields": fields})
-            if r.status_code == 422:
-                # Airtable 422 usually means invalid field value (e.g., Single Select option doesn't exist)
-                error_detail = r.json() if r.headers.get('content-type', '').startswith('application/json') else r.text
-                raise Exception(f"Airtable 422: {error_detail}. Fields sent: {fields}")
-            r.raise_for_status()
-            return r.json()
+        r = _http_client.patch(f"{self.table_url(table)}/{record_id}", headers=self.headers, json={"fields": fields})
+        if r.status_code == 422:
+            # Airtable 422 usually means invalid field value (e.g., Single Select option doesn't exist)
+            error_detail = _parse(r) if r.headers.get('content-type', '').startswith('application/json') else r.text
+            raise Exception(f"Airtable 422: {error_detail}. Fields sent: {fields}")
+        r.raise_for_status()
+        return _parse(r)
+
+    def update_batch(self, table, records_list):
+        """Update up to 10 records at once; records_list holds {"id": ..., "fields": {...}} dicts."""
+        r = _http_client.patch(self.table_url(table), headers=self.headers, json={"records": records_list})
+        r.raise_for_status()
+        return _parse(r)
 
     def delete_batch(self, table, record_ids):
         """Delete up to 10 records at once."""
-        encoded_table = quote(table, safe='')
-        with httpx.Client(timeout=30) as client:
-            # Airtable expects records[] query params
-            params = "&".join([f"records[]={rid}" for rid in record_ids])
-            r = client.delete(f"{self.base_url}/{encoded_table}?{params}", headers=self.headers)
-            r.raise_for_status()
-            return r.json()
+        # Airtable expects records[] query params
+        params = "&".join([f"records[]={rid}" for rid in record_ids])
+        r = _http_client.delete(f"{self.table_url(table)}?{params}", headers=self.headers)
+        r.raise_for_status()
+        return _parse(r)
 
     def create_table(self, name, fields):
         """Create a new table in the base.
@@ -405,16 +742,16 @@ class Airtable:
                multipleRecordLinks (for linked records)
         """
         meta_url = f"https://api.airtable.com/v0/meta/bases/{self.base_id}/tables"
-        with httpx.Client(timeout=30) as client:
-            r = client.post(meta_url, headers=self.headers, json={
-                "name": name,
-                "fields": fields
-            })
-            if r.status_code == 422:
-                error_detail = r.json() if r.headers.get('content-type', '').startswith('application/json') else r.text
-                raise Exception(f"Airtable 422 creating table: {error_detail}")
-            r.raise_for_status()
-            return r.json()
+        r = _http_client.post(meta_url, headers=self.headers, json={
+            "name": name,
+            "fields": fields
+        })
+        if r.status_code == 422:
+            error_detail = _parse(r) if r.headers.get('content-type', '').startswith('application/json') else r.text
+            raise Exception(f"Airtable 422 creating table: {error_detail}")
+        r.raise_for_status()
+        _meta_cache.pop(self.base_id, None)
+        return _parse(r)
 
     def create_field(self, table_id, name, field_type, options=None):
         """Create a new field in a table.
@@ -429,475 +766,424 @@ class Airtable:
         if options:
             payload["options"] = options
 
-        with httpx.Client(timeout=30) as client:
-            r = client.post(meta_url, headers=self.headers, json=payload)
-            if r.status_code == 422:
-                error_detail = r.json() if r.headers.get('content-type', '').startswith('application/json') else r.text
-                raise Exception(f"Airtable 422 creating field: {error_detail}")
-            r.raise_for_status()
-            return r.json()
+        r = _http_client.post(meta_url, headers=self.headers, json=payload)
+        if r.status_code == 422:
+            error_detail = _parse(r) if r.headers.get('content-type', '').startswith('application/json') else r.text
+            raise Exception(f"Airtable 422 creating field: {error_detail}")
+        r.raise_for_status()
+        _meta_cache.pop(self.base_id, None)
+        return _parse(r)
+
+    def get_tables(self, refresh=False):
+        """Get the base's tables (with fields) from the metadata API, cached for META_CACHE_TTL.
+
+        refresh=True asks Airtable again (conditionally) even if the cached copy hasn't expired.
+        """
+        cached = _meta_cache.get(self.base_id)
+        if cached and cached[1] > time.time() and not refresh:
+            return cached[0]
+
+        data = _get_revalidated(f"https://api.airtable.com/v0/meta/bases/{self.base_id}/tables", self.headers)
+        if data is None:
+            return []
+        tables = data.get("tables", [])
+        _meta_cache[self.base_id] = (tables, time.time() + META_CACHE_TTL)
+        return tables
+
+    def exists(self, table):
+        """Check that a table is readable with a single one-record request."""
+        r = _http_client.get(
+            self.table_url(table),
+            headers=self.headers,
+            params={"maxRecords": 1, "pageSize": 1},
+            timeout=10
+        )
+        return r.status_code == 200
 
     def get_base_schema(self):
-        """Get the schema of all tables in the base."""
+        """Get the schema of all tables in the base, from the metadata cache when it has it."""
+        tables = self.get_tables()
+        if tables:
+            return {"tables": tables}
+        # Fetch failed: request it directly so the error is raised
         meta_url = f"https://api.airtable.com/v0/meta/bases/{self.base_id}/tables"
-        with httpx.Client(timeout=30) as client:
-            r = client.get(meta_url, headers=self.headers)
-            r.raise_for_status()
-            return r.json()
+        r = _http_client.get(meta_url, headers=self.headers)
+        r.raise_for_status()
+        return _parse(r)
+
+
+# Airtable allows 5 requests per second per base, and asks clients that hit the
+# limit (HTTP 429) to wait 30 seconds before retrying
+AIRTABLE_MAX_CONCURRENCY = 5
+AIRTABLE_REQUEST_INTERVAL = 1 / AIRTABLE_MAX_CONCURRENCY  # seconds between batch submissions
+AIRTABLE_RATE_LIMIT_BACKOFF = 30  # seconds
+AIRTABLE_RATE_LIMIT_RETRIES = 2
+
+
+def _is_rate_limited(e):
+    """True if e is an Airtable 429 Too Many Requests error."""
+    return isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429
+
+
+def _retry_rate_limited(fn, batch):
+    """Call fn(batch), retrying up to AIRTABLE_RATE_LIMIT_RETRIES times if Airtable returns 429.
+
+    Each retry waits for the response's Retry-After, or AIRTABLE_RATE_LIMIT_BACKOFF without one.
+    """
+    for _ in range(AIRTABLE_RATE_LIMIT_RETRIES):
+        try:
+            return fn(batch)
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            retry_after = e.response.headers.get("Retry-After", "")
+            time.sleep(int(retry_after) if retry_after.isdigit() else AIRTABLE_RATE_LIMIT_BACKOFF)
+    return fn(batch)
+
+
+def _write_batches(fn, batches, errors, max_errors=3):
+    """Run fn(batch) -> number of records written, for each batch, concurrently.
+
+    At most AIRTABLE_MAX_CONCURRENCY batches are in flight and new ones are
+    started no faster than Airtable's per-base rate limit. A batch rejected with
+    429 is retried after the backoff Airtable asks for (see _retry_rate_limited). Failures are appended
+    to `errors` (fn may append its own as well); once it holds max_errors no
+    further batches are started. Returns the total number of records written.
+    """
+    written = 0
+    pending = {}
+
+    def collect(futures):
+        nonlocal written
+        for future in futures:
+            pending.pop(future)
+            try:
+                written += future.result()
+            except Exception as e:
+                errors.append(str(e)[:150])
+
+    with ThreadPoolExecutor(max_workers=AIRTABLE_MAX_CONCURRENCY) as pool:
+        for i, batch in enumerate(batches):
+            collect([f for f in pending if f.done()])
+            if len(errors) >= max_errors:
+                break
+            if i:
+                time.sleep(AIRTABLE_REQUEST_INTERVAL)
+            pending[pool.submit(_retry_rate_limited, fn, batch)] = batch
+        collect(list(pending))
+    return written
+
+def _chunked(iterable, size):
+    """Yield lists of up to size items, taking them from iterable only as each list is needed."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _update_records(airtable, table, records):
+    """Apply {"id": ..., "fields": {...}} updates 10 records per request, several requests in flight.
+
+    Every batch is attempted; a failed one doesn't stop the others. Returns the
+    records that were updated.
+    """
+    updated = []
+
+    def update(batch):
+        airtable.update_batch(table, batch)
+        updated.extend(batch)
+        return len(batch)
+
+    batches = [records[i:i+10] for i in range(0, len(records), 10)]
+    _write_batches(update, batches, [], max_errors=len(batches))
+    return updated
+
+
+def _get_reference_table(airtable, table):
+    """Get all records of a reference table, cached for REFERENCE_CACHE_TTL. Treat the result as read-only."""
+    cache_key = (airtable.base_id, table)
+    cached = _reference_cache.get(cache_key)
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    records = airtable.get_all(table)
+    _reference_cache[cache_key] = (records, time.time() + REFERENCE_CACHE_TTL)
+    return records
+
+
+def _invalidate_reference_table(airtable, table):
+    """Drop the cached copy of a reference table after writing to it."""
+    _reference_cache.pop((airtable.base_id, table), None)
+
+
+# Names of tables holding transactions ("Transactions", "Movimientos",
+# "Operaciones"...), excluding the transaction allocations table
+_TRANSACTIONS_TABLE_RE = re.compile(r"^(?!.*alloc).*(?:trans|movimiento|operacion)", re.IGNORECASE)
+
+
+def _find_transactions_table(tables):
+    """The first transactions-like table in a get_tables() list, or None."""
+    return next((t for t in tables if _TRANSACTIONS_TABLE_RE.search(t.get("name", ""))), None)
+
+
+# Candidate spellings of each transaction field /api/data normalizes
+TX_FIELD_CANDIDATES = {
+    "amount": ["Amount", "amount", "Monto", "monto"],
+    "side": ["Type", "type", "Side", "side", "Tipo"],
+    "label": ["Description", "description", "Label", "label", "Name", "name"],
+    "date": ["Date", "date", "Fecha", "fecha", "settled_at"],
+    "counterparty": ["Counterparty", "counterparty", "Contraparte"],
+    "client": ["Client", "client", "Cliente"],
+    "qonto_category": ["Qonto Category", "qonto_category", "Categoria Qonto"],
+    "vat_amount": ["VAT Amount", "vat_amount", "IVA"],
+    "vat_rate": ["VAT Rate", "vat_rate", "Tipo IVA"],
+    "status": ["Status", "status"],
+    "excluded": ["is_excluded", "Is Excluded"],
+    "category": ["Category", "category", "Categoria"],
+    "project": ["Project", "project", "Proyecto"],
+}
+
+
+def _discover_data_tables(airtable):
+    """Map each /api/data purpose to its table and resolve the transaction field names.
+
+    Returns (table_map, table_fields, tx_keys), reused for as long as get_tables()
+    serves the same cached schema. Treat the result as read-only.
+    """
+    tables = airtable.get_tables()
+    cached = _data_tables_cache.get(airtable.base_id)
+    if cached and cached[0] is tables:
+        return cached[1]
+
+    table_map = {}  # maps purpose -> table name
+    table_fields = {}  # maps purpose -> field names in that table
+    # The same first match /api/sync writes to, so both use one table
+    tx_table = _find_transactions_table(tables)
+    if tx_table:
+        table_map["transactions"] = tx_table.get("name", "")
+        table_fields["transactions"] = {f.get("name") for f in tx_table.get("fields", [])}
+    for t in tables:
+        name = t.get("name", "")
+        name_lower = name.lower()
+        # Other transactions-like tables aren't matched to any purpose
+        if _TRANSACTIONS_TABLE_RE.search(name):
+            continue
+        elif "categ" in name_lower:
+            table_map["categories"] = name
+            table_fields["categories"] = {f.get("name") for f in t.get("fields", [])}
+        elif "project" in name_lower or "proyecto" in name_lower:
+            table_map["projects"] = name
+            table_fields["projects"] = {f.get("name") for f in t.get("fields", [])}
+        elif "client" in name_lower or "cliente" in name_lower:
+            table_map["clients"] = name
+            table_fields["clients"] = {f.get("name") for f in t.get("fields", [])}
+
+    # If no transactions table found, use first table
+    if "transactions" not in table_map and tables:
+        table_map["transactions"] = tables[0].get("name")
+        table_fields["transactions"] = {f.get("name") for f in tables[0].get("fields", [])}
+
+    # Resolve which of the candidate field names the transactions table actually
+    # has, once per schema, instead of probing every spelling on every row
+    tx_fields = table_fields.get("transactions")
+    tx_keys = {key: _present_fields(tx_fields, names) for key, names in TX_FIELD_CANDIDATES.items()}
+
+    result = (table_map, table_fields, tx_keys)
+    _data_tables_cache[airtable.base_id] = (tables, result)
+    return result
 
 # ==================== Qonto Client ====================
 
+# Larger pages mean fewer round trips per sync. Tenants that reject this size
+# are retried at the documented 100; ones that clamp it report meta.per_page.
+QONTO_PAGE_SIZE = 500
+QONTO_FALLBACK_PAGE_SIZE = 100
+
+# Transaction pages 2..N are fetched on their own threads, at most this many at
+# once, so a long history neither ties up _io_pool nor floods Qonto's API.
+QONTO_MAX_CONCURRENCY = 5
+_qonto_pool = ThreadPoolExecutor(max_workers=QONTO_MAX_CONCURRENCY)
+
+
 class Qonto:
     def __init__(self):
         self.org = os.getenv("QONTO_ORGANIZATION_SLUG", "")
         self.key = os.getenv("QONTO_API_KEY", "")
         self.iban = os.getenv("QONTO_IBAN", "")
+        # Optional: the account's slug, which saves looking it up by IBAN
+        self.bank_account_slug = os.getenv("QONTO_BANK_ACCOUNT_SLUG", "")
         self.base_url = "https://thirdparty.qonto.com/v2"
-
-    @property
-    def headers(self):
         # Qonto API uses format: organization_slug:secret_key
-        return {"Authorization": f"{self.org}:{self.key}"}
+        self.headers = {"Authorization": f"{self.org}:{self.key}"}
 
     def get_bank_account_id(self):
-        """Get the bank_account_id for the configured IBAN."""
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/organization", headers=self.headers)
-            if r.status_code == 200:
-                org = r.json().get("organization", {})
-                for ba in org.get("bank_accounts", []):
-                    if ba.get("iban") == self.iban:
-                        return ba.get("slug")  # bank_account_id is the slug
+        """Get the bank_account_id for the configured IBAN (QONTO_BANK_ACCOUNT_SLUG, or looked up once)."""
+        if self.bank_account_slug:
+            return self.bank_account_slug
+        cache_key = (self.org, self.iban)
+        if cache_key in _bank_slug_cache:
+            return _bank_slug_cache[cache_key]
+
+        org = self.get_organization()
+        if org is not None:
+            for ba in org.get("bank_accounts", []):
+                if ba.get("iban") == self.iban:
+                    slug = ba.get("slug")  # bank_account_id is the slug
+                    _bank_slug_cache[cache_key] = slug
+                    return slug
         return None
 
-    def get_all_transactions(self, slug):
-        """Fetch all transactions for a given bank account slug with extended data."""
-        transactions = []
-        page = 1
-
-        with httpx.Client(timeout=60) as client:
-            while True:
-                params = {"slug": slug, "status": "completed", "page": page, "per_page": 100}
-                r = client.get(f"{self.base_url}/transactions", headers=self.headers, params=params)
-
-                if r.status_code != 200:
-                    break
+    def _get_transactions_page(self, slug, page, per_page=QONTO_PAGE_SIZE):
+        """Fetch one page of completed transactions, or None on API error."""
+        params = {"slug": slug, "status": "completed", "page": page, "per_page": per_page}
+        r = _get_with_retry(f"{self.base_url}/transactions", headers=self.headers, params=params, timeout=60)
+        if r.status_code != 200:
+            return None
+        return _parse(r)
 
-                data = r.json()
-                txs = data.get("transactions", [])
+    def get_all_transactions(self, slug):
+        """Fetch all transactions for a given bank account slug with extended data.
 
+        Page 1 tells us total_pages; the remaining pages are fetched concurrently.
+        """
+        per_page = QONTO_PAGE_SIZE
+        data = self._get_transactions_page(slug, 1, per_page)
+        if data is None:
+            per_page = QONTO_FALLBACK_PAGE_SIZE
+            data = self._get_transactions_page(slug, 1, per_page)
+        if not data or not data.get("transactions"):
+            return []
+
+        transactions = list(data["transactions"])
+        meta = data.get("meta", {})
+        total_pages = meta.get("total_pages", 1)
+        # Keep the rest of the pages aligned with the size total_pages was computed for
+        per_page = meta.get("per_page") or per_page
+
+        if total_pages > 1:
+            pages = _qonto_pool.map(
+                lambda page: self._get_transactions_page(slug, page, per_page), range(2, total_pages + 1)
+            )
+            for page_data in pages:
+                txs = page_data.get("transactions", []) if page_data else []
                 if not txs:
                     break
-
                 transactions.extend(txs)
 
-                meta = data.get("meta", {})
-                total_pages = meta.get("total_pages", 1)
-                if page >= total_pages:
-                    break
-                page += 1
-
         return transactions
 
     def get_transaction_detail(self, transaction_id):
         """Fetch detailed info for a single transaction."""
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/transactions/{transaction_id}", headers=self.headers)
-            if r.status_code == 200:
-                return r.json().get("transaction", {})
+        r = _http_client.get(f"{self.base_url}/transactions/{transaction_id}", headers=self.headers)
+        if r.status_code == 200:
+            return _parse(r).get("transaction", {})
         return None
 
     def get_labels(self):
         """Fetch all labels from Qonto."""
         labels = []
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/labels", headers=self.headers)
-            if r.status_code == 200:
-                labels = r.json().get("labels", [])
+        r = _http_client.get(f"{self.base_url}/labels", headers=self.headers)
+        if r.status_code == 200:
+            labels = _parse(r).get("labels", [])
         return labels
 
     def get_memberships(self):
         """Fetch all memberships (team members) from Qonto."""
         memberships = []
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/memberships", headers=self.headers)
-            if r.status_code == 200:
-                memberships = r.json().get("memberships", [])
+        r = _http_client.get(f"{self.base_url}/memberships", headers=self.headers)
+        if r.status_code == 200:
+            memberships = _parse(r).get("memberships", [])
         return memberships
 
     def get_attachment(self, attachment_id):
         """Get attachment details including download URL."""
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/attachments/{attachment_id}", headers=self.headers)
-            if r.status_code == 200:
-                return r.json().get("attachment", {})
+        r = _http_client.get(f"{self.base_url}/attachments/{attachment_id}", headers=self.headers)
+        if r.status_code == 200:
+            return _parse(r).get("attachment", {})
         return None
 
     def get_organization(self):
         """Get organization details including bank accounts."""
-        with httpx.Client(timeout=30) as client:
-            r = client.get(f"{self.base_url}/organization", headers=self.headers)
-            if r.status_code == 200:
-                return r.json().get("organization", {})
+        data = _get_revalidated(f"{self.base_url}/organization", self.headers)
+        if data is not None:
+            return data.get("organization", {})
         return None
 
-# ==================== HTML Template ====================
-
-HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Rentabilidad G4U</title>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        * { box-sizing: border-box; margin: 0; padding: 0; }
-        body { font-family: system-ui, sans-serif; background: #f0f2f5; color: #333; }
-        .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
-        h1 { margin-bottom: 10px; }
-        .subtitle { color: #666; margin-bottom: 20px; }
-
-        .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin: 20px 0; }
-        .card { background: white; border-radius: 12px; padding: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
-        .card h3 { font-size: 14px; color: #666; margin-bottom: 8px; }
-        .card .value { font-size: 28px; font-weight: 600; }
-        .card .value.positive { color: #22c55e; }
-        .card .value.negative { color: #ef4444; }
-
-        .section { background: white; border-radius: 12px; padding: 20px; margin: 20px 0; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
-        .section h2 { margin-bottom: 15px; font-size: 18px; }
-
-        table { width: 100vw; max-width: 100vw; border-collapse: collapse; }
-        th, td { padding: 12px; text-align: left; border-bottom: 1px solid #eee; }
-        th { background: #f8f9fa; font-weight: 600; font-size: 13px; color: #666; }
-
-        .amount { font-family: monospace; font-weight: 500; }
-        .amount.credit { color: #22c55e; }
-        .amount.debit { color: #ef4444; }
-
-        .btn { background: #3b82f6; color: white; border: none; padding: 10px 20px; border-radius: 8px; cursor: pointer; font-size: 14px; }
-        .btn:hover { background: #2563eb; }
-        .btn.success { background: #22c55e; }
-        .btn.sm { padding: 6px 12px; font-size: 12px; }
-
-        select { padding: 8px 12px; border: 1px solid #ddd; border-radius: 6px; font-size: 14px; }
-
-        .status { display: inline-block; padding: 4px 8px; border-radius: 4px; font-size: 12px; }
-        .status.ok { background: #dcfce7; color: #166534; }
-        .status.error { background: #fee2e2; color: #991b1b; }
-
-        .loading { text-align: center; padding: 40px; color: #666; }
-        .tabs { display: flex; gap: 10px; margin-bottom: 20px; }
-        .tab { padding: 10px 20px; background: #e5e7eb; border-radius: 8px; cursor: pointer; }
-        .tab.active { background: #3b82f6; color: white; }
-
-        .hidden { display: none; }
-        .flex { display: flex; gap: 10px; align-items: center; }
-        .ml-auto { margin-left: auto; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Rentabilidad G4U</h1>
-        <p class="subtitle">Dashboard financiero conectado a Qonto</p>
-
-        <div id="status-bar" class="flex" style="margin-bottom: 20px;">
-            <span id="env-status">Verificando configuracion...</span>
-            <div class="ml-auto">
-                <button class="btn" onclick="syncQonto()">Sincronizar Qonto</button>
-            </div>
-        </div>
-
-        <!-- KPIs -->
-        <div class="grid" id="kpis">
-            <div class="card"><h3>Ingresos</h3><div class="value positive" id="total-income">-</div></div>
-            <div class="card"><h3>Gastos</h3><div class="value negative" id="total-expenses">-</div></div>
-            <div class="card"><h3>Resultado Neto</h3><div class="value" id="net-result">-</div></div>
-            <div class="card"><h3>Margen</h3><div class="value" id="margin">-</div></div>
-        </div>
-
-        <!-- Tabs -->
-        <div class="tabs">
-            <div class="tab active" onclick="showTab('transactions', event)">Transacciones</div>
-            <div class="tab" onclick="showTab('categories', event)">Por Categoria</div>
-            <div class="tab" onclick="showTab('projects', event)">Por Proyecto</div>
-        </div>
-
-        <!-- Transactions Tab -->
-        <div id="tab-transactions" class="section">
-            <div class="flex" style="margin-bottom: 15px;">
-                <h2>Transacciones</h2>
-                <div class="ml-auto flex">
-                    <select id="filter-side" onchange="loadTransactions()">
-                        <option value="">Todos</option>
-                        <option value="credit">Ingresos</option>
-                        <option value="debit">Gastos</option>
-                    </select>
-                </div>
-            </div>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Fecha</th>
-                        <th>Descripcion</th>
-                        <th>Monto</th>
-                        <th>Categoria</th>
-                        <th>Proyecto</th>
-                    </tr>
-                </thead>
-                <tbody id="transactions-body">
-                    <tr><td colspan="5" class="loading">Cargando...</td></tr>
-                </tbody>
-            </table>
-        </div>
-
-        <!-- Categories Tab -->
-        <div id="tab-categories" class="section hidden">
-            <h2>Desglose por Categoria</h2>
-            <table>
-                <thead>
-                    <tr><th>Categoria</th><th>Ingresos</th><th>Gastos</th><th>Neto</th></tr>
-                </thead>
-                <tbody id="categories-body">
-                    <tr><td colspan="4" class="loading">Cargando...</td></tr>
-                </tbody>
-            </table>
-        </div>
-
-        <!-- Projects Tab -->
-        <div id="tab-projects" class="section hidden">
-            <h2>Rentabilidad por Proyecto</h2>
-            <table>
-                <thead>
-                    <tr><th>Proyecto</th><th>Ingresos</th><th>Costos</th><th>Margen</th><th>ROI</th></tr>
-                </thead>
-                <tbody id="projects-body">
-                    <tr><td colspan="5" class="loading">Cargando...</td></tr>
-                </tbody>
-            </table>
-        </div>
-    </div>
-
-    <script>
-        /* v5 - clean */
-        console.log("G4U Script loading v5...");
-        var transactions = [];
-        var categories = [];
-        var projects = [];
-
-        function fmt(n) {
-            return new Intl.NumberFormat("es-ES", { style: "currency", currency: "EUR" }).format(n || 0);
-        }
-
-        function showTab(name, evt) {
-            console.log("showTab:", name);
-            var tabs = document.querySelectorAll(".tab");
-            for (var i = 0; i < tabs.length; i++) { tabs[i].classList.remove("active"); }
-            var panels = document.querySelectorAll("[id^=tab-]");
-            for (var i = 0; i < panels.length; i++) { panels[i].classList.add("hidden"); }
-            if (evt && evt.target) { evt.target.classList.add("active"); }
-            document.getElementById("tab-" + name).classList.remove("hidden");
-        }
-
-        function checkEnv() {
-            fetch("/api/status")
-                .then(function(r) { return r.json(); })
-                .then(function(data) {
-                    var ok = data.airtable && data.qonto;
-                    document.getElementById("env-status").innerHTML = ok
-                        ? "<span class='status ok'>Sistema configurado</span>"
-                        : "<span class='status error'>Faltan variables</span>";
-                })
-                .catch(function(e) {
-                    document.getElementById("env-status").innerHTML = "<span class='status error'>Error: " + e.message + "</span>";
-                });
-        }
-
-        function loadData() {
-            fetch("/api/data")
-                .then(function(r) { return r.json(); })
-                .then(function(data) {
-                    if (data.error) {
-                        document.getElementById("transactions-body").innerHTML = "<tr><td colspan='5' style='color:red'>" + data.error + "</td></tr>";
-                        return;
-                    }
-                    transactions = data.transactions || [];
-                    categories = data.categories || [];
-                    projects = data.projects || [];
-                    updateKPIs();
-                    loadTransactions();
-                    loadCategories();
-                    loadProjects();
-                })
-                .catch(function(e) {
-                    console.error(e);
-                    document.getElementById("transactions-body").innerHTML = "<tr><td colspan='5' style='color:red'>Error: " + e.message + "</td></tr>";
-                });
-        }
-
-        function updateKPIs() {
-            var income = 0, expenses = 0;
-            for (var i = 0; i < transactions.length; i++) {
-                var t = transactions[i];
-                var amt = parseFloat(t.amount) || 0;
-                if (t.side === "credit") income += amt;
-                else expenses += amt;
-            }
-            var net = income - expenses;
-            var margin = income > 0 ? (net / income * 100) : 0;
-            document.getElementById("total-income").textContent = fmt(income);
-            document.getElementById("total-expenses").textContent = fmt(expenses);
-            document.getElementById("net-result").textContent = fmt(net);
-            document.getElementById("net-result").className = "value " + (net >= 0 ? "positive" : "negative");
-            document.getElementById("margin").textContent = margin.toFixed(1) + " pct";
-        }
+# ==================== Routes ====================
 
-        function loadTransactions() {
-            var filter = document.getElementById("filter-side").value;
-            var filtered = [];
-            for (var i = 0; i < transactions.length; i++) {
-                if (!filter || transactions[i].side === filter) {
-                    filtered.push(transactions[i]);
-                }
-            }
-            var html = "";
-            var max = Math.min(filtered.length, 100);
-            for (var i = 0; i < max; i++) {
-                var t = filtered[i];
-                var dateStr = t.settled_at ? t.settled_at.split("T")[0] : "-";
-                var name = t.counterparty_name || t.label || "-";
-                var sign = t.side === "credit" ? "+" : "-";
-                var cls = t.side === "credit" ? "credit" : "debit";
-                html += "<tr>";
-                html += "<td>" + dateStr + "</td>";
-                html += "<td>" + name + "</td>";
-                html += "<td class='amount " + cls + "'>" + sign + fmt(t.amount) + "</td>";
-                html += "<td>" + (t.category || "-") + "</td>";
-                html += "<td><select onchange='assignProject(this.dataset.id, this.value)' data-id='" + t.id + "' style='width:120px'>";
-                html += "<option value=''>Sin proyecto</option>";
-                for (var j = 0; j < projects.length; j++) {
-                    var p = projects[j];
-                    var sel = t.project_id === p.id ? " selected" : "";
-                    html += "<option value='" + p.id + "'" + sel + ">" + p.name + "</option>";
-                }
-                html += "</select></td></tr>";
-            }
-            document.getElementById("transactions-body").innerHTML = html || "<tr><td colspan='5'>No hay transacciones</td></tr>";
-        }
+STREAM_CHUNK_ROWS = 100  # transactions per chunk written to streamed /api/data responses
+# Fields of each /api/data transaction, in order. With ?layout=columns every
+# transaction is sent as a list of values in this order instead of an object
+# repeating the field names.
+TRANSACTION_COLUMNS = (
+    "id", "amount", "side", "label", "counterparty_name", "settled_at", "category", "project_id",
+    "client_id", "qonto_category", "vat_amount", "vat_rate", "is_excluded", "status",
+)
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+INDEX_MAX_AGE = 3600  # seconds the browser may reuse index.html without asking
 
-        function loadCategories() {
-            var byCategory = {};
-            for (var i = 0; i < transactions.length; i++) {
-                var t = transactions[i];
-                var cat = t.category || "Sin categoria";
-                if (!byCategory[cat]) byCategory[cat] = { income: 0, expense: 0 };
-                var amt = parseFloat(t.amount) || 0;
-                if (t.side === "credit") byCategory[cat].income += amt;
-                else byCategory[cat].expense += amt;
-            }
-            var html = "";
-            for (var cat in byCategory) {
-                var v = byCategory[cat];
-                var netCls = (v.income - v.expense) >= 0 ? "credit" : "debit";
-                html += "<tr>";
-                html += "<td>" + cat + "</td>";
-                html += "<td class='amount credit'>" + fmt(v.income) + "</td>";
-                html += "<td class='amount debit'>" + fmt(v.expense) + "</td>";
-                html += "<td class='amount " + netCls + "'>" + fmt(v.income - v.expense) + "</td>";
-                html += "</tr>";
-            }
-            document.getElementById("categories-body").innerHTML = html || "<tr><td colspan='4'>No hay datos</td></tr>";
-        }
 
-        function loadProjects() {
-            var byProject = {};
-            for (var i = 0; i < projects.length; i++) {
-                var p = projects[i];
-                byProject[p.id] = { name: p.name, income: 0, expense: 0 };
-            }
-            for (var i = 0; i < transactions.length; i++) {
-                var t = transactions[i];
-                if (t.project_id && byProject[t.project_id]) {
-                    var amt = parseFloat(t.amount) || 0;
-                    if (t.side === "credit") byProject[t.project_id].income += amt;
-                    else byProject[t.project_id].expense += amt;
-                }
-            }
-            var html = "";
-            for (var id in byProject) {
-                var p = byProject[id];
-                var margin = p.income > 0 ? ((p.income - p.expense) / p.income * 100) : 0;
-                var roi = p.expense > 0 ? ((p.income - p.expense) / p.expense * 100) : 0;
-                html += "<tr>";
-                html += "<td>" + p.name + "</td>";
-                html += "<td class='amount credit'>" + fmt(p.income) + "</td>";
-                html += "<td class='amount debit'>" + fmt(p.expense) + "</td>";
-                html += "<td>" + margin.toFixed(1) + " pct</td>";
-                html += "<td>" + roi.toFixed(1) + " pct</td>";
-                html += "</tr>";
-            }
-            document.getElementById("projects-body").innerHTML = html || "<tr><td colspan='5'>No hay proyectos</td></tr>";
-        }
+_index_compressed_cache = {}  # (path, encoding) -> (mtime, compressed bytes, etag)
 
-        function assignProject(txId, projectId) {
-            fetch("/api/assign-project", {
-                method: "POST",
-                headers: {"Content-Type": "application/json"},
-                body: JSON.stringify({ transaction_id: txId, project_id: projectId })
-            }).then(function() {
-                for (var i = 0; i < transactions.length; i++) {
-                    if (transactions[i].id === txId) {
-                        transactions[i].project_id = projectId;
-                        break;
-                    }
-                }
-                loadProjects();
-            }).catch(function(e) {
-                alert("Error al asignar proyecto");
-            });
-        }
 
-        function syncQonto() {
-            console.log("syncQonto called");
-            if (!confirm("Sincronizar transacciones desde Qonto?")) return;
-            fetch("/api/sync", { method: "POST" })
-                .then(function(r) { return r.json(); })
-                .then(function(data) {
-                    console.log("Sync response:", data);
-                    var msg = "Qonto: " + (data.qonto_count || 0) + " transacciones\n";
-                    msg += "Sincronizadas: " + (data.synced || 0) + "\n";
-                    msg += "Saltadas: " + (data.skipped || 0) + "\n";
-                    msg += "En Airtable: " + (data.existing_count || 0) + "\n";
-                    if (data.error) msg += "\nError: " + data.error;
-                    if (data.errors && data.errors.length > 0) msg += "\nErrores: " + data.errors.join(", ");
-                    alert(msg);
-                    loadData();
-                })
-                .catch(function(e) {
-                    alert("Error de conexion: " + e.message);
-                });
-        }
+def _index_compressed(encoding):
+    """Return index.html compressed with encoding ('br' or 'gzip') and its ETag.
 
-        console.log("G4U initializing...");
-        checkEnv();
-        loadData();
-        console.log("G4U init complete");
-    </script>
-</body>
-</html>
-"""
+    Compressed once per file change, so the cost is paid by the first request
+    after a deploy, not by every page load.
+    """
+    path = os.path.join(STATIC_DIR, 'index.html')
+    mtime = os.path.getmtime(path)
+    cached = _index_compressed_cache.get((path, encoding))
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    with open(path, 'rb') as f:
+        data = f.read()
+    if encoding == 'br':
+        # Quality 11 saves another ~8% but takes ~20x longer, on a cold start
+        body = brotli.compress(data, mode=brotli.MODE_TEXT, quality=9)
+    else:
+        body = gzip.compress(data, compresslevel=9, mtime=0)
+    etag = f"{encoding}-{int(mtime)}-{len(body)}"
+    _index_compressed_cache[(path, encoding)] = (mtime, body, etag)
+    return body, etag
+
+
+def _send_index():
+    """Send static/index.html with browser caching, brotli- or gzip-compressed when the client accepts it."""
+    if brotli and 'br' in request.accept_encodings:
+        encoding = 'br'
+    elif 'gzip' in request.accept_encodings:
+        encoding = 'gzip'
+    else:
+        encoding = None
+
+    if encoding:
+        body, etag = _index_compressed(encoding)
+        response = Response(body, mimetype='text/html')
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        response.cache_control.max_age = INDEX_MAX_AGE
+        response = response.make_conditional(request)
+    else:
+        # ETag/304 revalidation comes from send_file
+        response = send_from_directory(STATIC_DIR, 'index.html', max_age=INDEX_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+    # The page sits behind the auth cookie, so keep it out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
-# ==================== Routes ====================
 
 @app.route("/")
 def index():
     """Serve main app - requires authentication."""
-    from flask import send_from_directory
-
     # Skip auth in development mode
     if os.getenv("APP_ENV") == "development" and os.getenv("SKIP_AUTH", "").lower() == "true":
-        static_dir = os.path.join(os.path.dirname(__file__), 'static')
-        return send_from_directory(static_dir, 'index.html')
+        return _send_index()
 
     # Check authentication
     token = request.cookies.get('auth_token')
@@ -913,8 +1199,7 @@ def index():
     except:
         return redirect('/auth/login-page')
 
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    return send_from_directory(static_dir, 'index.html')
+    return _send_index()
 
 @app.route("/api/ping")
 def api_ping():
@@ -931,101 +1216,122 @@ def api_status():
 @app.route("/api/data")
 @require_auth
 def api_data():
-    try:
-        airtable = Airtable()
+    airtable = Airtable()
 
-        transactions = []
-        categories = []
-        projects = []
-        clients = []
+    # Step 1: Discover tables from Airtable metadata API
+    table_map, table_fields, tx_keys = _discover_data_tables(airtable)
 
-        # Step 1: Discover tables from Airtable metadata API
-        table_map = {}  # maps purpose -> table name
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
-            )
-            if r.status_code == 200:
-                tables = r.json().get("tables", [])
-                for t in tables:
-                    name = t.get("name", "")
-                    name_lower = name.lower()
-                    # Exclude "allocation" tables from being matched as transactions
-                    if ("trans" in name_lower or "movimiento" in name_lower) and "alloc" not in name_lower:
-                        table_map["transactions"] = name
-                    elif "categ" in name_lower:
-                        table_map["categories"] = name
-                    elif "project" in name_lower or "proyecto" in name_lower:
-                        table_map["projects"] = name
-                    elif "client" in name_lower or "cliente" in name_lower:
-                        table_map["clients"] = name
-
-                # If no transactions table found, use first table
-                if "transactions" not in table_map and tables:
-                    table_map["transactions"] = tables[0].get("name")
-
-        # Step 2: Load data from discovered tables
-        if "transactions" in table_map:
+    # Only request the fields each table's normalization below actually reads
+    projections = {
+        "categories": ["Name", "name", "Type", "type"],
+        "projects": ["Name", "name", "Nombre", "Client", "client", "Status", "status"],
+        "clients": ["Name", "name", "Contact", "contact", "Email", "email", "Phone", "phone"],
+    }
+
+    # Step 2: Load data from discovered tables. The smaller tables are fetched in
+    # the background while transactions are streamed and normalized page by page.
+    # ?tables=transactions,clients,... limits which tables are loaded; the page's
+    # first load gets projects, categories and clients from their own endpoints
+    wanted = {t for t in request.args.get("tables", "").split(",") if t} or set(table_map)
+    columnar = request.args.get("layout") == "columns"
+
+    fetches = {
+        purpose: _io_pool.submit(
+            airtable.get_all, name, fields=_present_fields(table_fields.get(purpose), projections[purpose])
+        )
+        for purpose, name in table_map.items() if purpose != "transactions" and purpose in wanted
+    }
+
+    def generate():
+        # Transactions go first so the first Airtable page reaches the client
+        # while the smaller tables are still loading in the pool
+        transactions_error = None
+        sent = 0
+        if columnar:
+            yield b'{"transaction_columns":' + _dumpb(TRANSACTION_COLUMNS) + b',"transactions":['
+        else:
+            yield b'{"transactions":['
+        if "transactions" in table_map and "transactions" in wanted:
             try:
-                raw_records = airtable.get_all(table_map["transactions"])
-                # Normalize field names for frontend
-                for r in raw_records:
-                    # Try to find amount
-                    amt = r.get("Amount") or r.get("amount") or r.get("Monto") or r.get("monto") or 0
-                    # Try to find side/type and map Income/Expense to credit/debit
-                    raw_side = r.get("Type") or r.get("type") or r.get("Side") or r.get("side") or r.get("Tipo") or ""
-                    if raw_side == "Income":
-                        side = "credit"
-                    elif raw_side == "Expense":
-                        side = "debit"
-                    else:
-                        side = raw_side
-                    # Try to find label/description
-                    label = r.get("Description") or r.get("description") or r.get("Label") or r.get("label") or r.get("Name") or r.get("name") or ""
-                    # Try to find date
-                    date = r.get("Date") or r.get("date") or r.get("Fecha") or r.get("fecha") or r.get("settled_at") or ""
-                    # Try to find counterparty
-                    counterparty = r.get("Counterparty") or r.get("counterparty") or r.get("Contraparte") or label
+                tx_projection = [name for keys in tx_keys.values() for name in keys]
+
+                # Specialize each field lookup for the keys this schema actually has
+                get_amount = _field_getter(tx_keys["amount"], 0)
+                get_side = _field_getter(tx_keys["side"])
+                get_label = _field_getter(tx_keys["label"])
+                get_date = _field_getter(tx_keys["date"])
+                get_counterparty = _field_getter(tx_keys["counterparty"], None)
+                get_client = _field_getter(tx_keys["client"], [])
+                get_qonto_category = _field_getter(tx_keys["qonto_category"])
+                get_vat_amount = _field_getter(tx_keys["vat_amount"], 0)
+                get_vat_rate = _field_getter(tx_keys["vat_rate"], 0)
+                get_status = _field_getter(tx_keys["status"], "completed")
+                get_excluded = _field_getter(tx_keys["excluded"], False)
+                get_category = _field_getter(tx_keys["category"])
+                get_project = _field_getter(tx_keys["project"])
+                # Map Income/Expense to credit/debit
+                side_names = {"Income": "credit", "Expense": "debit"}
+
+                # Normalize field names for frontend, sending rows in chunks as
+                # Airtable pages arrive instead of building the whole list first
+                chunk = []
+                for r in airtable.iter_all(table_map["transactions"], fields=tx_projection):
+                    amt = get_amount(r)
+                    raw_side = get_side(r)
+                    side = side_names.get(raw_side, raw_side) if isinstance(raw_side, str) else raw_side
+                    label = get_label(r)
+                    counterparty = get_counterparty(r) or label
 
                     # Client is a linked record - returns array of record IDs
-                    client_field = r.get("Client") or r.get("client") or r.get("Cliente") or []
+                    client_field = get_client(r)
                     client_id = client_field[0] if isinstance(client_field, list) and client_field else ""
 
-                    # Qonto Category (stored as text)
-                    qonto_category = r.get("Qonto Category") or r.get("qonto_category") or r.get("Categoria Qonto") or ""
-
-                    # VAT fields
-                    vat_amount = r.get("VAT Amount") or r.get("vat_amount") or r.get("IVA") or 0
-                    vat_rate = r.get("VAT Rate") or r.get("vat_rate") or r.get("Tipo IVA") or 0
-
-                    # Status field (for detecting refunds/reversals)
-                    status = r.get("Status") or r.get("status") or "completed"
-
-                    transactions.append({
-                        "id": r.get("id"),
-                        "amount": float(amt) if amt else 0,
-                        "side": side.lower() if isinstance(side, str) else "debit",
-                        "label": label,
-                        "counterparty_name": counterparty,
-                        "settled_at": date,
-                        # Category may be a linked record (array of IDs) or a string
-                        "category": _extract_linked_or_string(r, ["Category", "category", "Categoria"]),
-                        # Project may be a linked record (array of IDs) or a string
-                        "project_id": _extract_linked_or_string(r, ["Project", "project", "Proyecto"]),
-                        "client_id": client_id,
-                        "qonto_category": qonto_category,
-                        "vat_amount": float(vat_amount) if vat_amount else 0,
-                        "vat_rate": float(vat_rate) if vat_rate else 0,
-                        "is_excluded": bool(r.get("is_excluded") or r.get("Is Excluded") or False),
-                        "status": status
-                    })
+                    # Category and Project may be linked records (array of IDs) or strings
+                    category = get_category(r)
+                    project = get_project(r)
+
+                    vat_amount = get_vat_amount(r)
+                    vat_rate = get_vat_rate(r)
+
+                    # Values in TRANSACTION_COLUMNS order
+                    row = [
+                        r.get("id"),
+                        float(amt) if amt else 0,
+                        side.lower() if isinstance(side, str) else "debit",
+                        label,
+                        counterparty,
+                        get_date(r),
+                        category[0] if isinstance(category, list) else category,
+                        project[0] if isinstance(project, list) else project,
+                        client_id,
+                        # Qonto Category (stored as text)
+                        get_qonto_category(r),
+                        float(vat_amount) if vat_amount else 0,
+                        float(vat_rate) if vat_rate else 0,
+                        bool(get_excluded(r)),
+                        # Status field (for detecting refunds/reversals)
+                        get_status(r),
+                    ]
+                    chunk.append((b"," if sent or chunk else b"") + _dumpb(
+                        row if columnar else dict(zip(TRANSACTION_COLUMNS, row))
+                    ))
+                    if len(chunk) >= STREAM_CHUNK_ROWS:
+                        yield b"".join(chunk)
+                        sent += len(chunk)
+                        chunk = []
+                yield b"".join(chunk)
             except Exception as e:
-                pass
+                # The rows already sent can't be taken back, so flag the listing as
+                # incomplete and let the client discard it
+                transactions_error = str(e)[:200]
+        yield b"]"
 
-        if "categories" in table_map:
+        categories = []
+        projects = []
+        clients = []
+        if "categories" in fetches:
             try:
-                raw_categories = airtable.get_all(table_map["categories"])
+                raw_categories = fetches["categories"].result()
                 for c in raw_categories:
                     categories.append({
                         "id": c.get("id"),
@@ -1035,9 +1341,9 @@ def api_data():
             except:
                 pass
 
-        if "projects" in table_map:
+        if "projects" in fetches:
             try:
-                raw_projects = airtable.get_all(table_map["projects"])
+                raw_projects = fetches["projects"].result()
                 for p in raw_projects:
                     # Client is a text field (name)
                     client_val = p.get("Client") or p.get("client") or ""
@@ -1050,9 +1356,9 @@ def api_data():
             except:
                 pass
 
-        if "clients" in table_map:
+        if "clients" in fetches:
             try:
-                raw_clients = airtable.get_all(table_map["clients"])
+                raw_clients = fetches["clients"].result()
                 for c in raw_clients:
                     clients.append({
                         "id": c.get("id"),
@@ -1064,387 +1370,447 @@ def api_data():
             except:
                 pass
 
-        return jsonify({
-            "transactions": transactions,
-            "categories": categories,
-            "projects": projects,
-            "clients": clients,
-            "tables_found": table_map
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        # The rest of the document goes out as one write (one compressed flush)
+        tail = [
+            b',"categories":', _dumpb(categories),
+            b',"projects":', _dumpb(projects),
+            b',"clients":', _dumpb(clients),
+            b',"tables_found":', _dumpb(table_map),
+        ]
+        if transactions_error:
+            tail += [b',"transactions_error":', _dumpb(transactions_error)]
+        tail.append(b"}")
+        yield b"".join(tail)
+
+    # The transaction listing is highly repetitive JSON; compress it on the way out
+    if 'gzip' in request.accept_encodings:
+        response = Response(stream_with_context(_gzip_stream(generate())), mimetype="application/json")
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(stream_with_context(generate()), mimetype="application/json")
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route("/api/qonto/transaction-fields")
 def api_qonto_transaction_fields():
     """Get ALL fields that Qonto returns for transactions."""
-    try:
-        qonto = Qonto()
-        slug = qonto.get_bank_account_id()
-
-        with httpx.Client(timeout=30) as client:
-            # Get one transaction to see all fields
-            r = client.get(
-                f"{qonto.base_url}/transactions",
-                headers=qonto.headers,
-                params={"slug": slug, "status": "completed", "per_page": 5}
-            )
-            if r.status_code == 200:
-                txs = r.json().get("transactions", [])
-                if txs:
-                    # Get all unique keys across transactions
-                    all_keys = set()
-                    for tx in txs:
-                        all_keys.update(tx.keys())
-
-                    return jsonify({
-                        "all_fields_available": sorted(list(all_keys)),
-                        "sample_transactions": txs
-                    })
+    qonto = Qonto()
+    slug = qonto.get_bank_account_id()
+
+    # Get one transaction to see all fields
+    r = _http_client.get(
+        f"{qonto.base_url}/transactions",
+        headers=qonto.headers,
+        params={"slug": slug, "status": "completed", "per_page": 5}
+    )
+    if r.status_code == 200:
+        txs = _parse(r).get("transactions", [])
+        if txs:
+            # Get all unique keys across transactions
+            all_keys = set()
+            for tx in txs:
+                all_keys.update(tx.keys())
 
-            return jsonify({"error": "Could not fetch transactions", "status": r.status_code})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+            return jsonify({
+                "all_fields_available": sorted(list(all_keys)),
+                "sample_transactions": txs
+            })
+
+    return jsonify({"error": "Could not fetch transactions", "status": r.status_code})
 
 @app.route("/api/qonto/debug-vat")
 def api_debug_vat():
     """Debug endpoint to check VAT data from Qonto."""
-    try:
-        qonto = Qonto()
-        slug = qonto.get_bank_account_id()
-        if not slug:
-            return jsonify({"error": "Could not get bank account slug"})
-
-        qonto_txs = qonto.get_all_transactions(slug)
-
-        # Check what VAT fields exist in transactions
-        sample_txs = []
-        vat_count = 0
-        for tx in qonto_txs[:20]:  # First 20 transactions as sample
-            has_vat = tx.get("vat_amount") or tx.get("vat_amount_cents") or tx.get("vat_rate")
-            if has_vat:
-                vat_count += 1
-            sample_txs.append({
-                "transaction_id": tx.get("transaction_id"),
-                "label": tx.get("label"),
-                "amount": tx.get("amount"),
-                "vat_amount": tx.get("vat_amount"),
-                "vat_amount_cents": tx.get("vat_amount_cents"),
-                "vat_rate": tx.get("vat_rate"),
-                "category": tx.get("category")
-            })
+    qonto = Qonto()
+    slug = qonto.get_bank_account_id()
+    if not slug:
+        return jsonify({"error": "Could not get bank account slug"})
+
+    qonto_txs = qonto.get_all_transactions(slug)
+
+    # Check what VAT fields exist in transactions
+    sample_txs = []
+    vat_count = 0
+    for tx in qonto_txs[:20]:  # First 20 transactions as sample
+        has_vat = tx.get("vat_amount") or tx.get("vat_amount_cents") or tx.get("vat_rate")
+        if has_vat:
+            vat_count += 1
+        sample_txs.append({
+            "transaction_id": tx.get("transaction_id"),
+            "label": tx.get("label"),
+            "amount": tx.get("amount"),
+            "vat_amount": tx.get("vat_amount"),
+            "vat_amount_cents": tx.get("vat_amount_cents"),
+            "vat_rate": tx.get("vat_rate"),
+            "category": tx.get("category")
+        })
 
-        # Count total with VAT
-        total_with_vat = sum(1 for tx in qonto_txs if tx.get("vat_amount") or tx.get("vat_amount_cents"))
+    # Count total with VAT
+    total_with_vat = sum(1 for tx in qonto_txs if tx.get("vat_amount") or tx.get("vat_amount_cents"))
 
-        return jsonify({
-            "total_transactions": len(qonto_txs),
-            "transactions_with_vat": total_with_vat,
-            "sample_transactions": sample_txs
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({
+        "total_transactions": len(qonto_txs),
+        "transactions_with_vat": total_with_vat,
+        "sample_transactions": sample_txs
+    })
+
+# Fields that may hold a synced record's Qonto transaction ID, in lookup order
+QONTO_ID_KEYS = ("Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "Name")
+# Duplicate detection also accepts the lowercase variants
+ID_KEYS = QONTO_ID_KEYS + ("id", "name")
 
 @app.route("/api/sync", methods=["POST"])
 @require_auth
 def api_sync():
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
-
-        # Get transactions from Qonto
-        slug = qonto.get_bank_account_id()
-        if not slug:
-            return jsonify({"error": "Could not get bank account slug"})
-
-        qonto_txs = qonto.get_all_transactions(slug)
-        if not qonto_txs:
-            return jsonify({"error": "Qonto returned 0 transactions"})
-
-        # Step 1: Discover the actual table schema from Airtable metadata API
-        table_info = None
-        table_name = None
-        fields_map = {}
+    qonto = Qonto()
+    airtable = Airtable()
+
+    # Get transactions from Qonto
+    slug = qonto.get_bank_account_id()
+    if not slug:
+        return jsonify({"error": "Could not get bank account slug"})
+
+    qonto_txs = qonto.get_all_transactions(slug)
+    if not qonto_txs:
+        return jsonify({"error": "Qonto returned 0 transactions"})
+
+    # Step 1: Discover the actual table schema from Airtable metadata API
+    fields_map = {}
+
+    tables = airtable.get_tables()
+    # Find a transactions-like table (exclude allocation tables); if no match, use the first table
+    table_info = _find_transactions_table(tables) or (tables[0] if tables else None)
+    table_name = table_info.get("name") if table_info else None
+
+    if not table_name:
+        return jsonify({"error": "No tables found in Airtable base. Please create a table first."})
+
+    # Step 2: Map Airtable field names to our data
+    # Get actual field names from the table
+    actual_fields = {f.get("name"): f.get("type") for f in table_info.get("fields", [])}
+
+    # Try to find matching fields (case-insensitive); first field wins on case clashes
+    lower_to_actual = {}
+    for f in actual_fields:
+        lower_to_actual.setdefault(f.lower(), f)
+
+    def find_field(candidates):
+        for c in candidates:
+            hit = lower_to_actual.get(c.lower())
+            if hit:
+                return hit
+        return None
 
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
+    # Map our data to actual field names
+    id_field = find_field(["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "id", "Name"])
+    amount_field = find_field(["Amount", "amount", "Monto", "monto", "Importe", "importe"])
+    desc_field = find_field(["Description", "description", "Descripcion", "descripcion", "Label", "label", "Name", "name"])
+    type_field = find_field(["Type", "type", "Tipo", "tipo", "Side", "side"])
+    date_field = find_field(["Date", "date", "Fecha", "fecha", "settled_at"])
+    counterparty_field = find_field(["Counterparty", "counterparty", "Contraparte", "contraparte"])
+    # Extended fields
+    reference_field = find_field(["Reference", "reference", "Referencia", "referencia"])
+    note_field = find_field(["Note", "note", "Nota", "nota", "Notes", "notes"])
+    vat_amount_field = find_field(["VAT Amount", "vat_amount", "IVA", "iva"])
+    vat_rate_field = find_field(["VAT Rate", "vat_rate", "Tipo IVA", "tipo_iva"])
+    attachment_ids_field = find_field(["Attachment IDs", "attachment_ids", "Attachments", "attachments"])
+    label_ids_field = find_field(["Label IDs", "label_ids", "Labels", "labels"])
+    qonto_category_field = find_field(["Qonto Category", "qonto_category", "Categoria Qonto", "categoria_qonto"])
+    card_digits_field = find_field(["Card Last Digits", "card_last_digits", "Tarjeta", "tarjeta"])
+
+    # Qonto values written unchanged (or through the converter) to their field when non-empty
+    copied_fields = [(field, key, convert) for field, key, convert in (
+        (counterparty_field, "label", None),
+        (reference_field, "reference", None),
+        (note_field, "note", None),
+        (attachment_ids_field, "attachment_ids", ",".join),
+        (label_ids_field, "label_ids", ",".join),
+        (qonto_category_field, "category", None),
+        (card_digits_field, "card_last_digits", None),
+    ) if field]
+
+    # Without an ID field the whole table is read; only the ID candidates and
+    # the backfilled fields are downloaded
+    backfill_read_fields = _present_fields(
+        actual_fields, [f for f in (*ID_KEYS, qonto_category_field, vat_amount_field) if f]
+    )
+
+    # Get existing records to check for duplicates
+    existing = None
+    existing_ids = set()
+    # Set when `existing` may be missing records the backfill below should see
+    need_refresh = False
+    # Set when the table couldn't be read at all
+    lookup_failed = False
+    if id_field:
+        # New records carry the Qonto ID in id_field, so only look up the IDs
+        # Qonto returned instead of downloading the whole table
+        try:
+            existing = airtable.get_by_values(
+                table_name, id_field, [tx.get("transaction_id", "") for tx in qonto_txs],
+                fields=[f for f in (id_field, qonto_category_field, vat_amount_field) if f]
             )
-            if r.status_code == 200:
-                tables = r.json().get("tables", [])
-                # Find a transactions-like table (exclude allocation tables)
-                for t in tables:
-                    name_lower = t.get("name", "").lower()
-                    if ("trans" in name_lower or "movimiento" in name_lower or "operacion" in name_lower) and "alloc" not in name_lower:
-                        table_info = t
-                        table_name = t.get("name")
-                        break
-                # If no match, use the first table
-                if not table_info and tables:
-                    table_info = tables[0]
-                    table_name = tables[0].get("name")
-
-        if not table_name:
-            return jsonify({"error": "No tables found in Airtable base. Please create a table first."})
-
-        # Step 2: Map Airtable field names to our data
-        # Get actual field names from the table
-        actual_fields = {f.get("name"): f.get("type") for f in table_info.get("fields", [])}
-
-        # Try to find matching fields (case-insensitive)
-        def find_field(candidates):
-            for c in candidates:
-                for f in actual_fields:
-                    if c.lower() == f.lower():
-                        return f
-            return None
-
-        # Map our data to actual field names
-        id_field = find_field(["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "id", "Name"])
-        amount_field = find_field(["Amount", "amount", "Monto", "monto", "Importe", "importe"])
-        desc_field = find_field(["Description", "description", "Descripcion", "descripcion", "Label", "label", "Name", "name"])
-        type_field = find_field(["Type", "type", "Tipo", "tipo", "Side", "side"])
-        date_field = find_field(["Date", "date", "Fecha", "fecha", "settled_at"])
-        counterparty_field = find_field(["Counterparty", "counterparty", "Contraparte", "contraparte"])
-        # Extended fields
-        reference_field = find_field(["Reference", "reference", "Referencia", "referencia"])
-        note_field = find_field(["Note", "note", "Nota", "nota", "Notes", "notes"])
-        vat_amount_field = find_field(["VAT Amount", "vat_amount", "IVA", "iva"])
-        vat_rate_field = find_field(["VAT Rate", "vat_rate", "Tipo IVA", "tipo_iva"])
-        attachment_ids_field = find_field(["Attachment IDs", "attachment_ids", "Attachments", "attachments"])
-        label_ids_field = find_field(["Label IDs", "label_ids", "Labels", "labels"])
-        qonto_category_field = find_field(["Qonto Category", "qonto_category", "Categoria Qonto", "categoria_qonto"])
-        card_digits_field = find_field(["Card Last Digits", "card_last_digits", "Tarjeta", "tarjeta"])
-
-        # Get existing records to check for duplicates
-        existing = []
-        existing_ids = set()
+            existing_ids = {str(r[id_field]) for r in existing if r.get(id_field)}
+        except Exception:
+            pass  # read the whole table below instead
+    if existing is None:
         try:
-            existing = airtable.get_all(table_name)
+            existing = airtable.get_all(table_name, fields=backfill_read_fields)
             # Check multiple possible ID fields for existing records
-            for r in existing:
-                for key in ["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "id", "Name", "name"]:
-                    if r.get(key):
-                        existing_ids.add(str(r.get(key)))
+            existing_ids = {str(r[k]) for r in existing for k in ID_KEYS if r.get(k)}
         except Exception as e:
-            pass  # Table might be empty or field names different
+            existing = []
+            lookup_failed = True  # Table might be empty or field names different
+    existing_ids = frozenset(existing_ids)
 
-        synced = 0
-        skipped = 0
-        errors = []
+    synced = 0
+    errors = []
 
-        # Build all records first
-        records_to_create = []
-        for tx in qonto_txs:
-            tx_id = tx.get("transaction_id", "")
-            if tx_id in existing_ids:
-                skipped += 1
-                continue
-
-            # Build record using discovered field names
-            record = {}
-
-            if id_field:
-                record[id_field] = tx_id
-            if amount_field:
-                record[amount_field] = float(tx.get("amount", 0))
-            if desc_field:
-                record[desc_field] = tx.get("label", "") or tx.get("reference", "") or tx_id
-            if type_field:
-                # Map Qonto's credit/debit to Airtable's Income/Expense
-                side = tx.get("side", "")
-                if side == "credit":
-                    record[type_field] = "Income"
-                elif side == "debit":
-                    record[type_field] = "Expense"
-            if date_field:
-                settled = tx.get("settled_at", "")
-                if settled:
-                    record[date_field] = settled.split("T")[0]
-            if counterparty_field:
-                record[counterparty_field] = tx.get("label", "")
-
-            # Extended Qonto fields
-            if reference_field and tx.get("reference"):
-                record[reference_field] = tx.get("reference", "")
-            if note_field and tx.get("note"):
-                record[note_field] = tx.get("note", "")
-            # VAT - check multiple field names (Qonto may use vat_amount or vat_amount_cents)
-            if vat_amount_field:
-                vat_val = tx.get("vat_amount") or tx.get("vat_amount_cents")
-                if vat_val:
-                    # If it's in cents, convert to euros
-                    vat_float = float(vat_val)
-                    if vat_float > 1000 and tx.get("vat_amount_cents"):  # Likely cents
-                        vat_float = vat_float / 100
-                    record[vat_amount_field] = vat_float
-            if vat_rate_field:
-                vat_rate_val = tx.get("vat_rate") or tx.get("vat_rate_cents")
-                if vat_rate_val:
-                    record[vat_rate_field] = float(vat_rate_val)
-            if attachment_ids_field and tx.get("attachment_ids"):
-                record[attachment_ids_field] = ",".join(tx.get("attachment_ids", []))
-            if label_ids_field and tx.get("label_ids"):
-                record[label_ids_field] = ",".join(tx.get("label_ids", []))
-            if qonto_category_field and tx.get("category"):
-                record[qonto_category_field] = tx.get("category", "")
-            if card_digits_field and tx.get("card_last_digits"):
-                record[card_digits_field] = tx.get("card_last_digits", "")
-
-            # If no fields matched, use Name field (exists in every Airtable table)
-            if not record:
-                record["Name"] = f"{tx_id} - {tx.get('label', '')} - {tx.get('amount', 0)}"
-
-            # Remove empty values
-            record = {k: v for k, v in record.items() if v is not None and v != ""}
-            records_to_create.append(record)
-
-        # Batch create in groups of 10 (Airtable limit)
-        for i in range(0, len(records_to_create), 10):
-            batch = records_to_create[i:i+10]
-            try:
-                airtable.create_batch(table_name, batch)
-                synced += len(batch)
-            except Exception as e:
-                error_msg = str(e)
-                errors.append(error_msg[:150])
-                if len(errors) >= 3:
-                    break
+    # Split off the transactions already in Airtable, comparing IDs as strings
+    # like the ones collected above (which never include "", so transactions
+    # without an ID are always new)
+    new_txs = [tx for tx in qonto_txs if str(tx.get("transaction_id") or "") not in existing_ids]
+    skipped = len(qonto_txs) - len(new_txs)
 
-        # ===== UPDATE CATEGORIES AND VAT ON EXISTING TRANSACTIONS =====
-        categories_updated = 0
-        vat_updated = 0
-
-        # Build map of Qonto transaction_id -> data (category and VAT)
-        qonto_data_map = {}
-        for tx in qonto_txs:
-            tx_id = tx.get("transaction_id", "")
-            if tx_id:
-                qonto_data_map[tx_id] = {
-                    "category": tx.get("category", ""),
-                    "vat_amount": tx.get("vat_amount") or tx.get("vat_amount_cents") or 0
-                }
-
-        # Re-fetch existing records to get fresh data
+    def build_record(tx):
+        get = tx.get
+        tx_id = str(get("transaction_id") or "")
+
+        # Read each Qonto value once
+        label = get("label")
+        amount = get("amount", 0)
+        vat_amount_cents = get("vat_amount_cents")
+
+        # Build record using discovered field names. Empty values are skipped
+        # as they are assigned (Airtable rejects "" for some field types).
+        record = {}
+
+        if id_field and tx_id:
+            record[id_field] = tx_id
+        if amount_field:
+            record[amount_field] = float(amount)
+        description = label or get("reference") or tx_id
+        if desc_field and description:
+            record[desc_field] = description
+        if type_field:
+            # Map Qonto's credit/debit to Airtable's Income/Expense
+            side = get("side", "")
+            if side == "credit":
+                record[type_field] = "Income"
+            elif side == "debit":
+                record[type_field] = "Expense"
+        if date_field:
+            settled = get("settled_at", "")
+            if settled:
+                record[date_field] = settled.split("T")[0]
+
+        # Counterparty and extended Qonto fields
+        for field, key, convert in copied_fields:
+            value = get(key)
+            if value:
+                record[field] = convert(value) if convert else value
+        # VAT - check multiple field names (Qonto may use vat_amount or vat_amount_cents)
+        if vat_amount_field:
+            vat_val = get("vat_amount") or vat_amount_cents
+            if vat_val:
+                # If it's in cents, convert to euros
+                vat_float = float(vat_val)
+                if vat_float > 1000 and vat_amount_cents:  # Likely cents
+                    vat_float = vat_float / 100
+                record[vat_amount_field] = vat_float
+        if vat_rate_field:
+            vat_rate_val = get("vat_rate") or get("vat_rate_cents")
+            if vat_rate_val:
+                record[vat_rate_field] = float(vat_rate_val)
+
+        # If no fields matched, use Name field (exists in every Airtable table)
+        if not record:
+            record["Name"] = f"{tx_id} - {get('label', '')} - {amount}"
+
+        return record
+
+    def has_id(record):
+        return bool(id_field and record.get(id_field))
+
+    def create_chunk(batch):
+        nonlocal need_refresh
+        upserts = [record for record in batch if has_id(record)]
+        creates = [record for record in batch if not has_id(record)]
+        try:
+            if upserts:
+                # Upsert on the Qonto ID so a record created since the lookup above
+                # (e.g. by an overlapping sync) is updated rather than duplicated
+                airtable.batch_upsert(table_name, upserts, [id_field])
+            if creates:
+                # Records without a Qonto ID have nothing to merge on. Keep the
+                # created records so the backfill below doesn't re-read the table.
+                created = airtable.create_batch(table_name, creates).get("records", [])
+                existing.extend({"id": rec["id"], **rec.get("fields", {})} for rec in created)
+            return len(batch)
+        except Exception as e:
+            need_refresh = True
+            if _is_rate_limited(e):
+                raise  # _write_batches backs off and retries the whole batch
+        # One invalid record rejects the whole batch; retry one by one so
+        # the valid records in it still get created, upserting on the Qonto ID
+        # as above when there is one. A batch whose records keep failing is
+        # given up on after 3 errors; the other batches still run.
+        created = 0
+        failed = 0
+        for record in batch:
+            if failed >= 3:
+                break
+            try:
+                if has_id(record):
+                    _retry_rate_limited(partial(airtable.batch_upsert, table_name, merge_on=[id_field]), [record])
+                else:
+                    _retry_rate_limited(partial(airtable.create, table_name), record)
+                created += 1
+            except Exception as e:
+                failed += 1
+                errors.append(str(e)[:150])
+        return created
+
+    if id_field and lookup_failed:
+        # Without the existing IDs every transaction would be upserted,
+        # overwriting fields edited in Airtable, so nothing is written
+        errors.append("Could not read existing transactions; no records were written")
+    else:
+        # Batch create in groups of 10 (Airtable limit), several batches in flight at
+        # once. Each batch's records are built just before it is sent.
+        batches = _chunked(map(build_record, new_txs), 10)
+        # Every batch is attempted (errors never outnumber the records); a failed one
+        # doesn't stop the rest
+        synced += _write_batches(create_chunk, batches, errors, max_errors=len(new_txs))
+
+    # ===== UPDATE CATEGORIES AND VAT ON EXISTING TRANSACTIONS =====
+    categories_updated = 0
+    vat_updated = 0
+
+    # Build map of Qonto transaction_id -> data (category and VAT), leaving out
+    # transactions with neither since they have nothing to backfill
+    qonto_data_map = {
+        tx_id: {"category": category, "vat_amount": vat_amount}
+        for tx_id, category, vat_amount in (
+            (str(tx.get("transaction_id") or ""), tx.get("category", ""),
+             tx.get("vat_amount") or tx.get("vat_amount_cents") or 0)
+            for tx in qonto_txs
+        )
+        if tx_id and (category or vat_amount)
+    }
+
+    # Records found by ID above are exactly the ones that can need a backfill
+    # (anything just created already has category and VAT). Otherwise `existing`
+    # is the full table plus the records created above; re-fetch it if reading
+    # the table failed, or without an ID field, if a create batch failed.
+    if lookup_failed or (need_refresh and not id_field):
         try:
-            existing = airtable.get_all(table_name)
+            existing = airtable.get_all(table_name, fields=backfill_read_fields)
         except:
             existing = []
 
-        for record in existing:
-            record_id = record.get("id")
-            # Find Qonto transaction ID
-            qonto_id = None
-            for key in ["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "Name"]:
-                if record.get(key):
-                    qonto_id = record.get(key)
-                    break
+    backfills = []
+    for record in existing:
+        record_id = record.get("id")
+        # Find Qonto transaction ID
+        qonto_id = None
+        for key in QONTO_ID_KEYS:
+            if record.get(key):
+                qonto_id = record.get(key)
+                break
 
-            if not qonto_id or qonto_id not in qonto_data_map:
-                continue
-
-            qonto_data = qonto_data_map[qonto_id]
-            updates = {}
-
-            # Check if needs category update
-            if qonto_category_field:
-                current_category = record.get(qonto_category_field) or ""
-                new_category = qonto_data.get("category", "")
-                if not current_category and new_category:
-                    updates[qonto_category_field] = new_category
-
-            # Check if needs VAT update
-            if vat_amount_field:
-                current_vat = record.get(vat_amount_field) or 0
-                new_vat = qonto_data.get("vat_amount", 0)
-                if new_vat and not current_vat:
-                    # Convert from cents if needed
-                    vat_float = float(new_vat)
-                    if vat_float > 1000:  # Likely cents
-                        vat_float = vat_float / 100
-                    updates[vat_amount_field] = vat_float
-
-            # Apply updates if any
-            if updates:
-                try:
-                    airtable.update(table_name, record_id, updates)
-                    if qonto_category_field in updates:
-                        categories_updated += 1
-                    if vat_amount_field in updates:
-                        vat_updated += 1
-                except:
-                    pass
+        if not qonto_id or qonto_id not in qonto_data_map:
+            continue
+
+        qonto_data = qonto_data_map[qonto_id]
+        updates = {}
+
+        # Check if needs category update
+        if qonto_category_field:
+            current_category = record.get(qonto_category_field) or ""
+            new_category = qonto_data.get("category", "")
+            if not current_category and new_category:
+                updates[qonto_category_field] = new_category
+
+        # Check if needs VAT update
+        if vat_amount_field:
+            current_vat = record.get(vat_amount_field) or 0
+            new_vat = qonto_data.get("vat_amount", 0)
+            if new_vat and not current_vat:
+                # Convert from cents if needed
+                vat_float = float(new_vat)
+                if vat_float > 1000:  # Likely cents
+                    vat_float = vat_float / 100
+                updates[vat_amount_field] = vat_float
 
-        return jsonify({
-            "qonto_count": len(qonto_txs),
-            "synced": synced,
-            "skipped": skipped,
-            "categories_updated": categories_updated,
-            "vat_updated": vat_updated,
-            "existing_count": len(existing),
-            "table_name": table_name,
-            "fields_found": {
-                "id": id_field,
-                "amount": amount_field,
-                "description": desc_field,
-                "type": type_field,
-                "date": date_field,
-                "qonto_category": qonto_category_field,
-                "vat_amount": vat_amount_field
-            },
-            "errors": errors if errors else None
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        if updates:
+            backfills.append({"id": record_id, "fields": updates})
+
+    # Backfills go out 10 records per request instead of one request per record
+    for rec in _update_records(airtable, table_name, backfills):
+        if qonto_category_field in rec["fields"]:
+            categories_updated += 1
+        if vat_amount_field in rec["fields"]:
+            vat_updated += 1
+
+    return jsonify({
+        "qonto_count": len(qonto_txs),
+        "synced": synced,
+        "failed": len(new_txs) - synced,
+        "skipped": skipped,
+        "categories_updated": categories_updated,
+        "vat_updated": vat_updated,
+        "existing_count": len(existing),
+        "table_name": table_name,
+        "fields_found": {
+            "id": id_field,
+            "amount": amount_field,
+            "description": desc_field,
+            "type": type_field,
+            "date": date_field,
+            "qonto_category": qonto_category_field,
+            "vat_amount": vat_amount_field
+        },
+        "errors": errors if errors else None
+    })
 
 @app.route("/api/assign-project", methods=["POST"])
 def api_assign_project():
-    try:
-        data = request.json
-        tx_id = data.get("transaction_id")
-        project_id = data.get("project_id")
+    data = request.json
+    tx_id = data.get("transaction_id")
+    project_id = data.get("project_id")
 
-        airtable = Airtable()
-        # Use "Project" field name to match schema
-        airtable.update("Transactions", tx_id, {"Project": project_id or ""})
+    airtable = Airtable()
+    # Use "Project" field name to match schema
+    airtable.update("Transactions", tx_id, {"Project": project_id or ""})
 
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"ok": True})
 
 @app.route("/api/transaction", methods=["POST"])
 @require_auth
 def api_create_transaction():
     """Create a manual transaction."""
-    try:
-        data = request.json
-        airtable = Airtable()
-
-        # Generate a unique ID for manual transactions
-        import uuid
-        manual_id = f"MANUAL-{uuid.uuid4().hex[:8].upper()}"
-
-        record = {
-            "Qonto Transaction ID": manual_id,
-            "Type": data.get("type", "Expense"),
-            "Amount": float(data.get("amount", 0)),
-            "Date": data.get("date"),
-            "Description": data.get("description", ""),
-            "Counterparty": data.get("counterparty", "")
-        }
+    data = request.json
+    airtable = Airtable()
+
+    # Generate a unique ID for manual transactions
+    import uuid
+    manual_id = f"MANUAL-{uuid.uuid4().hex[:8].upper()}"
+
+    record = {
+        "Qonto Transaction ID": manual_id,
+        "Type": data.get("type", "Expense"),
+        "Amount": float(data.get("amount", 0)),
+        "Date": data.get("date"),
+        "Description": data.get("description", ""),
+        "Counterparty": data.get("counterparty", "")
+    }
 
-        # Remove empty values
-        record = {k: v for k, v in record.items() if v is not None and v != ""}
+    # Remove empty values
+    record = {k: v for k, v in record.items() if v is not None and v != ""}
 
-        result = airtable.create("Transactions", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    result = airtable.create("Transactions", record)
+    return jsonify({"ok": True, "id": result.get("id")})
 
 @app.route("/health")
 def health():
@@ -1455,108 +1821,116 @@ def api_airtable_schema():
     """Return raw Airtable schema."""
     try:
         airtable = Airtable()
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
-            )
-            return jsonify({"status": r.status_code, "data": r.json() if r.status_code == 200 else r.text})
+        tables = airtable.get_tables()
+        if tables:
+            return _conditional_jsonify({"status": 200, "data": {"tables": tables}})
+        # Fetch failed: request it directly to report Airtable's status and error
+        r = _http_client.get(
+            f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
+            headers=airtable.headers
+        )
+        return _conditional_jsonify({"status": r.status_code, "data": _parse(r) if r.status_code == 200 else r.text})
     except Exception as e:
         return jsonify({"error": str(e)})
 
-@app.route("/api/schema-check")
-def api_schema_check():
-    """Check current Airtable schema and return what's missing."""
-    try:
-        airtable = Airtable()
-
-        # Required schema definition
-        required_schema = {
-            "Transactions": {
-                "fields": ["Qonto Transaction ID", "Date", "Amount", "Description", "Counterparty", "Type", "Category", "Project"],
-                "description": "Transacciones de Qonto"
-            },
-            "Team Members": {
-                "fields": ["Name", "Role", "Salary"],
-                "description": "Miembros del equipo con salarios"
-            },
-            "Salary Allocations": {
-                "fields": ["Team Member ID", "Team Member Name", "Project ID", "Project Name", "Percentage", "Month", "Amount"],
-                "description": "Asignacion de salarios a proyectos por mes"
-            },
-            "Transaction Allocations": {
-                "fields": ["Transaction", "Project", "Client", "Percentage"],
-                "description": "Asignacion de transacciones a proyectos/clientes en porcentaje"
-            },
-            "Projects": {
-                "fields": ["Name", "Client", "Status"],
-                "description": "Proyectos para tracking de rentabilidad"
-            },
-            "Clients": {
-                "fields": ["Name", "Contact", "Email", "Phone", "Notes"],
-                "description": "Clientes para asociar a proyectos"
-            },
-            "Categories": {
-                "fields": ["Name", "Type"],
-                "description": "Categorias de ingresos y gastos"
-            }
-        }
+# Tables and fields the app expects in the Airtable base (see /api/schema-check)
+REQUIRED_SCHEMA = {
+    "Transactions": {
+        "fields": ("Qonto Transaction ID", "Date", "Amount", "Description", "Counterparty", "Type", "Category", "Project"),
+        "description": "Transacciones de Qonto"
+    },
+    "Team Members": {
+        "fields": ("Name", "Role", "Salary"),
+        "description": "Miembros del equipo con salarios"
+    },
+    "Salary Allocations": {
+        "fields": ("Team Member ID", "Team Member Name", "Project ID", "Project Name", "Percentage", "Month", "Amount"),
+        "description": "Asignacion de salarios a proyectos por mes"
+    },
+    "Transaction Allocations": {
+        "fields": ("Transaction", "Project", "Client", "Percentage"),
+        "description": "Asignacion de transacciones a proyectos/clientes en porcentaje"
+    },
+    "Projects": {
+        "fields": ("Name", "Client", "Status"),
+        "description": "Proyectos para tracking de rentabilidad"
+    },
+    "Clients": {
+        "fields": ("Name", "Contact", "Email", "Phone", "Notes"),
+        "description": "Clientes para asociar a proyectos"
+    },
+    "Categories": {
+        "fields": ("Name", "Type"),
+        "description": "Categorias de ingresos y gastos"
+    }
+}
 
-        # Fetch current schema
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
-            )
-            if r.status_code != 200:
-                return jsonify({"error": "Could not fetch schema", "status": r.status_code})
+_schema_check_cache = {}  # base_id -> (schema signature, last /api/schema-check report)
 
-            current_tables = {t["name"]: t for t in r.json().get("tables", [])}
 
-        # Compare and build instructions
-        results = {
-            "existing_tables": list(current_tables.keys()),
-            "missing_tables": [],
-            "missing_fields": {},
-            "instructions": []
-        }
+@app.route("/api/schema-check")
+def api_schema_check():
+    """Check current Airtable schema and return what's missing."""
+    airtable = Airtable()
+
+    # Current schema, from the metadata cache (busted by create_table/create_field;
+    # ?refresh=1 re-checks it with Airtable). A base always has at least one table,
+    # so an empty list means the fetch failed.
+    tables = airtable.get_tables(refresh=request.args.get("refresh") == "1")
+    if not tables:
+        return jsonify({"error": "Could not fetch schema"})
+
+    # The report depends only on table names and their field names, so reuse the
+    # last one while those are unchanged
+    signature = tuple((t["name"], frozenset(f["name"] for f in t.get("fields", []))) for t in tables)
+    cached = _schema_check_cache.get(airtable.base_id)
+    if cached and cached[0] == signature:
+        return jsonify(cached[1])
+
+    current_tables = {t["name"]: t for t in tables}
+
+    # Compare and build instructions
+    results = {
+        "existing_tables": list(current_tables.keys()),
+        "missing_tables": [],
+        "missing_fields": {},
+        "instructions": []
+    }
 
-        for table_name, spec in required_schema.items():
-            if table_name not in current_tables:
-                results["missing_tables"].append(table_name)
+    for table_name, spec in REQUIRED_SCHEMA.items():
+        if table_name not in current_tables:
+            results["missing_tables"].append(table_name)
+            results["instructions"].append({
+                "action": "CREATE_TABLE",
+                "table": table_name,
+                "fields": list(spec["fields"]),
+                "description": spec["description"]
+            })
+        else:
+            # Check fields
+            existing_fields = {f["name"] for f in current_tables[table_name].get("fields", [])}
+            missing = [f for f in spec["fields"] if f not in existing_fields]
+            if missing:
+                results["missing_fields"][table_name] = missing
                 results["instructions"].append({
-                    "action": "CREATE_TABLE",
+                    "action": "ADD_FIELDS",
                     "table": table_name,
-                    "fields": spec["fields"],
-                    "description": spec["description"]
+                    "fields": missing
                 })
-            else:
-                # Check fields
-                existing_fields = [f["name"] for f in current_tables[table_name].get("fields", [])]
-                missing = [f for f in spec["fields"] if f not in existing_fields]
-                if missing:
-                    results["missing_fields"][table_name] = missing
-                    results["instructions"].append({
-                        "action": "ADD_FIELDS",
-                        "table": table_name,
-                        "fields": missing
-                    })
 
-        # Generate human-readable instructions
-        human_instructions = []
-        for inst in results["instructions"]:
-            if inst["action"] == "CREATE_TABLE":
-                human_instructions.append(f"CREAR TABLA '{inst['table']}' con campos: {', '.join(inst['fields'])}")
-            elif inst["action"] == "ADD_FIELDS":
-                human_instructions.append(f"AGREGAR a '{inst['table']}': {', '.join(inst['fields'])}")
+    # Generate human-readable instructions
+    human_instructions = []
+    for inst in results["instructions"]:
+        if inst["action"] == "CREATE_TABLE":
+            human_instructions.append(f"CREAR TABLA '{inst['table']}' con campos: {', '.join(inst['fields'])}")
+        elif inst["action"] == "ADD_FIELDS":
+            human_instructions.append(f"AGREGAR a '{inst['table']}': {', '.join(inst['fields'])}")
 
-        results["human_instructions"] = human_instructions
-        results["all_good"] = len(results["instructions"]) == 0
+    results["human_instructions"] = human_instructions
+    results["all_good"] = len(results["instructions"]) == 0
+    _schema_check_cache[airtable.base_id] = (signature, results)
 
-        return jsonify(results)
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify(results)
 
 @app.route("/api/debug")
 def api_debug():
@@ -1576,14 +1950,18 @@ def api_debug():
     # Test Airtable
     try:
         airtable = Airtable()
-        # Try to list tables by making requests
-        tables_found = []
-        for table in ["Transactions", "transactions", "Transacciones", "Categories", "categories", "Categorias", "Projects", "projects", "Proyectos"]:
-            try:
-                records = airtable.get_all(table)
-                tables_found.append({"name": table, "records": len(records)})
-            except Exception as e:
-                pass
+        candidates = ["Transactions", "transactions", "Transacciones", "Categories", "categories", "Categorias", "Projects", "projects", "Proyectos"]
+
+        # The (cached) metadata listing answers for every candidate at once; tokens
+        # without schema access fall back to probing each table with one small read
+        table_names = {t.get("name") for t in airtable.get_tables()}
+        if table_names:
+            found = [table in table_names for table in candidates]
+        else:
+            # Probe the candidates concurrently, within Airtable's per-base rate limit
+            with ThreadPoolExecutor(max_workers=AIRTABLE_MAX_CONCURRENCY) as pool:
+                found = list(pool.map(airtable.exists, candidates))
+        tables_found = [{"name": table} for table, ok in zip(candidates, found) if ok]
 
         result["airtable"] = {
             "status": "ok" if tables_found else "no_tables",
@@ -1595,19 +1973,19 @@ def api_debug():
     # Test Qonto
     try:
         qonto = Qonto()
-        with httpx.Client(timeout=10) as client:
-            r = client.get(
-                f"{qonto.base_url}/organization",
-                headers=qonto.headers
-            )
-            if r.status_code == 200:
-                org = r.json().get("organization", {})
-                result["qonto"] = {
-                    "status": "ok",
-                    "organization": org.get("slug"),
-                }
-            else:
-                result["qonto"] = {"status": "error", "code": r.status_code, "response": r.text[:200]}
+        r = _http_client.get(
+            f"{qonto.base_url}/organization",
+            headers=qonto.headers,
+            timeout=10
+        )
+        if r.status_code == 200:
+            org = _parse(r).get("organization", {})
+            result["qonto"] = {
+                "status": "ok",
+                "organization": org.get("slug"),
+            }
+        else:
+            result["qonto"] = {"status": "error", "code": r.status_code, "response": r.text[:200]}
     except Exception as e:
         result["qonto"] = {"status": "error", "error": str(e)}
 
@@ -1616,120 +1994,114 @@ def api_debug():
 @app.route("/api/debug/qonto")
 def api_debug_qonto():
     """Debug Qonto API - see raw transactions and bank accounts."""
-    try:
-        qonto = Qonto()
-        results = {"iban_configured": qonto.iban}
-
-        with httpx.Client(timeout=30) as client:
-            # Get organization with bank accounts
-            r = client.get(f"{qonto.base_url}/organization", headers=qonto.headers)
-            if r.status_code == 200:
-                org = r.json().get("organization", {})
-                bank_accounts = org.get("bank_accounts", [])
-                results["bank_accounts"] = [
-                    {"iban": ba.get("iban"), "slug": ba.get("slug"), "name": ba.get("name"), "balance": ba.get("balance")}
-                    for ba in bank_accounts
-                ]
-
-                # Find the matching account
-                matching_account = None
-                for ba in bank_accounts:
-                    if ba.get("iban") == qonto.iban:
-                        matching_account = ba
-                        break
-
-                results["iban_valid"] = matching_account is not None
-                if matching_account:
-                    results["bank_account_slug"] = matching_account.get("slug")
-                elif bank_accounts:
-                    results["suggestion"] = f"El IBAN configurado no coincide. IBANs disponibles: {[ba.get('iban') for ba in bank_accounts]}"
-            else:
-                results["org_error"] = {"status": r.status_code, "response": r.text[:300]}
-
-            # Get transactions using slug if available
-            slug = qonto.get_bank_account_id()
-            results["using_slug"] = slug
+    qonto = Qonto()
+    results = {"iban_configured": qonto.iban}
+
+    # Get organization with bank accounts
+    r = _http_client.get(f"{qonto.base_url}/organization", headers=qonto.headers)
+    if r.status_code == 200:
+        org = _parse(r).get("organization", {})
+        bank_accounts = org.get("bank_accounts", [])
+        results["bank_accounts"] = [
+            {"iban": ba.get("iban"), "slug": ba.get("slug"), "name": ba.get("name"), "balance": ba.get("balance")}
+            for ba in bank_accounts
+        ]
+
+        # Find the matching account
+        matching_account = None
+        for ba in bank_accounts:
+            if ba.get("iban") == qonto.iban:
+                matching_account = ba
+                break
 
-            for status in ["completed", "pending"]:
-                params = {"status": status, "per_page": 5}
-                if slug:
-                    params["slug"] = slug
-                else:
-                    params["iban"] = qonto.iban
+        results["iban_valid"] = matching_account is not None
+        if matching_account:
+            results["bank_account_slug"] = matching_account.get("slug")
+        elif bank_accounts:
+            results["suggestion"] = f"El IBAN configurado no coincide. IBANs disponibles: {[ba.get('iban') for ba in bank_accounts]}"
+    else:
+        results["org_error"] = {"status": r.status_code, "response": r.text[:300]}
+
+    # Get transactions using slug if available
+    slug = qonto.get_bank_account_id()
+    results["using_slug"] = slug
+
+    def fetch(status):
+        params = {"status": status, "per_page": 5}
+        if slug:
+            params["slug"] = slug
+        else:
+            params["iban"] = qonto.iban
+        return _http_client.get(
+            f"{qonto.base_url}/transactions",
+            headers=qonto.headers,
+            params=params
+        )
 
-                r = client.get(
-                    f"{qonto.base_url}/transactions",
-                    headers=qonto.headers,
-                    params=params
-                )
-                if r.status_code == 200:
-                    data = r.json()
-                    txs = data.get("transactions", [])
-                    meta = data.get("meta", {})
-                    results[f"tx_{status}"] = {
-                        "total": meta.get("total_count", len(txs)),
-                        "sample": [{"id": t.get("transaction_id"), "amount": t.get("amount"), "side": t.get("side"), "label": t.get("label")} for t in txs[:3]]
-                    }
-                else:
-                    results[f"tx_{status}"] = {"error": r.status_code, "msg": r.text[:200]}
+    # Both statuses are fetched concurrently on the shared pool
+    statuses = ["completed", "pending"]
+    for status, r in zip(statuses, _io_pool.map(fetch, statuses)):
+        if r.status_code == 200:
+            data = _parse(r)
+            txs = data.get("transactions", [])
+            meta = data.get("meta", {})
+            results[f"tx_{status}"] = {
+                "total": meta.get("total_count", len(txs)),
+                "sample": [{"id": t.get("transaction_id"), "amount": t.get("amount"), "side": t.get("side"), "label": t.get("label")} for t in txs[:3]]
+            }
+        else:
+            results[f"tx_{status}"] = {"error": r.status_code, "msg": r.text[:200]}
 
-        return jsonify(results)
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify(results)
 
 @app.route("/api/diagnostics")
 def api_diagnostics():
     """Analyze transactions for issues like duplicates, missing types, etc."""
-    try:
-        airtable = Airtable()
-        records = airtable.get_all("Transactions")
+    airtable = Airtable()
 
-        # Analyze the data
-        total = len(records)
-        by_type = {}
-        by_qonto_id = {}
-        income_total = 0
-        expense_total = 0
-        no_type_total = 0
+    # Only the fields analyzed below are downloaded
+    tx_table = next((t for t in airtable.get_tables() if t.get("name") == "Transactions"), None)
+    tx_fields = {f.get("name") for f in tx_table.get("fields", [])} if tx_table else None
+    fields = _present_fields(tx_fields, ["Type", "Qonto Transaction ID", "Amount"])
 
-        for r in records:
-            # Count by Type
-            tx_type = r.get("Type", "")
-            by_type[tx_type or "(empty)"] = by_type.get(tx_type or "(empty)", 0) + 1
-
-            # Check for duplicates by Qonto Transaction ID
-            qonto_id = r.get("Qonto Transaction ID", "")
-            if qonto_id:
-                by_qonto_id[qonto_id] = by_qonto_id.get(qonto_id, 0) + 1
-
-            # Calculate totals
-            amt = float(r.get("Amount", 0) or 0)
-            if tx_type == "Income":
-                income_total += amt
-            elif tx_type == "Expense":
-                expense_total += amt
-            else:
-                no_type_total += amt
+    # Analyze the data in one pass over the streamed records
+    by_type = Counter()
+    by_qonto_id = Counter()
+    totals = {"Income": 0, "Expense": 0, None: 0}
 
-        # Find duplicates
-        duplicates = {k: v for k, v in by_qonto_id.items() if v > 1}
+    for r in airtable.iter_all("Transactions", fields=fields):
+        get = r.get
+        # Count by Type (every record lands in exactly one bucket)
+        tx_type = get("Type", "")
+        by_type[tx_type or "(empty)"] += 1
 
-        return jsonify({
-            "total_records": total,
-            "by_type": by_type,
-            "duplicates_count": len(duplicates),
-            "duplicates": duplicates if len(duplicates) < 20 else f"{len(duplicates)} duplicates found",
-            "totals": {
-                "income": income_total,
-                "expense": expense_total,
-                "no_type": no_type_total
-            },
-            "net": income_total - expense_total
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        # Check for duplicates by Qonto Transaction ID
+        qonto_id = get("Qonto Transaction ID", "")
+        if qonto_id:
+            by_qonto_id[qonto_id] += 1
+
+        # Calculate totals (anything that isn't Income/Expense counts as untyped)
+        totals[tx_type if tx_type in totals else None] += _to_float(get("Amount"))
+
+    income_total = totals["Income"]
+    expense_total = totals["Expense"]
+    no_type_total = totals[None]
+
+    # Find duplicates
+    duplicates = {k: v for k, v in by_qonto_id.items() if v > 1}
+
+    return jsonify({
+        "total_records": sum(by_type.values()),
+        "by_type": by_type,
+        "duplicates_count": len(duplicates),
+        "duplicates": duplicates if len(duplicates) < 20 else f"{len(duplicates)} duplicates found",
+        "totals": {
+            "income": income_total,
+            "expense": expense_total,
+            "no_type": no_type_total
+        },
+        "net": income_total - expense_total
+    })
 
 # ==================== Salary Allocation ====================
 
@@ -1737,75 +2109,63 @@ def api_diagnostics():
 @require_auth
 def api_team_members():
     """Get all team members."""
+    airtable = Airtable()
+    # Try to get Team Members table
     try:
-        airtable = Airtable()
-        # Try to get Team Members table
-        try:
-            records = airtable.get_all("Team Members")
-            members = []
-            for r in records:
-                members.append({
-                    "id": r.get("id"),
-                    "name": r.get("Name") or r.get("name") or "",
-                    "salary": float(r.get("Salary") or r.get("salary") or r.get("Monthly Salary") or 0),
-                    "role": r.get("Role") or r.get("role") or ""
-                })
-            return jsonify({"members": members})
-        except Exception:
-            # Table doesn't exist, return empty
-            return jsonify({"members": [], "note": "Create 'Team Members' table in Airtable with Name, Salary, Role fields"})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        records = _get_reference_table(airtable, "Team Members")
+        members = []
+        for r in records:
+            members.append({
+                "id": r.get("id"),
+                "name": _first_value(r, ("Name", "name")),
+                "salary": float(_first_value(r, ("Salary", "salary", "Monthly Salary"), 0)),
+                "role": _first_value(r, ("Role", "role"))
+            })
+        return _conditional_jsonify({"members": members})
+    except Exception:
+        # Table doesn't exist, return empty
+        return jsonify({"members": [], "note": "Create 'Team Members' table in Airtable with Name, Salary, Role fields"})
 
 @app.route("/api/team-member", methods=["POST"])
 @require_auth
 def api_create_team_member():
     """Create a team member."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {
-            "Name": data.get("name", ""),
-            "Salary": float(data.get("salary", 0)),
-            "Role": data.get("role", "")
-        }
-        record = {k: v for k, v in record.items() if v}
-        result = airtable.create("Team Members", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {
+        "Name": data.get("name", ""),
+        "Salary": float(data.get("salary", 0)),
+        "Role": data.get("role", "")
+    }
+    record = {k: v for k, v in record.items() if v}
+    result = airtable.create("Team Members", record)
+    _invalidate_reference_table(airtable, "Team Members")
+    return jsonify({"ok": True, "id": result.get("id")})
 
 @app.route("/api/team-member/<member_id>", methods=["PUT"])
 @require_auth
 def api_update_team_member(member_id):
     """Update a team member."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {
-            "Name": data.get("name", ""),
-            "Salary": float(data.get("salary", 0)),
-            "Role": data.get("role", "")
-        }
-        record = {k: v for k, v in record.items() if v is not None}
-        airtable.update("Team Members", member_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {
+        "Name": data.get("name", ""),
+        "Salary": float(data.get("salary", 0)),
+        "Role": data.get("role", "")
+    }
+    record = {k: v for k, v in record.items() if v is not None}
+    airtable.update("Team Members", member_id, record)
+    _invalidate_reference_table(airtable, "Team Members")
+    return jsonify({"ok": True})
 
 @app.route("/api/team-member/<member_id>", methods=["DELETE"])
 @require_auth
 def api_delete_team_member(member_id):
     """Delete a team member."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Team Members", [member_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Team Members", [member_id])
+    _invalidate_reference_table(airtable, "Team Members")
+    return jsonify({"ok": True})
 
 # ==================== Projects CRUD ====================
 
@@ -1813,117 +2173,101 @@ def api_delete_team_member(member_id):
 @require_auth
 def api_debug_table_fields(table):
     """Debug: Get raw Airtable fields for a table (first record)."""
-    try:
-        airtable = Airtable()
-        records = airtable.get_all(table)
-        if records:
-            # Return all field names from first record
-            sample = records[0]
-            return jsonify({
-                "table": table,
-                "record_count": len(records),
-                "fields": list(sample.keys()),
-                "sample_record": sample
-            })
-        return jsonify({"table": table, "record_count": 0, "fields": [], "sample_record": None})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    airtable = Airtable()
+    records = airtable.get_all(table)
+    if records:
+        # Return all field names from first record
+        sample = records[0]
+        return jsonify({
+            "table": table,
+            "record_count": len(records),
+            "fields": list(sample.keys()),
+            "sample_record": sample
+        })
+    return jsonify({"table": table, "record_count": 0, "fields": [], "sample_record": None})
 
 
 @app.route("/api/debug/airtable-schema")
 @require_auth
 def api_debug_airtable_schema():
     """Get full Airtable base schema (all tables and fields)."""
-    try:
-        airtable = Airtable()
-        schema = airtable.get_base_schema()
-        return jsonify(schema)
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    airtable = Airtable()
+    schema = airtable.get_base_schema()
+    return jsonify(schema)
 
 
 @app.route("/api/admin/create-offerings-table", methods=["POST"])
 @require_auth
 def api_create_offerings_table():
     """Create the 'Ofertas G4U' table and link it to Projects."""
-    try:
-        airtable = Airtable()
+    airtable = Airtable()
+
+    # First get the schema to find Projects table ID
+    schema = airtable.get_base_schema()
+    projects_table = None
+    for table in schema.get("tables", []):
+        if table["name"] == "Projects":
+            projects_table = table
+            break
+
+    if not projects_table:
+        return jsonify({"error": "Projects table not found"}), 404
+
+    projects_table_id = projects_table["id"]
+
+    # Create Ofertas G4U table with Name field
+    offerings_table = airtable.create_table("Ofertas G4U", [
+        {"name": "Name", "type": "singleLineText"},
+        {"name": "Descripcion", "type": "multilineText"}
+    ])
+
+    offerings_table_id = offerings_table["id"]
+
+    # Now create Service field in Projects linking to Ofertas G4U
+    service_field = airtable.create_field(
+        projects_table_id,
+        "Service",
+        "multipleRecordLinks",
+        {"linkedTableId": offerings_table_id}
+    )
+
+    # Populate Ofertas G4U with default offerings
+    settings = load_local_settings()
+    offerings = settings.get("service_offerings", [])
+    for offering in offerings:
+        airtable.create("Ofertas G4U", {"Name": offering["name"]})
 
-        # First get the schema to find Projects table ID
-        schema = airtable.get_base_schema()
-        projects_table = None
-        for table in schema.get("tables", []):
-            if table["name"] == "Projects":
-                projects_table = table
-                break
-
-        if not projects_table:
-            return jsonify({"error": "Projects table not found"}), 404
-
-        projects_table_id = projects_table["id"]
-
-        # Create Ofertas G4U table with Name field
-        offerings_table = airtable.create_table("Ofertas G4U", [
-            {"name": "Name", "type": "singleLineText"},
-            {"name": "Descripcion", "type": "multilineText"}
-        ])
-
-        offerings_table_id = offerings_table["id"]
-
-        # Now create Service field in Projects linking to Ofertas G4U
-        service_field = airtable.create_field(
-            projects_table_id,
-            "Service",
-            "multipleRecordLinks",
-            {"linkedTableId": offerings_table_id}
-        )
-
-        # Populate Ofertas G4U with default offerings
-        settings = load_local_settings()
-        offerings = settings.get("service_offerings", [])
-        for offering in offerings:
-            airtable.create("Ofertas G4U", {"Name": offering["name"]})
-
-        return jsonify({
-            "ok": True,
-            "offerings_table_id": offerings_table_id,
-            "service_field_id": service_field.get("id"),
-            "offerings_created": len(offerings)
-        })
+    return jsonify({
+        "ok": True,
+        "offerings_table_id": offerings_table_id,
+        "service_field_id": service_field.get("id"),
+        "offerings_created": len(offerings)
+    })
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/api/projects")
 @require_auth
 def api_projects():
     """Get all projects."""
+    airtable = Airtable()
     try:
-        airtable = Airtable()
-        try:
-            records = airtable.get_all("Projects")
-            projects = []
-            for r in records:
-                # Client and Service are text fields, dates are date fields
-                projects.append({
-                    "id": r.get("id"),
-                    "name": r.get("Name") or r.get("name") or "",
-                    "service": r.get("Service") or r.get("service") or r.get("Oferta G4U") or "",
-                    "client": r.get("Client") or r.get("client") or "",
-                    "status": r.get("Status") or r.get("status") or "Active",
-                    "start_date": r.get("Start Date") or r.get("start_date") or "",
-                    "end_date": r.get("End Date") or r.get("end_date") or ""
-                })
-            return jsonify({"projects": projects})
-        except Exception:
-            return jsonify({"projects": [], "note": "Create 'Projects' table in Airtable with Name, Service, Client, Status fields"})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        records = _get_reference_table(airtable, "Projects")
+        projects = []
+        for r in records:
+            # Client and Service are text fields, dates are date fields
+            projects.append({
+                "id": r.get("id"),
+                "name": _first_value(r, ("Name", "name")),
+                "service": _first_value(r, ("Service", "service", "Oferta G4U")),
+                "client": _first_value(r, ("Client", "client")),
+                "status": _first_value(r, ("Status", "status"), "Active"),
+                "start_date": _first_value(r, ("Start Date", "start_date")),
+                "end_date": _first_value(r, ("End Date", "end_date"))
+            })
+        return _conditional_jsonify({"projects": projects})
+    except Exception:
+        return jsonify({"projects": [], "note": "Create 'Projects' table in Airtable with Name, Service, Client, Status fields"})
 
 @app.route("/api/project", methods=["POST"])
 @require_auth
@@ -1933,49 +2277,46 @@ def api_create_project():
     IMPORTANT: Airtable rejects empty strings for certain field types.
     Only include fields with actual non-empty values.
     """
-    try:
-        data = request.json
-        airtable = Airtable()
-
-        # Build record with only non-empty values
-        record = {}
-
-        name = (data.get("name") or "").strip()
-        if name:
-            record["Name"] = name
-        else:
-            return jsonify({"error": "El nombre del proyecto es requerido"}), 400
-
-        # Service (Oferta G4U) - Linked record to "Ofertas G4U" table
-        # Frontend sends the record ID from Ofertas G4U
-        service = (data.get("service") or "").strip()
-        if service:
-            # Service is a linked record - send as array with single ID
-            record["Service"] = [service]
-
-        status = (data.get("status") or "").strip()
-        if status:
-            record["Status"] = status
-        else:
-            record["Status"] = "Active"  # Default
-
-        client = (data.get("client") or "").strip()
-        if client:
-            record["Client"] = client
-
-        start_date = (data.get("start_date") or "").strip()
-        if start_date:
-            record["Start Date"] = start_date
-
-        end_date = (data.get("end_date") or "").strip()
-        if end_date:
-            record["End Date"] = end_date
-
-        result = airtable.create("Projects", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+
+    # Build record with only non-empty values
+    record = {}
+
+    name = (data.get("name") or "").strip()
+    if name:
+        record["Name"] = name
+    else:
+        return jsonify({"error": "El nombre del proyecto es requerido"}), 400
+
+    # Service (Oferta G4U) - Linked record to "Ofertas G4U" table
+    # Frontend sends the record ID from Ofertas G4U
+    service = (data.get("service") or "").strip()
+    if service:
+        # Service is a linked record - send as array with single ID
+        record["Service"] = [service]
+
+    status = (data.get("status") or "").strip()
+    if status:
+        record["Status"] = status
+    else:
+        record["Status"] = "Active"  # Default
+
+    client = (data.get("client") or "").strip()
+    if client:
+        record["Client"] = client
+
+    start_date = (data.get("start_date") or "").strip()
+    if start_date:
+        record["Start Date"] = start_date
+
+    end_date = (data.get("end_date") or "").strip()
+    if end_date:
+        record["End Date"] = end_date
+
+    result = airtable.create("Projects", record)
+    _invalidate_reference_table(airtable, "Projects")
+    return jsonify({"ok": True, "id": result.get("id")})
 
 @app.route("/api/project/<project_id>", methods=["PUT"])
 @require_auth
@@ -1986,62 +2327,57 @@ def api_update_project(project_id):
     We only include fields that have actual non-empty values.
     To clear a field, send null (but this is handled separately).
     """
-    try:
-        data = request.json
-        airtable = Airtable()
-
-        # Build record only with fields that have actual non-empty values
-        record = {}
-
-        # Name is required
-        name = (data.get("name") or "").strip()
-        if name:
-            record["Name"] = name
-        else:
-            return jsonify({"error": "El nombre del proyecto es requerido"}), 400
-
-        # Status - only add if has value
-        status = (data.get("status") or "").strip()
-        if status:
-            record["Status"] = status
-
-        # Service (Oferta G4U) - Linked record to "Ofertas G4U" table
-        service = (data.get("service") or "").strip()
-        if service:
-            # Service is a linked record - send as array with single ID
-            record["Service"] = [service]
-
-        # Client - text field, only include if has value
-        client = (data.get("client") or "").strip()
-        if client:
-            record["Client"] = client
-        # If empty, don't include - this preserves existing value
-
-        # Date fields - NEVER send empty strings to Date fields
-        start_date = (data.get("start_date") or "").strip()
-        if start_date:
-            record["Start Date"] = start_date
-
-        end_date = (data.get("end_date") or "").strip()
-        if end_date:
-            record["End Date"] = end_date
-
-        airtable.update("Projects", project_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+
+    # Build record only with fields that have actual non-empty values
+    record = {}
+
+    # Name is required
+    name = (data.get("name") or "").strip()
+    if name:
+        record["Name"] = name
+    else:
+        return jsonify({"error": "El nombre del proyecto es requerido"}), 400
+
+    # Status - only add if has value
+    status = (data.get("status") or "").strip()
+    if status:
+        record["Status"] = status
+
+    # Service (Oferta G4U) - Linked record to "Ofertas G4U" table
+    service = (data.get("service") or "").strip()
+    if service:
+        # Service is a linked record - send as array with single ID
+        record["Service"] = [service]
+
+    # Client - text field, only include if has value
+    client = (data.get("client") or "").strip()
+    if client:
+        record["Client"] = client
+    # If empty, don't include - this preserves existing value
+
+    # Date fields - NEVER send empty strings to Date fields
+    start_date = (data.get("start_date") or "").strip()
+    if start_date:
+        record["Start Date"] = start_date
+
+    end_date = (data.get("end_date") or "").strip()
+    if end_date:
+        record["End Date"] = end_date
+
+    airtable.update("Projects", project_id, record)
+    _invalidate_reference_table(airtable, "Projects")
+    return jsonify({"ok": True})
 
 @app.route("/api/project/<project_id>", methods=["DELETE"])
 @require_auth
 def api_delete_project(project_id):
     """Delete a project."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Projects", [project_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Projects", [project_id])
+    _invalidate_reference_table(airtable, "Projects")
+    return jsonify({"ok": True})
 
 # ==================== Clients CRUD ====================
 
@@ -2049,86 +2385,70 @@ def api_delete_project(project_id):
 @require_auth
 def api_clients():
     """Get all clients."""
+    airtable = Airtable()
     try:
-        airtable = Airtable()
-        try:
-            records = airtable.get_all("Clients")
-            clients = []
-            for r in records:
-                clients.append({
-                    "id": r.get("id"),
-                    "name": r.get("Name") or r.get("name") or "",
-                    "contact": r.get("Contact") or r.get("contact") or "",
-                    "email": r.get("Email") or r.get("email") or "",
-                    "phone": r.get("Phone") or r.get("phone") or "",
-                    "notes": r.get("Notes") or r.get("notes") or "",
-                    "status": r.get("Status") or r.get("status") or "Activo"
-                })
-            return jsonify({"clients": clients})
-        except Exception:
-            return jsonify({"clients": [], "note": "Create 'Clients' table in Airtable"})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        records = airtable.get_all("Clients")
+        clients = []
+        for r in records:
+            clients.append({
+                "id": r.get("id"),
+                "name": r.get("Name") or r.get("name") or "",
+                "contact": r.get("Contact") or r.get("contact") or "",
+                "email": r.get("Email") or r.get("email") or "",
+                "phone": r.get("Phone") or r.get("phone") or "",
+                "notes": r.get("Notes") or r.get("notes") or "",
+                "status": r.get("Status") or r.get("status") or "Activo"
+            })
+        return jsonify({"clients": clients})
+    except Exception:
+        return jsonify({"clients": [], "note": "Create 'Clients' table in Airtable"})
 
 @app.route("/api/client", methods=["POST"])
 @require_auth
 def api_create_client():
     """Create a client."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {
-            "Name": data.get("name", ""),
-            "Contact": data.get("contact", ""),
-            "Email": data.get("email", ""),
-            "Phone": data.get("phone", ""),
-            "Notes": data.get("notes", ""),
-            "Status": data.get("status", "Activo")
-        }
-        record = {k: v for k, v in record.items() if v}
-        result = airtable.create("Clients", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {
+        "Name": data.get("name", ""),
+        "Contact": data.get("contact", ""),
+        "Email": data.get("email", ""),
+        "Phone": data.get("phone", ""),
+        "Notes": data.get("notes", ""),
+        "Status": data.get("status", "Activo")
+    }
+    record = {k: v for k, v in record.items() if v}
+    result = airtable.create("Clients", record)
+    return jsonify({"ok": True, "id": result.get("id")})
+
+# Request keys copied as-is onto Clients fields by the update endpoint
+CLIENT_FIELDS = {
+    "name": "Name",
+    "contact": "Contact",
+    "email": "Email",
+    "phone": "Phone",
+    "notes": "Notes",
+    "status": "Status",
+}
+
 
 @app.route("/api/client/<client_id>", methods=["PUT"])
 @require_auth
 def api_update_client(client_id):
     """Update a client."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {}
-        if "name" in data:
-            record["Name"] = data["name"]
-        if "contact" in data:
-            record["Contact"] = data["contact"]
-        if "email" in data:
-            record["Email"] = data["email"]
-        if "phone" in data:
-            record["Phone"] = data["phone"]
-        if "notes" in data:
-            record["Notes"] = data["notes"]
-        if "status" in data:
-            record["Status"] = data["status"]
-        airtable.update("Clients", client_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {CLIENT_FIELDS[k]: v for k, v in data.items() if k in CLIENT_FIELDS}
+    airtable.update("Clients", client_id, record)
+    return jsonify({"ok": True})
 
 @app.route("/api/client/<client_id>", methods=["DELETE"])
 @require_auth
 def api_delete_client(client_id):
     """Delete a client."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Clients", [client_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Clients", [client_id])
+    return jsonify({"ok": True})
 
 # ==================== Categories CRUD ====================
 
@@ -2136,70 +2456,58 @@ def api_delete_client(client_id):
 @require_auth
 def api_categories():
     """Get all categories from Categories table."""
+    airtable = Airtable()
     try:
-        airtable = Airtable()
-        try:
-            records = airtable.get_all("Categories")
-            categories = []
-            for r in records:
-                categories.append({
-                    "id": r.get("id"),
-                    "name": r.get("Name") or r.get("name") or "",
-                    "type": r.get("Type") or r.get("type") or "Expense"  # Income or Expense
-                })
-            return jsonify({"categories": categories})
-        except Exception:
-            return jsonify({"categories": [], "note": "Create 'Categories' table in Airtable with Name, Type (Income/Expense) fields"})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        records = _get_reference_table(airtable, "Categories")
+        categories = []
+        for r in records:
+            categories.append({
+                "id": r.get("id"),
+                "name": _first_value(r, ("Name", "name")),
+                "type": _first_value(r, ("Type", "type"), "Expense")  # Income or Expense
+            })
+        return _conditional_jsonify({"categories": categories})
+    except Exception:
+        return jsonify({"categories": [], "note": "Create 'Categories' table in Airtable with Name, Type (Income/Expense) fields"})
 
 @app.route("/api/category", methods=["POST"])
 @require_auth
 def api_create_category():
     """Create a category in Categories table."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {
-            "Name": data.get("name", ""),
-            "Type": data.get("type", "Expense")
-        }
-        record = {k: v for k, v in record.items() if v}
-        result = airtable.create("Categories", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {
+        "Name": data.get("name", ""),
+        "Type": data.get("type", "Expense")
+    }
+    record = {k: v for k, v in record.items() if v}
+    result = airtable.create("Categories", record)
+    _invalidate_reference_table(airtable, "Categories")
+    return jsonify({"ok": True, "id": result.get("id")})
 
 @app.route("/api/category/<category_id>", methods=["PUT"])
 @require_auth
 def api_update_category(category_id):
     """Update a category in Categories table."""
-    try:
-        data = request.json
-        airtable = Airtable()
-        record = {
-            "Name": data.get("name", ""),
-            "Type": data.get("type", "")
-        }
-        record = {k: v for k, v in record.items() if v is not None and v != ""}
-        airtable.update("Categories", category_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    data = request.json
+    airtable = Airtable()
+    record = {
+        "Name": data.get("name", ""),
+        "Type": data.get("type", "")
+    }
+    record = {k: v for k, v in record.items() if v is not None and v != ""}
+    airtable.update("Categories", category_id, record)
+    _invalidate_reference_table(airtable, "Categories")
+    return jsonify({"ok": True})
 
 @app.route("/api/category/<category_id>", methods=["DELETE"])
 @require_auth
 def api_delete_category(category_id):
     """Delete a category from Categories table."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Categories", [category_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Categories", [category_id])
+    _invalidate_reference_table(airtable, "Categories")
+    return jsonify({"ok": True})
 
 # ==================== Settings/Configuration ====================
 
@@ -2262,16 +2570,29 @@ def save_local_settings(settings):
         except Exception as e:
             print(f"Warning: Could not fetch existing settings: {e}")
 
-        # Update or create each setting key
+        # Update existing keys and create new ones, 10 records per request
+        updates = []
+        creates = []
         for key, value in settings.items():
             value_str = json_module.dumps(value) if not isinstance(value, str) else value
-
             if key in existing:
-                # Update existing record
-                airtable.update("Settings", existing[key], {"Value": value_str})
+                updates.append({"id": existing[key], "fields": {"Value": value_str}})
             else:
-                # Create new record
-                airtable.create("Settings", {"Key": key, "Value": value_str})
+                creates.append({"Key": key, "Value": value_str})
+
+        def update(batch):
+            airtable.update_batch("Settings", batch)
+            return len(batch)
+
+        def create(batch):
+            airtable.create_batch("Settings", batch)
+            return len(batch)
+
+        errors = []
+        _write_batches(update, [updates[i:i+10] for i in range(0, len(updates), 10)], errors)
+        _write_batches(create, [creates[i:i+10] for i in range(0, len(creates), 10)], errors)
+        if errors:
+            raise Exception("; ".join(errors))
 
         return True
     except Exception as e:
@@ -2284,58 +2605,51 @@ def save_local_settings(settings):
 @require_auth
 def api_get_general_expenses_distribution():
     """Get the general expenses distribution configuration."""
+    airtable = Airtable()
     try:
-        airtable = Airtable()
-        try:
-            records = airtable.get_all("Settings")
-            for r in records:
-                if r.get("Key") == "general_expenses_distribution":
-                    distribution = json_module.loads(r.get("Value") or "{}")
-                    return jsonify({"distribution": distribution})
-            return jsonify({"distribution": {}})
-        except Exception:
-            # Fallback to local file
-            settings = load_local_settings()
-            return jsonify({"distribution": settings.get("general_expenses_distribution", {})})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        records = airtable.get_all("Settings")
+        for r in records:
+            if r.get("Key") == "general_expenses_distribution":
+                distribution = json_module.loads(r.get("Value") or "{}")
+                return jsonify({"distribution": distribution})
+        return jsonify({"distribution": {}})
+    except Exception:
+        # Fallback to local file
+        settings = load_local_settings()
+        return jsonify({"distribution": settings.get("general_expenses_distribution", {})})
 
 @app.route("/api/general-expenses-distribution", methods=["POST"])
 @require_auth
 def api_save_general_expenses_distribution():
     """Save the general expenses distribution configuration."""
-    try:
-        data = request.json
-        distribution = data.get("distribution", {})
+    data = request.json
+    distribution = data.get("distribution", {})
 
-        value = json_module.dumps(distribution)
+    value = json_module.dumps(distribution)
 
-        airtable = Airtable()
+    airtable = Airtable()
 
-        # Try to save to Airtable first
-        try:
-            records = airtable.get_all("Settings")
-            existing_id = None
-            for r in records:
-                if r.get("Key") == "general_expenses_distribution":
-                    existing_id = r.get("id")
-                    break
+    # Try to save to Airtable first
+    try:
+        records = airtable.get_all("Settings")
+        existing_id = None
+        for r in records:
+            if r.get("Key") == "general_expenses_distribution":
+                existing_id = r.get("id")
+                break
 
-            if existing_id:
-                airtable.update("Settings", existing_id, {"Value": value})
-            else:
-                airtable.create("Settings", {"Key": "general_expenses_distribution", "Value": value})
+        if existing_id:
+            airtable.update("Settings", existing_id, {"Value": value})
+        else:
+            airtable.create("Settings", {"Key": "general_expenses_distribution", "Value": value})
 
-            return jsonify({"ok": True})
-        except Exception as e:
-            # Fallback to local file
-            settings = load_local_settings()
-            settings["general_expenses_distribution"] = distribution
-            save_local_settings(settings)
-            return jsonify({"ok": True, "note": "Saved to local file (Settings table not found in Airtable)"})
+        return jsonify({"ok": True})
     except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        # Fallback to local file
+        settings = load_local_settings()
+        settings["general_expenses_distribution"] = distribution
+        save_local_settings(settings)
+        return jsonify({"ok": True, "note": "Saved to local file (Settings table not found in Airtable)"})
 
 # ==================== Monthly Distribution ====================
 
@@ -2352,136 +2666,132 @@ def api_get_monthly_distribution():
     - general_expenses: total unassigned expenses for that month
     - active_projects: list of all active projects
     """
-    try:
-        month = request.args.get("month")
-        if not month:
-            return jsonify({"error": "month parameter required (YYYY-MM format)"}), 400
-
-        # Load all monthly distributions from settings
-        settings = load_local_settings()
-        monthly_distributions = settings.get("monthly_distributions", {})
-        month_data = monthly_distributions.get(month, {})
-
-        # Get all projects to build the distribution list
-        airtable = Airtable()
-        projects_raw = airtable.get_all("Projects")
-
-        # Parse month to get date range for checking project activity
-        year, mon = month.split("-")
-        month_start = f"{year}-{mon}-01"
-        import calendar
-        last_day = calendar.monthrange(int(year), int(mon))[1]
-        month_end = f"{year}-{mon}-{last_day:02d}"
-
-        # Find the "General" project (the bucket for distributable expenses)
-        general_project_id = None
-        all_names = []
-        for p in projects_raw:
-            name = p.get("Name") or p.get("name") or ""
-            all_names.append(name)
-            if name.lower() == "general":
-                general_project_id = p.get("id")
-                break
-
-        # Debug: log all project names if General not found
-        if not general_project_id:
-            print(f"DEBUG: Looking for 'General' project in: {all_names}")
-
-        # Build active projects list (excluding "General" project)
-        # A project is active in a month if:
-        # - Its start_date <= month_end AND (end_date is null OR end_date >= month_start)
-        active_projects = []
-        for p in projects_raw:
-            proj_name = p.get("Name") or p.get("name") or "Sin nombre"
-
-            # Skip the "General" project - it's the source, not a destination
-            if proj_name.lower() == "general":
-                continue
-
-            # Check status
-            status = p.get("Status") or p.get("status") or "active"
-            if status.lower() not in ["active", "activo", ""]:
-                continue
-
-            # Check date range for project activity in this month
-            start_date = p.get("Start Date") or p.get("start_date") or ""
-            end_date = p.get("End Date") or p.get("end_date") or ""
-
-            # If no dates set, consider always active
-            is_active_in_month = True
-            if start_date and start_date > month_end:
-                is_active_in_month = False  # Project starts after this month
-            if end_date and end_date < month_start:
-                is_active_in_month = False  # Project ended before this month
-
-            if is_active_in_month:
-                proj = {
-                    "id": p.get("id"),
-                    "name": proj_name,
-                    "client_name": p.get("Client Name") or p.get("client_name") or p.get("Client") or "",
-                    "start_date": start_date,
-                    "end_date": end_date
-                }
-                active_projects.append(proj)
-
-        # Build distributions list with percentages for this month
-        distributions = []
-        for proj in active_projects:
-            pct = month_data.get(proj["id"], 0)
-            distributions.append({
-                "project_id": proj["id"],
-                "project_name": proj["name"],
-                "client_name": proj["client_name"],
-                "percentage": pct,
-                "start_date": proj.get("start_date", ""),
-                "end_date": proj.get("end_date", "")
-            })
+    month = request.args.get("month")
+    if not month:
+        return jsonify({"error": "month parameter required (YYYY-MM format)"}), 400
+
+    # Load all monthly distributions from settings
+    settings = load_local_settings()
+    monthly_distributions = settings.get("monthly_distributions", {})
+    month_data = monthly_distributions.get(month, {})
+
+    # Get all projects to build the distribution list
+    airtable = Airtable()
+    projects_raw = _get_reference_table(airtable, "Projects")
+
+    # Parse month to get date range for checking project activity
+    year, mon = month.split("-")
+    month_start = f"{year}-{mon}-01"
+    import calendar
+    last_day = calendar.monthrange(int(year), int(mon))[1]
+    month_end = f"{year}-{mon}-{last_day:02d}"
+
+    # Find the "General" project (the bucket for distributable expenses)
+    general_project_id = None
+    all_names = []
+    for p in projects_raw:
+        name = p.get("Name") or p.get("name") or ""
+        all_names.append(name)
+        if name.lower() == "general":
+            general_project_id = p.get("id")
+            break
+
+    # Debug: log all project names if General not found
+    if not general_project_id:
+        print(f"DEBUG: Looking for 'General' project in: {all_names}")
+
+    # Build active projects list (excluding "General" project)
+    # A project is active in a month if:
+    # - Its start_date <= month_end AND (end_date is null OR end_date >= month_start)
+    active_projects = []
+    for p in projects_raw:
+        proj_name = p.get("Name") or p.get("name") or "Sin nombre"
+
+        # Skip the "General" project - it's the source, not a destination
+        if proj_name.lower() == "general":
+            continue
+
+        # Check status
+        status = p.get("Status") or p.get("status") or "active"
+        if status.lower() not in ["active", "activo", ""]:
+            continue
+
+        # Check date range for project activity in this month
+        start_date = p.get("Start Date") or p.get("start_date") or ""
+        end_date = p.get("End Date") or p.get("end_date") or ""
+
+        # If no dates set, consider always active
+        is_active_in_month = True
+        if start_date and start_date > month_end:
+            is_active_in_month = False  # Project starts after this month
+        if end_date and end_date < month_start:
+            is_active_in_month = False  # Project ended before this month
+
+        if is_active_in_month:
+            proj = {
+                "id": p.get("id"),
+                "name": proj_name,
+                "client_name": p.get("Client Name") or p.get("client_name") or p.get("Client") or "",
+                "start_date": start_date,
+                "end_date": end_date
+            }
+            active_projects.append(proj)
+
+    # Build distributions list with percentages for this month
+    distributions = []
+    for proj in active_projects:
+        pct = month_data.get(proj["id"], 0)
+        distributions.append({
+            "project_id": proj["id"],
+            "project_name": proj["name"],
+            "client_name": proj["client_name"],
+            "percentage": pct,
+            "start_date": proj.get("start_date", ""),
+            "end_date": proj.get("end_date", "")
+        })
 
-        # Calculate general expenses for this month
-        # "General expenses" = expenses assigned to the "General" project
-        transactions_raw = airtable.get_all("Transactions")
-
-        general_expenses = 0.0
-        for t in transactions_raw:
-            # Check date range - try multiple field names
-            tx_date = (t.get("Settled At") or t.get("Date") or
-                       t.get("settled_at") or t.get("transaction_date") or "")
-            if tx_date < month_start or tx_date > month_end:
-                continue
-
-            # Check if it's an expense (debit)
-            side = t.get("Side") or t.get("side") or ""
-            if side.lower() != "debit":
-                continue
-
-            # Check if excluded
-            is_excluded = t.get("is_excluded") or t.get("Is Excluded") or False
-            if is_excluded:
-                continue
-
-            # Check if assigned to the "General" project
-            # "Project" in Airtable is a linked record (array of IDs)
-            project_field = t.get("Project") or t.get("project_id") or []
-            if isinstance(project_field, list):
-                is_general = general_project_id and general_project_id in project_field
-            else:
-                is_general = general_project_id and project_field == general_project_id
+    # Calculate general expenses for this month
+    # "General expenses" = expenses assigned to the "General" project
+    transactions_raw = airtable.get_all("Transactions")
+
+    general_expenses = 0.0
+    for t in transactions_raw:
+        # Check date range - try multiple field names
+        tx_date = (t.get("Settled At") or t.get("Date") or
+                   t.get("settled_at") or t.get("transaction_date") or "")
+        if tx_date < month_start or tx_date > month_end:
+            continue
+
+        # Check if it's an expense (debit)
+        side = t.get("Side") or t.get("side") or ""
+        if side.lower() != "debit":
+            continue
+
+        # Check if excluded
+        is_excluded = t.get("is_excluded") or t.get("Is Excluded") or False
+        if is_excluded:
+            continue
+
+        # Check if assigned to the "General" project
+        # "Project" in Airtable is a linked record (array of IDs)
+        project_field = t.get("Project") or t.get("project_id") or []
+        if isinstance(project_field, list):
+            is_general = general_project_id and general_project_id in project_field
+        else:
+            is_general = general_project_id and project_field == general_project_id
 
-            if is_general:
-                amount = abs(float(t.get("Amount") or t.get("amount") or 0))
-                general_expenses += amount
+        if is_general:
+            amount = abs(float(t.get("Amount") or t.get("amount") or 0))
+            general_expenses += amount
 
-        return jsonify({
-            "month": month,
-            "distributions": distributions,
-            "general_expenses": round(general_expenses, 2),
-            "active_projects": active_projects,
-            "general_project_id": general_project_id
-        })
+    return jsonify({
+        "month": month,
+        "distributions": distributions,
+        "general_expenses": round(general_expenses, 2),
+        "active_projects": active_projects,
+        "general_project_id": general_project_id
+    })
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/api/monthly-distribution", methods=["POST"])
@@ -2495,35 +2805,31 @@ def api_save_monthly_distribution():
         "distributions": {"project_id_1": 40, "project_id_2": 60, ...}
     }
     """
-    try:
-        data = request.json
-        month = data.get("month")
-        distributions = data.get("distributions", {})
+    data = request.json
+    month = data.get("month")
+    distributions = data.get("distributions", {})
 
-        if not month:
-            return jsonify({"error": "month parameter required"}), 400
+    if not month:
+        return jsonify({"error": "month parameter required"}), 400
 
-        # Validate percentages sum to <= 100
-        total_pct = sum(float(v) for v in distributions.values())
-        if total_pct > 100.01:  # Allow small rounding errors
-            return jsonify({"error": f"Total percentage ({total_pct}%) exceeds 100%"}), 400
+    # Validate percentages sum to <= 100
+    total_pct = sum(float(v) for v in distributions.values())
+    if total_pct > 100.01:  # Allow small rounding errors
+        return jsonify({"error": f"Total percentage ({total_pct}%) exceeds 100%"}), 400
 
-        # Load existing settings and update
-        settings = load_local_settings()
-        if "monthly_distributions" not in settings:
-            settings["monthly_distributions"] = {}
+    # Load existing settings and update
+    settings = load_local_settings()
+    if "monthly_distributions" not in settings:
+        settings["monthly_distributions"] = {}
 
-        # Clean up zero percentages
-        cleaned = {k: v for k, v in distributions.items() if float(v) > 0}
-        settings["monthly_distributions"][month] = cleaned
+    # Clean up zero percentages
+    cleaned = {k: v for k, v in distributions.items() if float(v) > 0}
+    settings["monthly_distributions"][month] = cleaned
 
-        save_local_settings(settings)
+    save_local_settings(settings)
 
-        return jsonify({"ok": True, "month": month, "total_percentage": total_pct})
+    return jsonify({"ok": True, "month": month, "total_percentage": total_pct})
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/api/monthly-distribution/all", methods=["GET"])
@@ -2533,17 +2839,13 @@ def api_get_all_monthly_distributions():
 
     Returns all months with their distribution configurations.
     """
-    try:
-        settings = load_local_settings()
-        monthly_distributions = settings.get("monthly_distributions", {})
+    settings = load_local_settings()
+    monthly_distributions = settings.get("monthly_distributions", {})
 
-        return jsonify({
-            "monthly_distributions": monthly_distributions
-        })
+    return jsonify({
+        "monthly_distributions": monthly_distributions
+    })
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 # ==================== Service Offerings (Ofertas G4U) ====================
@@ -2552,65 +2854,57 @@ def api_get_all_monthly_distributions():
 @require_auth
 def api_get_offerings():
     """Get list of service offerings (Ofertas G4U) from Airtable."""
+    airtable = Airtable()
+    # Get offerings from Airtable table "Ofertas G4U"
     try:
-        airtable = Airtable()
-        # Get offerings from Airtable table "Ofertas G4U"
-        try:
-            records = airtable.get_all("Ofertas G4U")
-            offerings = []
-            for rec in records:
-                # Note: get_all() flattens fields into the record dict
-                name = rec.get("Name", "")
-                if name:  # Only include offerings with a name
-                    offerings.append({
-                        "id": rec.get("id"),  # Airtable record ID for linking
-                        "name": name,
-                        "description": rec.get("Descripcion", "")
-                    })
-            return jsonify({"offerings": offerings, "source": "airtable"})
-        except Exception as airtable_error:
-            # Fallback to local settings if Airtable table doesn't exist
-            settings = load_local_settings()
-            offerings = settings.get("service_offerings", [
-                {"id": "GTM", "name": "GTM (Go-To-Market)"},
-                {"id": "Consulting", "name": "Consulting"},
-                {"id": "Training", "name": "Training"},
-                {"id": "Development", "name": "Development"},
-                {"id": "Marketing", "name": "Marketing"},
-                {"id": "Other", "name": "Otro"}
-            ])
-            return jsonify({"offerings": offerings, "source": "local", "airtable_error": str(airtable_error)})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        records = airtable.get_all("Ofertas G4U")
+        offerings = []
+        for rec in records:
+            # Note: get_all() flattens fields into the record dict
+            name = rec.get("Name", "")
+            if name:  # Only include offerings with a name
+                offerings.append({
+                    "id": rec.get("id"),  # Airtable record ID for linking
+                    "name": name,
+                    "description": rec.get("Descripcion", "")
+                })
+        return jsonify({"offerings": offerings, "source": "airtable"})
+    except Exception as airtable_error:
+        # Fallback to local settings if Airtable table doesn't exist
+        settings = load_local_settings()
+        offerings = settings.get("service_offerings", [
+            {"id": "GTM", "name": "GTM (Go-To-Market)"},
+            {"id": "Consulting", "name": "Consulting"},
+            {"id": "Training", "name": "Training"},
+            {"id": "Development", "name": "Development"},
+            {"id": "Marketing", "name": "Marketing"},
+            {"id": "Other", "name": "Otro"}
+        ])
+        return jsonify({"offerings": offerings, "source": "local", "airtable_error": str(airtable_error)})
 
 
 @app.route("/api/settings/offerings", methods=["POST"])
 @require_auth
 def api_save_offerings():
     """Save list of service offerings (Ofertas G4U)."""
-    try:
-        data = request.json
-        offerings = data.get("offerings", [])
+    data = request.json
+    offerings = data.get("offerings", [])
 
-        # Validate offerings structure
-        for offering in offerings:
-            if not offering.get("id") or not offering.get("name"):
-                return jsonify({"error": "Cada oferta debe tener ID y nombre"}), 400
+    # Validate offerings structure
+    for offering in offerings:
+        if not offering.get("id") or not offering.get("name"):
+            return jsonify({"error": "Cada oferta debe tener ID y nombre"}), 400
 
-        # Load current settings
-        settings = load_local_settings()
+    # Load current settings
+    settings = load_local_settings()
 
-        # Update offerings
-        settings["service_offerings"] = offerings
+    # Update offerings
+    settings["service_offerings"] = offerings
 
-        # Save settings
-        save_local_settings(settings)
+    # Save settings
+    save_local_settings(settings)
 
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({"ok": True})
 
 
 # ==================== Excluded Transactions ====================
@@ -2619,168 +2913,179 @@ def api_save_offerings():
 @require_auth
 def api_get_excluded_transactions():
     """Get list of excluded transaction IDs."""
-    try:
-        settings = load_local_settings()
-        excluded = settings.get("excluded_transactions", [])
-        return jsonify({"excluded": excluded})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    settings = load_local_settings()
+    excluded = settings.get("excluded_transactions", [])
+    return jsonify({"excluded": excluded})
 
 
 # ==================== Transaction Updates ====================
 
+# Request keys copied as-is onto Transactions fields; the rest need conversion below
+TX_FIELDS = {
+    "category": "Category",
+    "project_id": "Project",
+    "description": "Description",
+}
+
+
 @app.route("/api/transaction/<tx_id>", methods=["PUT"])
 @require_auth
 def api_update_transaction(tx_id):
     """Update a transaction (category, project, client assignment, etc)."""
-    try:
-        data = request.json
-        airtable = Airtable()
+    data = request.json
+    airtable = Airtable()
+
+    record = {TX_FIELDS[k]: v for k, v in data.items() if k in TX_FIELDS}
+    if "client_id" in data:
+        # Client is a linked record - send as array of record IDs
+        client_id = data["client_id"]
+        record["Client"] = [client_id] if client_id else []
+    if "counterparty_name" in data:
+        # Try multiple possible field names
+        record["Counterparty Name"] = data["counterparty_name"]
+        record["Description"] = data["counterparty_name"]  # Also update Description
+    if "vat_amount" in data:
+        # VAT Amount - user can edit this directly
+        record["VAT Amount"] = float(data["vat_amount"]) if data["vat_amount"] else 0
+    if "vat_rate" in data:
+        # VAT Rate (%) - calculate VAT from rate and amount
+        # Formula: amount includes VAT, so VAT = amount × rate / (100 + rate)
+        vat_rate = float(data.get("vat_rate", 0))
+        amount = float(data.get("amount", 0))
+        if vat_rate > 0 and amount > 0:
+            vat_amount = abs(amount) * vat_rate / (100 + vat_rate)
+            record["VAT Amount"] = round(vat_amount, 2)
+        elif vat_rate == 0:
+            record["VAT Amount"] = 0
+    if "is_excluded" in data:
+        # Store excluded transactions locally (not in Airtable)
+        settings = load_local_settings()
+        excluded_txs = settings.get("excluded_transactions", [])
+        if bool(data["is_excluded"]):
+            if tx_id not in excluded_txs:
+                excluded_txs.append(tx_id)
+        else:
+            excluded_txs = [x for x in excluded_txs if x != tx_id]
+        settings["excluded_transactions"] = excluded_txs
+        save_local_settings(settings)
+        # Don't add to Airtable record - handle separately
+
+    if record:
+        airtable.update("Transactions", tx_id, record)
+    return jsonify({"ok": True})
+
+# Values are inserted already quoted with _formula_str
+SALARY_ALLOC_LOOKUP_FORMULA = "AND({{Team Member ID}}={member}, {{Project ID}}={project}, {{Month}}={month})"
+
+
+def _get_salary_allocations(airtable, month=None):
+    """Get Salary Allocations records, optionally for one YYYY-MM month, cached for SALARY_ALLOC_CACHE_TTL."""
+    month = month or None
+    cache_key = (airtable.base_id, month)
+    cached = _salary_alloc_cache.get(cache_key)
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    # Let Airtable filter by month instead of downloading every allocation, on
+    # whichever month field the table has. Without a known one, filter here.
+    alloc_table = next((t for t in airtable.get_tables() if t.get("name") == "Salary Allocations"), None)
+    alloc_fields = {f.get("name") for f in alloc_table.get("fields", [])} if alloc_table else set()
+    month_fields = _present_fields(alloc_fields, ["Month", "month"])
+    if month and month_fields:
+        records = airtable.get_all("Salary Allocations", formula=f"{{{month_fields[0]}}}={_formula_str(month)}")
+    else:
+        records = airtable.get_all("Salary Allocations")
+        if month:
+            records = [r for r in records if _first_value(r, ("Month", "month")) == month]
+    _salary_alloc_cache[cache_key] = (records, time.time() + SALARY_ALLOC_CACHE_TTL)
+    return records
 
-        record = {}
-        if "category" in data:
-            record["Category"] = data["category"]
-        if "project_id" in data:
-            record["Project"] = data["project_id"]
-        if "client_id" in data:
-            # Client is a linked record - send as array of record IDs
-            client_id = data["client_id"]
-            record["Client"] = [client_id] if client_id else []
-        if "description" in data:
-            record["Description"] = data["description"]
-        if "counterparty_name" in data:
-            # Try multiple possible field names
-            record["Counterparty Name"] = data["counterparty_name"]
-            record["Description"] = data["counterparty_name"]  # Also update Description
-        if "vat_amount" in data:
-            # VAT Amount - user can edit this directly
-            record["VAT Amount"] = float(data["vat_amount"]) if data["vat_amount"] else 0
-        if "vat_rate" in data:
-            # VAT Rate (%) - calculate VAT from rate and amount
-            # Formula: amount includes VAT, so VAT = amount × rate / (100 + rate)
-            vat_rate = float(data.get("vat_rate", 0))
-            amount = float(data.get("amount", 0))
-            if vat_rate > 0 and amount > 0:
-                vat_amount = abs(amount) * vat_rate / (100 + vat_rate)
-                record["VAT Amount"] = round(vat_amount, 2)
-            elif vat_rate == 0:
-                record["VAT Amount"] = 0
-        if "is_excluded" in data:
-            # Store excluded transactions locally (not in Airtable)
-            settings = load_local_settings()
-            excluded_txs = settings.get("excluded_transactions", [])
-            if bool(data["is_excluded"]):
-                if tx_id not in excluded_txs:
-                    excluded_txs.append(tx_id)
-            else:
-                excluded_txs = [x for x in excluded_txs if x != tx_id]
-            settings["excluded_transactions"] = excluded_txs
-            save_local_settings(settings)
-            # Don't add to Airtable record - handle separately
-
-        if record:
-            airtable.update("Transactions", tx_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 @app.route("/api/salary-allocations")
 @require_auth
 def api_salary_allocations():
-    """Get salary allocations. Optional ?month=YYYY-MM parameter."""
-    try:
-        airtable = Airtable()
-        month = request.args.get("month")  # Format: YYYY-MM
-
-        try:
-            records = airtable.get_all("Salary Allocations")
-            allocations = []
-            for r in records:
-                alloc = {
-                    "id": r.get("id"),
-                    "team_member_id": r.get("Team Member ID") or r.get("team_member_id") or "",
-                    "team_member_name": r.get("Team Member Name") or r.get("team_member_name") or "",
-                    "project_id": r.get("Project ID") or r.get("project_id") or "",
-                    "project_name": r.get("Project Name") or r.get("project_name") or "",
-                    "percentage": float(r.get("Percentage") or r.get("percentage") or 0),
-                    "month": r.get("Month") or r.get("month") or "",  # Format: YYYY-MM
-                    "amount": float(r.get("Amount") or r.get("amount") or 0)
-                }
-                # Filter by month if specified
-                if month and alloc["month"] != month:
-                    continue
-                allocations.append(alloc)
-            return jsonify({"allocations": allocations})
-        except Exception:
-            return jsonify({"allocations": [], "note": "Create 'Salary Allocations' table in Airtable"})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    """Get salary allocations. Optional ?month=YYYY-MM parameter."""
+    airtable = Airtable()
+    month = request.args.get("month")  # Format: YYYY-MM
+
+    try:
+        records = _get_salary_allocations(airtable, month)
+        allocations = []
+        for r in records:
+            alloc = {
+                "id": r.get("id"),
+                "team_member_id": _first_value(r, ("Team Member ID", "team_member_id")),
+                "team_member_name": _first_value(r, ("Team Member Name", "team_member_name")),
+                "project_id": _first_value(r, ("Project ID", "project_id")),
+                "project_name": _first_value(r, ("Project Name", "project_name")),
+                "percentage": float(_first_value(r, ("Percentage", "percentage"), 0)),
+                "month": _first_value(r, ("Month", "month")),  # Format: YYYY-MM
+                "amount": float(_first_value(r, ("Amount", "amount"), 0))
+            }
+            allocations.append(alloc)
+        return jsonify({"allocations": allocations})
+    except Exception:
+        return jsonify({"allocations": [], "note": "Create 'Salary Allocations' table in Airtable"})
 
 @app.route("/api/salary-allocation", methods=["POST"])
 @require_auth
 def api_save_salary_allocation():
     """Save or update a salary allocation for a specific month."""
+    data = request.json
+    airtable = Airtable()
+
+    month = data.get("month")  # Required: YYYY-MM
+    team_member_id = data.get("team_member_id")
+    team_member_name = data.get("team_member_name", "")
+    project_id = data.get("project_id")
+    project_name = data.get("project_name", "")
+    percentage = float(data.get("percentage", 0))
+    amount = float(data.get("amount", 0))
+
+    if not month or not team_member_id or not project_id:
+        return jsonify({"error": "month, team_member_id and project_id are required"}), 400
+
+    # Check if allocation already exists for this member/project/month
+    existing_id = None
     try:
-        data = request.json
-        airtable = Airtable()
-
-        month = data.get("month")  # Required: YYYY-MM
-        team_member_id = data.get("team_member_id")
-        team_member_name = data.get("team_member_name", "")
-        project_id = data.get("project_id")
-        project_name = data.get("project_name", "")
-        percentage = float(data.get("percentage", 0))
-        amount = float(data.get("amount", 0))
-
-        if not month or not team_member_id:
-            return jsonify({"error": "month and team_member_id are required"}), 400
-
-        # Check if allocation already exists for this member/project/month
-        existing_id = None
-        try:
-            formula = f"AND({{Team Member ID}}='{team_member_id}', {{Project ID}}='{project_id}', {{Month}}='{month}')"
-            existing = airtable.get_all("Salary Allocations", formula=formula)
-            if existing:
-                existing_id = existing[0].get("id")
-        except Exception:
-            pass
-
-        record = {
-            "Team Member ID": team_member_id,
-            "Team Member Name": team_member_name,
-            "Project ID": project_id,
-            "Project Name": project_name,
-            "Percentage": percentage,
-            "Month": month,
-            "Amount": amount
-        }
-        record = {k: v for k, v in record.items() if v is not None}
+        formula = SALARY_ALLOC_LOOKUP_FORMULA.format(
+            member=_formula_str(team_member_id), project=_formula_str(project_id), month=_formula_str(month)
+        )
+        existing = airtable.get_all("Salary Allocations", formula=formula)
+        if existing:
+            existing_id = existing[0].get("id")
+    except Exception:
+        pass
+
+    record = {
+        "Team Member ID": team_member_id,
+        "Team Member Name": team_member_name,
+        "Project ID": project_id,
+        "Project Name": project_name,
+        "Percentage": percentage,
+        "Month": month,
+        "Amount": amount
+    }
+    record = {k: v for k, v in record.items() if v is not None}
 
-        if existing_id:
-            # Update existing allocation
-            result = airtable.update("Salary Allocations", existing_id, record)
-        else:
-            # Create new allocation
-            result = airtable.create("Salary Allocations", record)
+    if existing_id:
+        # Update existing allocation
+        result = airtable.update("Salary Allocations", existing_id, record)
+    else:
+        # Create new allocation
+        result = airtable.create("Salary Allocations", record)
+    _salary_alloc_cache.clear()
 
-        return jsonify({"ok": True, "id": result.get("id") or existing_id})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({"ok": True, "id": result.get("id") or existing_id})
 
 @app.route("/api/salary-allocation/<allocation_id>", methods=["DELETE"])
 @require_auth
 def api_delete_salary_allocation(allocation_id):
     """Delete a salary allocation."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Salary Allocations", [allocation_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Salary Allocations", [allocation_id])
+    _salary_alloc_cache.clear()
+    return jsonify({"ok": True})
 
 # ==================== Transaction Allocations ====================
 
@@ -2788,733 +3093,646 @@ def api_delete_salary_allocation(allocation_id):
 @require_auth
 def api_transaction_allocations():
     """Get all transaction allocations."""
-    try:
-        airtable = Airtable()
-        records = airtable.get_all("Transaction Allocations")
-        allocations = []
-        for r in records:
-            # Linked records return arrays
-            tx_field = r.get("Transaction") or []
-            tx_id = tx_field[0] if isinstance(tx_field, list) and tx_field else ""
-            proj_field = r.get("Project") or []
-            proj_id = proj_field[0] if isinstance(proj_field, list) and proj_field else ""
-            client_field = r.get("Client") or []
-            client_id = client_field[0] if isinstance(client_field, list) and client_field else ""
-
-            allocations.append({
-                "id": r.get("id"),
-                "transaction_id": tx_id,
-                "project_id": proj_id,
-                "client_id": client_id,
-                "category": _extract_linked_or_string(r, ["Category"]),
-                "percentage": (float(r.get("Percentage") or 0) * 100) if (float(r.get("Percentage") or 0) <= 1) else float(r.get("Percentage") or 0)
-            })
-        return jsonify({"allocations": allocations})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    airtable = Airtable()
+    records = airtable.get_all("Transaction Allocations")
+    allocations = []
+    for r in records:
+        # Linked records return arrays
+        tx_field = r.get("Transaction") or []
+        tx_id = tx_field[0] if isinstance(tx_field, list) and tx_field else ""
+        proj_field = r.get("Project") or []
+        proj_id = proj_field[0] if isinstance(proj_field, list) and proj_field else ""
+        client_field = r.get("Client") or []
+        client_id = client_field[0] if isinstance(client_field, list) and client_field else ""
+
+        allocations.append({
+            "id": r.get("id"),
+            "transaction_id": tx_id,
+            "project_id": proj_id,
+            "client_id": client_id,
+            "category": _extract_linked_or_string(r, ["Category"]),
+            "percentage": (float(r.get("Percentage") or 0) * 100) if (float(r.get("Percentage") or 0) <= 1) else float(r.get("Percentage") or 0)
+        })
+    return jsonify({"allocations": allocations})
 
 @app.route("/api/transaction-allocations/<transaction_id>")
 @require_auth
 def api_transaction_allocations_by_tx(transaction_id):
     """Get allocations for a specific transaction."""
-    try:
-        airtable = Airtable()
-        records = airtable.get_all("Transaction Allocations")
-        allocations = []
-        for r in records:
-            tx_field = r.get("Transaction") or []
-            tx_id = tx_field[0] if isinstance(tx_field, list) and tx_field else ""
-            if tx_id != transaction_id:
-                continue
-            proj_field = r.get("Project") or []
-            proj_id = proj_field[0] if isinstance(proj_field, list) and proj_field else ""
-            client_field = r.get("Client") or []
-            client_id = client_field[0] if isinstance(client_field, list) and client_field else ""
-
-            allocations.append({
-                "id": r.get("id"),
-                "transaction_id": tx_id,
-                "project_id": proj_id,
-                "client_id": client_id,
-                "category": _extract_linked_or_string(r, ["Category"]),
-                "percentage": (float(r.get("Percentage") or 0) * 100) if (float(r.get("Percentage") or 0) <= 1) else float(r.get("Percentage") or 0)
-            })
-        return jsonify({"allocations": allocations})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    records = airtable.get_all("Transaction Allocations")
+    allocations = []
+    for r in records:
+        tx_field = r.get("Transaction") or []
+        tx_id = tx_field[0] if isinstance(tx_field, list) and tx_field else ""
+        if tx_id != transaction_id:
+            continue
+        proj_field = r.get("Project") or []
+        proj_id = proj_field[0] if isinstance(proj_field, list) and proj_field else ""
+        client_field = r.get("Client") or []
+        client_id = client_field[0] if isinstance(client_field, list) and client_field else ""
+
+        allocations.append({
+            "id": r.get("id"),
+            "transaction_id": tx_id,
+            "project_id": proj_id,
+            "client_id": client_id,
+            "category": _extract_linked_or_string(r, ["Category"]),
+            "percentage": (float(r.get("Percentage") or 0) * 100) if (float(r.get("Percentage") or 0) <= 1) else float(r.get("Percentage") or 0)
+        })
+    return jsonify({"allocations": allocations})
+
+def _allocation_record(data):
+    """Build Airtable fields for a transaction allocation from the request payload."""
+    # Airtable Percent field expects decimal (0.5 = 50%)
+    pct_value = float(data.get("percentage", 100)) / 100
+    record = {
+        "Percentage": pct_value
+    }
+    # Linked records must be arrays
+    if data.get("transaction_id"):
+        record["Transaction"] = [data["transaction_id"]]
+    if data.get("project_id"):
+        record["Project"] = [data["project_id"]]
+    if data.get("client_id"):
+        record["Client"] = [data["client_id"]]
+    # Category is a text field
+    if data.get("category"):
+        record["Category"] = data["category"]
+    return record
+
 
 @app.route("/api/transaction-allocation", methods=["POST"])
 @require_auth
 def api_create_transaction_allocation():
     """Create a new transaction allocation."""
-    try:
-        data = request.json
-        airtable = Airtable()
+    data = request.json
+    airtable = Airtable()
 
-        # Airtable Percent field expects decimal (0.5 = 50%)
-        pct_value = float(data.get("percentage", 100)) / 100
-        record = {
-            "Percentage": pct_value
-        }
-        # Linked records must be arrays
-        if data.get("transaction_id"):
-            record["Transaction"] = [data["transaction_id"]]
-        if data.get("project_id"):
-            record["Project"] = [data["project_id"]]
-        if data.get("client_id"):
-            record["Client"] = [data["client_id"]]
-        # Category is a text field
-        if data.get("category"):
-            record["Category"] = data["category"]
-
-        result = airtable.create("Transaction Allocations", record)
-        return jsonify({"ok": True, "id": result.get("id")})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    result = airtable.create("Transaction Allocations", _allocation_record(data))
+    return jsonify({"ok": True, "id": result.get("id")})
+
+@app.route("/api/transaction-allocations/batch", methods=["POST"])
+@require_auth
+def api_create_transaction_allocations_batch():
+    """Create many transaction allocations, 10 per Airtable request, several requests in flight."""
+    data = request.json or {}
+    records = [_allocation_record(a) for a in data.get("allocations", [])]
+    airtable = Airtable()
+
+    def create(batch):
+        airtable.create_batch("Transaction Allocations", batch)
+        return len(batch)
+
+    errors = []
+    batches = [records[i:i+10] for i in range(0, len(records), 10)]
+    # Every batch is attempted, as before; a failed one doesn't stop the rest
+    created = _write_batches(create, batches, errors, max_errors=len(batches))
+
+    return jsonify({"ok": not errors, "created": created, "failed": len(records) - created, "errors": errors or None})
 
 @app.route("/api/transaction-allocation/<allocation_id>", methods=["PUT"])
 @require_auth
 def api_update_transaction_allocation(allocation_id):
     """Update a transaction allocation."""
-    try:
-        data = request.json
-        airtable = Airtable()
+    data = request.json
+    airtable = Airtable()
+
+    record = {}
+    if "project_id" in data:
+        record["Project"] = [data["project_id"]] if data["project_id"] else []
+    if "client_id" in data:
+        record["Client"] = [data["client_id"]] if data["client_id"] else []
+    if "percentage" in data:
+        # Airtable Percent field expects decimal (0.5 = 50%)
+        record["Percentage"] = float(data["percentage"]) / 100
 
-        record = {}
-        if "project_id" in data:
-            record["Project"] = [data["project_id"]] if data["project_id"] else []
-        if "client_id" in data:
-            record["Client"] = [data["client_id"]] if data["client_id"] else []
-        if "percentage" in data:
-            # Airtable Percent field expects decimal (0.5 = 50%)
-            record["Percentage"] = float(data["percentage"]) / 100
-
-        airtable.update("Transaction Allocations", allocation_id, record)
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable.update("Transaction Allocations", allocation_id, record)
+    return jsonify({"ok": True})
 
 @app.route("/api/transaction-allocation/<allocation_id>", methods=["DELETE"])
 @require_auth
 def api_delete_transaction_allocation(allocation_id):
     """Delete a transaction allocation."""
-    try:
-        airtable = Airtable()
-        airtable.delete_batch("Transaction Allocations", [allocation_id])
-        return jsonify({"ok": True})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    airtable = Airtable()
+    airtable.delete_batch("Transaction Allocations", [allocation_id])
+    return jsonify({"ok": True})
 
 @app.route("/api/project-costs")
 @require_auth
 def api_project_costs():
     """Get project costs including salary allocations for a given month."""
-    try:
-        airtable = Airtable()
-        month = request.args.get("month")  # Optional: YYYY-MM
-
-        # Get salary allocations
-        allocations = []
-        try:
-            records = airtable.get_all("Salary Allocations")
-            for r in records:
-                alloc_month = r.get("Month") or ""
-                if month and alloc_month != month:
-                    continue
-                allocations.append({
-                    "project_id": r.get("Project ID") or "",
-                    "amount": float(r.get("Amount") or 0)
-                })
-        except Exception:
-            pass
+    airtable = Airtable()
+    month = request.args.get("month")  # Optional: YYYY-MM
 
-        # Aggregate by project
-        by_project = {}
-        for a in allocations:
-            pid = a["project_id"]
-            if pid not in by_project:
-                by_project[pid] = 0
-            by_project[pid] += a["amount"]
+    # Sum salary allocations by project
+    by_project = Counter()
+    try:
+        for r in _get_salary_allocations(airtable, month):
+            by_project[r.get("Project ID") or ""] += float(r.get("Amount") or 0)
+    except Exception:
+        pass
 
-        return jsonify({"salary_costs": by_project})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({"salary_costs": dict(by_project)})
 
 @app.route("/api/cleanup-duplicates", methods=["POST"])
 def api_cleanup_duplicates():
     """Remove duplicate transactions, keeping only the first occurrence of each Qonto Transaction ID."""
-    try:
-        airtable = Airtable()
-        records = airtable.get_all("Transactions")
+    airtable = Airtable()
+
+    # Find records to delete in one pass: the first record seen for each Qonto ID
+    # is kept, every later one is a duplicate
+    seen = set()
+    to_delete = []
+    for r in airtable.iter_all("Transactions"):
+        qonto_id = r.get("Qonto Transaction ID", "")
+        if not qonto_id:
+            continue
+        if qonto_id in seen:
+            to_delete.append(r.get("id"))
+        else:
+            seen.add(qonto_id)
 
-        # Group records by Qonto Transaction ID
-        by_qonto_id = {}
-        for r in records:
-            qonto_id = r.get("Qonto Transaction ID", "")
-            if qonto_id:
-                if qonto_id not in by_qonto_id:
-                    by_qonto_id[qonto_id] = []
-                by_qonto_id[qonto_id].append(r.get("id"))
-
-        # Find records to delete (all but the first for each Qonto ID)
-        to_delete = []
-        for qonto_id, record_ids in by_qonto_id.items():
-            if len(record_ids) > 1:
-                # Keep the first, delete the rest
-                to_delete.extend(record_ids[1:])
-
-        if not to_delete:
-            return jsonify({"message": "No duplicates found", "deleted": 0})
-
-        # Delete in batches of 10
-        deleted = 0
-        errors = []
-        for i in range(0, len(to_delete), 10):
-            batch = to_delete[i:i+10]
-            try:
-                airtable.delete_batch("Transactions", batch)
-                deleted += len(batch)
-            except Exception as e:
-                errors.append(str(e)[:100])
-                if len(errors) >= 3:
-                    break
+    if not to_delete:
+        return jsonify({"message": "No duplicates found", "deleted": 0})
 
-        return jsonify({
-            "deleted": deleted,
-            "total_duplicates": len(to_delete),
-            "remaining": len(to_delete) - deleted,
-            "errors": errors if errors else None
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    # Delete in batches of 10 (Airtable limit), several batches in flight at once
+    def delete(batch):
+        airtable.delete_batch("Transactions", batch)
+        return len(batch)
+
+    errors = []
+    batches = [to_delete[i:i+10] for i in range(0, len(to_delete), 10)]
+    deleted = _write_batches(delete, batches, errors)
+
+    return jsonify({
+        "deleted": deleted,
+        "total_duplicates": len(to_delete),
+        "remaining": len(to_delete) - deleted,
+        "errors": errors if errors else None
+    })
 
 # ==================== Qonto Extended Data ====================
 
 @app.route("/api/qonto/labels")
 def api_qonto_labels():
     """Get all labels from Qonto."""
-    try:
-        qonto = Qonto()
-        labels = qonto.get_labels()
-        return jsonify({
-            "labels": [
-                {
-                    "id": l.get("id"),
-                    "name": l.get("name"),
-                    "parent_id": l.get("parent_id")
-                }
-                for l in labels
-            ],
-            "count": len(labels)
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    qonto = Qonto()
+    labels = qonto.get_labels()
+    return jsonify({
+        "labels": [
+            {
+                "id": l.get("id"),
+                "name": l.get("name"),
+                "parent_id": l.get("parent_id")
+            }
+            for l in labels
+        ],
+        "count": len(labels)
+    })
 
 @app.route("/api/qonto/sync-labels", methods=["POST"])
 def api_qonto_sync_labels():
     """Sync Qonto labels to Categories table."""
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
+    qonto = Qonto()
+    airtable = Airtable()
 
-        # Get labels from Qonto
-        qonto_labels = qonto.get_labels()
-        if not qonto_labels:
-            return jsonify({"error": "No labels found in Qonto or API error"})
+    # Get labels from Qonto
+    qonto_labels = qonto.get_labels()
+    if not qonto_labels:
+        return jsonify({"error": "No labels found in Qonto or API error"})
 
-        # Get existing categories
-        existing = []
-        try:
-            existing = airtable.get_all("Categories")
-        except:
-            pass
+    # Get existing categories
+    existing = []
+    try:
+        existing = airtable.get_all("Categories")
+    except:
+        pass
 
-        existing_names = {c.get("Name", "").lower() for c in existing}
+    existing_names = {c.get("Name", "").lower() for c in existing}
 
-        # Create new categories from Qonto labels
-        created = 0
-        skipped = 0
-        for label in qonto_labels:
-            name = label.get("name", "")
-            if not name:
-                continue
+    # Create new categories from Qonto labels
+    created = 0
+    skipped = 0
+    for label in qonto_labels:
+        name = label.get("name", "")
+        if not name:
+            continue
 
-            if name.lower() in existing_names:
-                skipped += 1
-                continue
+        if name.lower() in existing_names:
+            skipped += 1
+            continue
 
-            try:
-                airtable.create("Categories", {
-                    "Name": name,
-                    "Type": "Expense"  # Default to expense, user can change
-                })
-                created += 1
-                existing_names.add(name.lower())
-            except Exception as e:
-                pass
+        try:
+            airtable.create("Categories", {
+                "Name": name,
+                "Type": "Expense"  # Default to expense, user can change
+            })
+            created += 1
+            existing_names.add(name.lower())
+        except Exception as e:
+            pass
+    _invalidate_reference_table(airtable, "Categories")
 
-        return jsonify({
-            "qonto_labels": len(qonto_labels),
-            "created": created,
-            "skipped": skipped
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({
+        "qonto_labels": len(qonto_labels),
+        "created": created,
+        "skipped": skipped
+    })
 
 @app.route("/api/qonto/update-vat", methods=["POST"])
 def api_qonto_update_vat():
     """Update existing transactions with VAT amount from Qonto."""
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
+    qonto = Qonto()
+    airtable = Airtable()
+
+    slug = qonto.get_bank_account_id()
+    if not slug:
+        return jsonify({"error": "Could not get bank account slug"})
+
+    qonto_txs = qonto.get_all_transactions(slug)
+    if not qonto_txs:
+        return jsonify({"error": "No transactions from Qonto"})
+
+    # Build map of Qonto transaction_id -> vat_amount
+    qonto_vat_map = {}
+    for tx in qonto_txs:
+        tx_id = tx.get("transaction_id", "")
+        vat = tx.get("vat_amount") or tx.get("vat_amount_cents") or 0
+        if tx_id and vat:
+            vat_float = float(vat)
+            # Convert cents to euros if needed
+            if vat_float > 1000 and tx.get("vat_amount_cents"):
+                vat_float = vat_float / 100
+            qonto_vat_map[tx_id] = vat_float
+
+    # Find transactions table
+    table_name = None
+    vat_field = None
+    t = _find_transactions_table(airtable.get_tables())
+    if t:
+        table_name = t.get("name")
+        table_fields = {f.get("name") for f in t.get("fields", [])}
+        # Find VAT field
+        for f in t.get("fields", []):
+            if f.get("name", "").lower() in ["vat amount", "vat_amount", "iva"]:
+                vat_field = f.get("name")
+                break
 
-        slug = qonto.get_bank_account_id()
-        if not slug:
-            return jsonify({"error": "Could not get bank account slug"})
-
-        qonto_txs = qonto.get_all_transactions(slug)
-        if not qonto_txs:
-            return jsonify({"error": "No transactions from Qonto"})
-
-        # Build map of Qonto transaction_id -> vat_amount
-        qonto_vat_map = {}
-        for tx in qonto_txs:
-            tx_id = tx.get("transaction_id", "")
-            vat = tx.get("vat_amount") or tx.get("vat_amount_cents") or 0
-            if tx_id and vat:
-                vat_float = float(vat)
-                # Convert cents to euros if needed
-                if vat_float > 1000 and tx.get("vat_amount_cents"):
-                    vat_float = vat_float / 100
-                qonto_vat_map[tx_id] = vat_float
-
-        # Find transactions table
-        table_name = None
-        vat_field = None
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
-            )
-            if r.status_code == 200:
-                tables = r.json().get("tables", [])
-                for t in tables:
-                    name_lower = t.get("name", "").lower()
-                    if ("trans" in name_lower or "movimiento" in name_lower) and "alloc" not in name_lower:
-                        table_name = t.get("name")
-                        # Find VAT field
-                        for f in t.get("fields", []):
-                            if f.get("name", "").lower() in ["vat amount", "vat_amount", "iva"]:
-                                vat_field = f.get("name")
-                                break
-                        break
-
-        if not table_name:
-            return jsonify({"error": "No transactions table found"})
-        if not vat_field:
-            return jsonify({"error": "No VAT field found in table. Create a number field called 'VAT Amount' or 'IVA'"})
-
-        # Get all Airtable transactions
-        airtable_txs = airtable.get_all(table_name)
-
-        updated = 0
-        skipped = 0
-        no_vat = 0
-
-        for atx in airtable_txs:
-            record_id = atx.get("id")
-            qonto_id = None
-            for key in ["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "Name"]:
-                if atx.get(key):
-                    qonto_id = atx.get(key)
-                    break
+    if not table_name:
+        return jsonify({"error": "No transactions table found"})
+    if not vat_field:
+        return jsonify({"error": "No VAT field found in table. Create a number field called 'VAT Amount' or 'IVA'"})
+
+    # Get the Airtable transactions that have no VAT yet (just their Qonto ID and VAT fields)
+    vat_fields = _present_fields(table_fields, list(dict.fromkeys([vat_field, "VAT Amount", "IVA"])))
+    airtable_txs = airtable.get_all(
+        table_name, formula=_blank_formula(vat_fields),
+        fields=_present_fields(table_fields, [*QONTO_ID_KEYS, *vat_fields])
+    )
+
+    skipped = 0
+    no_vat = 0
+
+    backfills = []
+    for atx in airtable_txs:
+        record_id = atx.get("id")
+        qonto_id = None
+        for key in QONTO_ID_KEYS:
+            if atx.get(key):
+                qonto_id = atx.get(key)
+                break
 
-            if not qonto_id:
-                skipped += 1
-                continue
+        if not qonto_id:
+            skipped += 1
+            continue
 
-            # Check if already has VAT
-            current_vat = atx.get(vat_field) or atx.get("VAT Amount") or atx.get("IVA") or 0
-            if current_vat:
-                skipped += 1
-                continue
+        # Check if already has VAT
+        current_vat = atx.get(vat_field) or atx.get("VAT Amount") or atx.get("IVA") or 0
+        if current_vat:
+            skipped += 1
+            continue
 
-            # Find VAT from Qonto
-            new_vat = qonto_vat_map.get(qonto_id, 0)
-            if not new_vat:
-                no_vat += 1
-                continue
+        # Find VAT from Qonto
+        new_vat = qonto_vat_map.get(qonto_id, 0)
+        if not new_vat:
+            no_vat += 1
+            continue
 
-            # Update record
-            try:
-                airtable.update(table_name, record_id, {vat_field: new_vat})
-                updated += 1
-            except Exception:
-                pass
+        backfills.append({"id": record_id, "fields": {vat_field: new_vat}})
 
-        return jsonify({
-            "qonto_transactions": len(qonto_txs),
-            "transactions_with_vat": len(qonto_vat_map),
-            "airtable_transactions": len(airtable_txs),
-            "updated": updated,
-            "skipped": skipped,
-            "no_vat_in_qonto": no_vat
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    updated = len(_update_records(airtable, table_name, backfills))
+
+    return jsonify({
+        "qonto_transactions": len(qonto_txs),
+        "transactions_with_vat": len(qonto_vat_map),
+        "airtable_transactions": len(airtable_txs),
+        "updated": updated,
+        "skipped": skipped,
+        "no_vat_in_qonto": no_vat
+    })
 
 @app.route("/api/qonto/update-transaction-labels", methods=["POST"])
 def api_qonto_update_transaction_labels():
     """Update existing transactions with their Qonto label IDs."""
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
+    qonto = Qonto()
+    airtable = Airtable()
+
+    # Get bank account slug
+    slug = qonto.get_bank_account_id()
+    if not slug:
+        return jsonify({"error": "Could not get bank account slug"})
+
+    # Get all transactions from Qonto
+    qonto_txs = qonto.get_all_transactions(slug)
+    if not qonto_txs:
+        return jsonify({"error": "No transactions from Qonto"})
+
+    # Build a map of Qonto transaction_id -> label_ids
+    qonto_labels_map = {
+        tx["transaction_id"]: ",".join(tx["label_ids"])
+        for tx in qonto_txs if tx.get("transaction_id") and tx.get("label_ids")
+    }
 
-        # Get bank account slug
-        slug = qonto.get_bank_account_id()
-        if not slug:
-            return jsonify({"error": "Could not get bank account slug"})
-
-        # Get all transactions from Qonto
-        qonto_txs = qonto.get_all_transactions(slug)
-        if not qonto_txs:
-            return jsonify({"error": "No transactions from Qonto"})
-
-        # Build a map of Qonto transaction_id -> label_ids
-        qonto_labels_map = {}
-        for tx in qonto_txs:
-            tx_id = tx.get("transaction_id", "")
-            label_ids = tx.get("label_ids", [])
-            if tx_id and label_ids:
-                qonto_labels_map[tx_id] = ",".join(label_ids)
-
-        # Discover table name
-        table_name = None
-        with httpx.Client(timeout=30) as client:
-            r = client.get(
-                f"https://api.airtable.com/v0/meta/bases/{airtable.base_id}/tables",
-                headers=airtable.headers
-            )
-            if r.status_code == 200:
-                tables = r.json().get("tables", [])
-                for t in tables:
-                    name_lower = t.get("name", "").lower()
-                    if ("trans" in name_lower or "movimiento" in name_lower) and "alloc" not in name_lower:
-                        table_name = t.get("name")
-                        break
-                if not table_name and tables:
-                    table_name = tables[0].get("name")
-
-        if not table_name:
-            return jsonify({"error": "No transactions table found"})
-
-        # Get all Airtable transactions
-        airtable_txs = airtable.get_all(table_name)
-
-        updated = 0
-        skipped = 0
-        no_labels = 0
-
-        for atx in airtable_txs:
-            record_id = atx.get("id")
-            # Find the Qonto transaction ID field
-            qonto_id = None
-            for key in ["Qonto Transaction ID", "qonto_id", "transaction_id", "ID", "Name"]:
-                if atx.get(key):
-                    qonto_id = atx.get(key)
-                    break
+    # Discover table name
+    tables = airtable.get_tables()
+    table_info = _find_transactions_table(tables) or (tables[0] if tables else None)
+
+    table_name = table_info.get("name") if table_info else None
+    if not table_name:
+        return jsonify({"error": "No transactions table found"})
+
+    # Get the Airtable transactions that have no labels yet (just their Qonto ID and label fields)
+    table_fields = {f.get("name") for f in table_info.get("fields", [])}
+    label_fields = _present_fields(table_fields, ["Label IDs", "label_ids"])
+    airtable_txs = airtable.get_all(
+        table_name, formula=_blank_formula(label_fields),
+        fields=_present_fields(table_fields, [*QONTO_ID_KEYS, *label_fields])
+    )
+
+    skipped = 0
+    no_labels = 0
+
+    backfills = []
+    for atx in airtable_txs:
+        record_id = atx.get("id")
+        # Find the Qonto transaction ID field
+        qonto_id = None
+        for key in QONTO_ID_KEYS:
+            if atx.get(key):
+                qonto_id = atx.get(key)
+                break
 
-            if not qonto_id:
-                skipped += 1
-                continue
+        if not qonto_id:
+            skipped += 1
+            continue
 
-            # Check if already has labels
-            current_labels = atx.get("Label IDs") or atx.get("label_ids") or ""
-            if current_labels:
-                skipped += 1
-                continue
+        # Check if already has labels
+        current_labels = atx.get("Label IDs") or atx.get("label_ids") or ""
+        if current_labels:
+            skipped += 1
+            continue
 
-            # Find label_ids from Qonto
-            new_labels = qonto_labels_map.get(qonto_id, "")
-            if not new_labels:
-                no_labels += 1
-                continue
+        # Find label_ids from Qonto
+        new_labels = qonto_labels_map.get(qonto_id, "")
+        if not new_labels:
+            no_labels += 1
+            continue
 
-            # Update the record
-            try:
-                airtable.update(table_name, record_id, {"Label IDs": new_labels})
-                updated += 1
-            except Exception as e:
-                pass
+        backfills.append({"id": record_id, "fields": {"Label IDs": new_labels}})
 
-        return jsonify({
-            "qonto_transactions": len(qonto_txs),
-            "transactions_with_labels": len(qonto_labels_map),
-            "airtable_transactions": len(airtable_txs),
-            "updated": updated,
-            "skipped": skipped,
-            "no_labels_in_qonto": no_labels
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    updated = len(_update_records(airtable, table_name, backfills))
+
+    return jsonify({
+        "qonto_transactions": len(qonto_txs),
+        "transactions_with_labels": len(qonto_labels_map),
+        "airtable_transactions": len(airtable_txs),
+        "updated": updated,
+        "skipped": skipped,
+        "no_labels_in_qonto": no_labels
+    })
 
 @app.route("/api/debug/labels")
 def api_debug_labels():
     """Debug endpoint to see label data from Qonto and Airtable."""
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
-
-        # Get Qonto transactions with labels
-        slug = qonto.get_bank_account_id()
-        qonto_txs = qonto.get_all_transactions(slug) if slug else []
-
-        # Find transactions that have labels
-        qonto_with_labels = []
-        for tx in qonto_txs[:50]:  # Check first 50
-            label_ids = tx.get("label_ids", [])
-            if label_ids:
-                qonto_with_labels.append({
-                    "transaction_id": tx.get("transaction_id"),
-                    "label": tx.get("label"),
-                    "label_ids": label_ids,
-                    "amount": tx.get("amount")
-                })
-
-        # Get Airtable transactions
-        airtable_txs = airtable.get_all("Transactions")
-        airtable_sample = []
-        for atx in airtable_txs[:10]:
-            airtable_sample.append({
-                "id": atx.get("id"),
-                "Qonto Transaction ID": atx.get("Qonto Transaction ID"),
-                "Name": atx.get("Name"),
-                "Label IDs": atx.get("Label IDs"),
-                "Description": atx.get("Description")
+    qonto = Qonto()
+    airtable = Airtable()
+
+    # Get Qonto transactions with labels
+    slug = qonto.get_bank_account_id()
+    qonto_txs = qonto.get_all_transactions(slug) if slug else []
+
+    # Find transactions that have labels
+    qonto_with_labels = []
+    for tx in qonto_txs[:50]:  # Check first 50
+        label_ids = tx.get("label_ids", [])
+        if label_ids:
+            qonto_with_labels.append({
+                "transaction_id": tx.get("transaction_id"),
+                "label": tx.get("label"),
+                "label_ids": label_ids,
+                "amount": tx.get("amount")
             })
 
-        return jsonify({
-            "qonto_total": len(qonto_txs),
-            "qonto_with_labels": qonto_with_labels,
-            "qonto_with_labels_count": len(qonto_with_labels),
-            "airtable_sample": airtable_sample
+    # Get Airtable transactions
+    airtable_txs = airtable.get_all("Transactions")
+    airtable_sample = []
+    for atx in airtable_txs[:10]:
+        airtable_sample.append({
+            "id": atx.get("id"),
+            "Qonto Transaction ID": atx.get("Qonto Transaction ID"),
+            "Name": atx.get("Name"),
+            "Label IDs": atx.get("Label IDs"),
+            "Description": atx.get("Description")
         })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+
+    return jsonify({
+        "qonto_total": len(qonto_txs),
+        "qonto_with_labels": qonto_with_labels,
+        "qonto_with_labels_count": len(qonto_with_labels),
+        "airtable_sample": airtable_sample
+    })
 
 @app.route("/api/debug/transaction-sample")
 def api_debug_transaction_sample():
     """Show raw Qonto transaction data to see all available fields."""
-    try:
-        qonto = Qonto()
-        slug = qonto.get_bank_account_id()
-        if not slug:
-            return jsonify({"error": "No bank account"})
-
-        with httpx.Client(timeout=30) as client:
-            params = {"slug": slug, "status": "completed", "per_page": 5}
-            r = client.get(f"{qonto.base_url}/transactions", headers=qonto.headers, params=params)
-            if r.status_code == 200:
-                data = r.json()
-                return jsonify({
-                    "sample_transactions": data.get("transactions", []),
-                    "meta": data.get("meta", {})
-                })
-            else:
-                return jsonify({"error": f"Qonto API error: {r.status_code}", "body": r.text})
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    qonto = Qonto()
+    slug = qonto.get_bank_account_id()
+    if not slug:
+        return jsonify({"error": "No bank account"})
+
+    params = {"slug": slug, "status": "completed", "per_page": 5}
+    r = _http_client.get(f"{qonto.base_url}/transactions", headers=qonto.headers, params=params)
+    if r.status_code == 200:
+        data = _parse(r)
+        return jsonify({
+            "sample_transactions": data.get("transactions", []),
+            "meta": data.get("meta", {})
+        })
+    else:
+        return jsonify({"error": f"Qonto API error: {r.status_code}", "body": r.text})
 
 @app.route("/api/qonto/memberships")
 def api_qonto_memberships():
     """Get all memberships from Qonto."""
-    try:
-        qonto = Qonto()
-        memberships = qonto.get_memberships()
-        return jsonify({
-            "memberships": [
-                {
-                    "id": m.get("id"),
-                    "first_name": m.get("first_name"),
-                    "last_name": m.get("last_name"),
-                    "email": m.get("email"),
-                    "role": m.get("role")
-                }
-                for m in memberships
-            ],
-            "count": len(memberships)
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    qonto = Qonto()
+    memberships = qonto.get_memberships()
+    return jsonify({
+        "memberships": [
+            {
+                "id": m.get("id"),
+                "first_name": m.get("first_name"),
+                "last_name": m.get("last_name"),
+                "email": m.get("email"),
+                "role": m.get("role")
+            }
+            for m in memberships
+        ],
+        "count": len(memberships)
+    })
 
 @app.route("/api/qonto/sync-members", methods=["POST"])
 def api_qonto_sync_members():
     """Sync Qonto memberships to Team Members table."""
-    try:
-        qonto = Qonto()
-        airtable = Airtable()
+    qonto = Qonto()
+    airtable = Airtable()
 
-        # Get memberships from Qonto
-        memberships = qonto.get_memberships()
-        if not memberships:
-            return jsonify({"error": "No memberships found in Qonto or API error"})
+    # Get memberships from Qonto
+    memberships = qonto.get_memberships()
+    if not memberships:
+        return jsonify({"error": "No memberships found in Qonto or API error"})
 
-        # Get existing team members
-        existing = []
-        try:
-            existing = airtable.get_all("Team Members")
-        except:
-            pass
+    # Get existing team members
+    existing = []
+    try:
+        existing = airtable.get_all("Team Members")
+    except:
+        pass
 
-        existing_names = {m.get("Name", "").lower() for m in existing}
+    existing_names = {m.get("Name", "").lower() for m in existing}
 
-        # Create new team members from Qonto memberships
-        created = 0
-        skipped = 0
-        for m in memberships:
-            first = m.get("first_name", "")
-            last = m.get("last_name", "")
-            name = f"{first} {last}".strip()
+    # Create new team members from Qonto memberships
+    created = 0
+    skipped = 0
+    for m in memberships:
+        first = m.get("first_name", "")
+        last = m.get("last_name", "")
+        name = f"{first} {last}".strip()
 
-            if not name:
-                continue
+        if not name:
+            continue
 
-            if name.lower() in existing_names:
-                skipped += 1
-                continue
+        if name.lower() in existing_names:
+            skipped += 1
+            continue
 
-            try:
-                airtable.create("Team Members", {
-                    "Name": name,
-                    "Role": m.get("role", ""),
-                    "Salary": 0  # Default, user must set
-                })
-                created += 1
-                existing_names.add(name.lower())
-            except Exception as e:
-                pass
+        try:
+            airtable.create("Team Members", {
+                "Name": name,
+                "Role": m.get("role", ""),
+                "Salary": 0  # Default, user must set
+            })
+            created += 1
+            existing_names.add(name.lower())
+        except Exception as e:
+            pass
+    _invalidate_reference_table(airtable, "Team Members")
 
-        return jsonify({
-            "qonto_memberships": len(memberships),
-            "created": created,
-            "skipped": skipped
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({
+        "qonto_memberships": len(memberships),
+        "created": created,
+        "skipped": skipped
+    })
 
 @app.route("/api/qonto/attachment/<attachment_id>")
 def api_qonto_attachment(attachment_id):
     """Get attachment details from Qonto."""
-    try:
-        qonto = Qonto()
-        attachment = qonto.get_attachment(attachment_id)
-        if attachment:
-            return jsonify({
-                "id": attachment.get("id"),
-                "filename": attachment.get("file_name"),
-                "file_size": attachment.get("file_size"),
-                "file_type": attachment.get("file_content_type"),
-                "url": attachment.get("url"),
-                "created_at": attachment.get("created_at")
-            })
-        return jsonify({"error": "Attachment not found"}), 404
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    qonto = Qonto()
+    attachment = qonto.get_attachment(attachment_id)
+    if attachment:
+        return jsonify({
+            "id": attachment.get("id"),
+            "filename": attachment.get("file_name"),
+            "file_size": attachment.get("file_size"),
+            "file_type": attachment.get("file_content_type"),
+            "url": attachment.get("url"),
+            "created_at": attachment.get("created_at")
+        })
+    return jsonify({"error": "Attachment not found"}), 404
 
 @app.route("/api/qonto/organization")
 def api_qonto_organization():
     """Get organization details from Qonto."""
-    try:
-        qonto = Qonto()
-        org = qonto.get_organization()
-        if org:
-            bank_accounts = []
-            for ba in org.get("bank_accounts", []):
-                bank_accounts.append({
-                    "slug": ba.get("slug"),
-                    "iban": ba.get("iban"),
-                    "bic": ba.get("bic"),
-                    "name": ba.get("name"),
-                    "balance": ba.get("balance"),
-                    "balance_cents": ba.get("balance_cents"),
-                    "currency": ba.get("currency")
-                })
-            return jsonify({
-                "slug": org.get("slug"),
-                "legal_name": org.get("legal_name"),
-                "bank_accounts": bank_accounts
+    qonto = Qonto()
+    org = qonto.get_organization()
+    if org:
+        bank_accounts = []
+        for ba in org.get("bank_accounts", []):
+            bank_accounts.append({
+                "slug": ba.get("slug"),
+                "iban": ba.get("iban"),
+                "bic": ba.get("bic"),
+                "name": ba.get("name"),
+                "balance": ba.get("balance"),
+                "balance_cents": ba.get("balance_cents"),
+                "currency": ba.get("currency")
             })
-        return jsonify({"error": "Organization not found"}), 404
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        return jsonify({
+            "slug": org.get("slug"),
+            "legal_name": org.get("legal_name"),
+            "bank_accounts": bank_accounts
+        })
+    return jsonify({"error": "Organization not found"}), 404
 
 @app.route("/api/qonto/transaction-details/<tx_id>")
 def api_qonto_transaction_details(tx_id):
     """Get extended transaction details from Airtable including Qonto metadata."""
-    try:
-        airtable = Airtable()
-        qonto = Qonto()
-
-        # Get transaction from Airtable
-        records = airtable.get_all("Transactions", formula=f"{{Qonto Transaction ID}}='{tx_id}'")
-        if not records:
-            return jsonify({"error": "Transaction not found"}), 404
-
-        tx = records[0]
-
-        # Get attachment info if available
-        attachments = []
-        attachment_ids = tx.get("Attachment IDs", "") or ""
-        if attachment_ids:
-            for att_id in attachment_ids.split(","):
-                att_id = att_id.strip()
-                if att_id:
-                    att_info = qonto.get_attachment(att_id)
-                    if att_info:
-                        attachments.append({
-                            "id": att_id,
-                            "filename": att_info.get("file_name"),
-                            "url": att_info.get("url"),
-                            "type": att_info.get("file_content_type")
-                        })
+    airtable = Airtable()
+    qonto = Qonto()
+
+    # Get transaction from Airtable
+    records = airtable.get_all("Transactions", formula=f"{{Qonto Transaction ID}}='{tx_id}'")
+    if not records:
+        return jsonify({"error": "Transaction not found"}), 404
+
+    tx = records[0]
+
+    # Get attachment info if available
+    attachments = []
+    attachment_ids = tx.get("Attachment IDs", "") or ""
+    if attachment_ids:
+        for att_id in attachment_ids.split(","):
+            att_id = att_id.strip()
+            if att_id:
+                att_info = qonto.get_attachment(att_id)
+                if att_info:
+                    attachments.append({
+                        "id": att_id,
+                        "filename": att_info.get("file_name"),
+                        "url": att_info.get("url"),
+                        "type": att_info.get("file_content_type")
+                    })
 
-        return jsonify({
-            "id": tx.get("id"),
-            "qonto_id": tx.get("Qonto Transaction ID"),
-            "amount": tx.get("Amount"),
-            "type": tx.get("Type"),
-            "date": tx.get("Date"),
-            "description": tx.get("Description"),
-            "counterparty": tx.get("Counterparty"),
-            "reference": tx.get("Reference"),
-            "note": tx.get("Note"),
-            "vat_amount": tx.get("VAT Amount"),
-            "vat_rate": tx.get("VAT Rate"),
-            "label_ids": tx.get("Label IDs"),
-            "category": tx.get("Category"),
-            "project": tx.get("Project"),
-            "client": tx.get("Client"),
-            "attachments": attachments,
-            "attachment_required": tx.get("Attachment Required"),
-            "attachment_lost": tx.get("Attachment Lost")
-        })
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+    return jsonify({
+        "id": tx.get("id"),
+        "qonto_id": tx.get("Qonto Transaction ID"),
+        "amount": tx.get("Amount"),
+        "type": tx.get("Type"),
+        "date": tx.get("Date"),
+        "description": tx.get("Description"),
+        "counterparty": tx.get("Counterparty"),
+        "reference": tx.get("Reference"),
+        "note": tx.get("Note"),
+        "vat_amount": tx.get("VAT Amount"),
+        "vat_rate": tx.get("VAT Rate"),
+        "label_ids": tx.get("Label IDs"),
+        "category": tx.get("Category"),
+        "project": tx.get("Project"),
+        "client": tx.get("Client"),
+        "attachments": attachments,
+        "attachment_required": tx.get("Attachment Required"),
+        "attachment_lost": tx.get("Attachment Lost")
+    })
 
 
 # ==================== AI Brain - Financial Simulations ====================
@@ -3698,7 +3916,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
             # OpenAI-compatible API (OpenAI, Groq, xAI)
             # Groq is ultra-fast (1-3s), others need more time but must fit within Vercel's 60s limit
             timeout_seconds = 15.0 if provider == "groq" else 50.0
-            response = httpx.post(
+            response = _http_client.post(
                 f"{config['base_url']}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {api_key}",
@@ -3716,7 +3934,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                 timeout=timeout_seconds
             )
             response.raise_for_status()
-            data = response.json()
+            data = _parse(response)
             return data["choices"][0]["message"]["content"]
 
         elif provider == "openai_reasoning":
@@ -3733,7 +3951,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                 else:
                     combined_messages.append(m)
 
-            response = httpx.post(
+            response = _http_client.post(
                 f"{config['base_url']}/chat/completions",
                 headers={
                     "Authorization": f"Bearer {api_key}",
@@ -3747,12 +3965,12 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                 timeout=55.0  # Reasoning models take longer but must fit within Vercel's 60s limit
             )
             response.raise_for_status()
-            data = response.json()
+            data = _parse(response)
             return data["choices"][0]["message"]["content"]
 
         elif provider == "anthropic":
             # Anthropic Claude API
-            response = httpx.post(
+            response = _http_client.post(
                 f"{config['base_url']}/messages",
                 headers={
                     "x-api-key": api_key,
@@ -3768,7 +3986,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                 timeout=50.0  # Must fit within Vercel's 60s limit
             )
             response.raise_for_status()
-            data = response.json()
+            data = _parse(response)
             return data["content"][0]["text"]
 
         elif provider == "gemini":
@@ -3787,7 +4005,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                     "parts": [{"text": content}]
                 })
 
-            response = httpx.post(
+            response = _http_client.post(
                 f"{config['base_url']}/models/{config['model']}:generateContent?key={api_key}",
                 headers={"Content-Type": "application/json"},
                 json={
@@ -3800,7 +4018,7 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
                 timeout=50.0  # Must fit within Vercel's 60s limit
             )
             response.raise_for_status()
-            data = response.json()
+            data = _parse(response)
             return data["candidates"][0]["content"]["parts"][0]["text"]
 
         else:
@@ -3819,89 +4037,86 @@ def call_ai_api(model_id: str, messages: list, context: str) -> str:
 @require_auth
 def api_ai_chat():
     """Send a message to the AI and get a response."""
-    try:
-        data = request.json
-        model_id = data.get("model", "groq-llama3-70b")
-        messages = data.get("messages", [])
-        context = data.get("context", "")
+    data = request.json
+    model_id = data.get("model", "groq-llama3-70b")
+    messages = data.get("messages", [])
+    context = data.get("context", "")
 
-        if not messages:
-            return jsonify({"error": "No messages provided"}), 400
+    if not messages:
+        return jsonify({"error": "No messages provided"}), 400
 
-        response = call_ai_api(model_id, messages, context)
-        return jsonify({"response": response})
+    response = call_ai_api(model_id, messages, context)
+    return jsonify({"response": response})
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/api/ai/scenario", methods=["POST"])
 @require_auth
 def api_ai_scenario():
     """Run a predefined AI scenario."""
-    try:
-        data = request.json
-        model_id = data.get("model", "groq-llama3-70b")
-        scenario = data.get("scenario", "")
-        context = data.get("context", "")
-
-        # Predefined scenario prompts
-        scenarios = {
-            "projection": "Analiza los datos financieros y genera una proyeccion para los proximos 3 meses. Incluye ingresos esperados, gastos proyectados y margen estimado. Presenta escenarios optimista, base y pesimista.",
-            "anomalies": "Revisa los datos y detecta cualquier anomalia o gasto inusual. Identifica transacciones que se desvian significativamente del patron normal. Lista los hallazgos por orden de importancia.",
-            "trends": "Analiza las tendencias en ingresos y gastos. Identifica patrones estacionales, crecimiento/decrecimiento, y categorias con mayor variacion. Incluye graficos conceptuales si es util.",
-            "optimization": "Basandote en los gastos actuales, sugiere areas de optimizacion. Prioriza por impacto potencial y facilidad de implementacion. Incluye estimacion de ahorro.",
-            "whatif_revenue": "Simula un escenario donde los ingresos aumentan un 20%. Calcula el impacto en el margen, el punto de equilibrio y recomienda como gestionar el crecimiento.",
-            "whatif_cost": "Simula un escenario donde los costos se reducen un 10%. Identifica que gastos podrian reducirse de forma realista y calcula el impacto en rentabilidad."
-        }
+    data = request.json
+    model_id = data.get("model", "groq-llama3-70b")
+    scenario = data.get("scenario", "")
+    context = data.get("context", "")
+
+    # Predefined scenario prompts
+    scenarios = {
+        "projection": "Analiza los datos financieros y genera una proyeccion para los proximos 3 meses. Incluye ingresos esperados, gastos proyectados y margen estimado. Presenta escenarios optimista, base y pesimista.",
+        "anomalies": "Revisa los datos y detecta cualquier anomalia o gasto inusual. Identifica transacciones que se desvian significativamente del patron normal. Lista los hallazgos por orden de importancia.",
+        "trends": "Analiza las tendencias en ingresos y gastos. Identifica patrones estacionales, crecimiento/decrecimiento, y categorias con mayor variacion. Incluye graficos conceptuales si es util.",
+        "optimization": "Basandote en los gastos actuales, sugiere areas de optimizacion. Prioriza por impacto potencial y facilidad de implementacion. Incluye estimacion de ahorro.",
+        "whatif_revenue": "Simula un escenario donde los ingresos aumentan un 20%. Calcula el impacto en el margen, el punto de equilibrio y recomienda como gestionar el crecimiento.",
+        "whatif_cost": "Simula un escenario donde los costos se reducen un 10%. Identifica que gastos podrian reducirse de forma realista y calcula el impacto en rentabilidad."
+    }
 
-        prompt = scenarios.get(scenario, scenario)
-        if not prompt:
-            return jsonify({"error": "Scenario not found"}), 400
+    prompt = scenarios.get(scenario, scenario)
+    if not prompt:
+        return jsonify({"error": "Scenario not found"}), 400
 
-        messages = [{"role": "user", "content": prompt}]
-        response = call_ai_api(model_id, messages, context)
+    messages = [{"role": "user", "content": prompt}]
+    response = call_ai_api(model_id, messages, context)
 
-        return jsonify({
-            "scenario": scenario,
-            "response": response
-        })
+    return jsonify({
+        "scenario": scenario,
+        "response": response
+    })
 
-    except Exception as e:
-        import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
 @app.route("/api/ai/settings", methods=["GET"])
 @require_auth
 def api_ai_settings_get():
     """Get AI settings (selected model)."""
-    try:
-        settings = load_local_settings()
-        return jsonify({
-            "model": settings.get("ai_model", "groq-llama3-70b"),
-            "available_models": list(AI_MODEL_CONFIGS.keys())
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    settings = load_local_settings()
+    return jsonify({
+        "model": settings.get("ai_model", "groq-llama3-70b"),
+        "available_models": list(AI_MODEL_CONFIGS.keys())
+    })
 
 
 @app.route("/api/ai/settings", methods=["POST"])
 @require_auth
 def api_ai_settings_save():
     """Save AI settings (selected model)."""
-    try:
-        data = request.json
-        model = data.get("model", "groq-llama3-70b")
+    data = request.json
+    model = data.get("model", "groq-llama3-70b")
 
-        if model not in AI_MODEL_CONFIGS:
-            return jsonify({"error": "Modelo no valido"}), 400
+    if model not in AI_MODEL_CONFIGS:
+        return jsonify({"error": "Modelo no valido"}), 400
 
-        settings = load_local_settings()
-        settings["ai_model"] = model
-        save_local_settings(settings)
+    settings = load_local_settings()
+    settings["ai_model"] = model
+    save_local_settings(settings)
 
-        return jsonify({"ok": True, "model": model})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"ok": True, "model": model})
+
+
+# ASGI entry point for running the dashboard outside Vercel:
+#   uvicorn api.index:asgi_app --workers 4 --loop uvloop --http httptools
+# WsgiToAsgi runs each request on a worker thread, so slow Airtable/Qonto calls
+# no longer block other connections, and uvicorn keeps client connections alive.
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    asgi_app = WsgiToAsgi(app)
+except ImportError:  # asgiref not installed; the WSGI `app` still works
+    asgi_app = None
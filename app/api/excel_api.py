@@ -4,15 +4,20 @@ Simplified API endpoints using any storage backend (Excel/Sheets/Airtable).
 Works with multiple storage backends through the unified storage interface.
 """
 
+import json
 from datetime import date
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Any, Dict, Iterator
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import pandas as pd
 
-from app.services.excel_sync_service import SyncService
+from app.services.excel_sync_service import SyncService, get_sync_service
 from app.services.excel_financial_service import ExcelFinancialService
+from app.services.cache_service import singleflight
 from app.storage.excel_storage import get_storage
 
 router = APIRouter()
@@ -29,6 +34,16 @@ def _to_list(data: Union[pd.DataFrame, List, None]) -> List:
     return []
 
 
+def _iter_rows(df: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+    """Yield DataFrame rows as dicts, mapping NaN/NaT cells to None."""
+    columns = list(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield {
+            col: None if pd.api.types.is_scalar(value) and pd.isna(value) else value
+            for col, value in zip(columns, values)
+        }
+
+
 # ==================== Schemas ====================
 
 class ProjectCreate(BaseModel):
@@ -49,68 +64,69 @@ class TransactionUpdate(BaseModel):
 
 # ==================== Sync Endpoints ====================
 
-@router.post("/sync/init")
-async def initialize_system():
-    """Initialize the system with default categories."""
-    service = SyncService()
+async def _sync_init(service: SyncService, from_date, to_date) -> dict:
     result = await service.initialize_categories()
-
     return {
-        "status": "success",
         "message": "System initialized",
         "categories_created": result["created"],
         "categories_existing": result["existing"],
     }
 
 
-@router.post("/sync/accounts")
-async def sync_accounts():
-    """Sync bank accounts from Qonto."""
-    try:
-        service = SyncService()
-        accounts = await service.sync_accounts()
+async def _sync_accounts(service: SyncService, from_date, to_date) -> dict:
+    accounts = await service.sync_accounts()
+    return {"synced_count": len(accounts), "accounts": accounts}
 
-        return {
-            "status": "success",
-            "synced_count": len(accounts),
-            "accounts": accounts,
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+async def _sync_transactions(service: SyncService, from_date, to_date) -> dict:
+    return await service.sync_transactions(from_date, to_date)
+
+
+async def _sync_all(service: SyncService, from_date, to_date) -> dict:
+    return await service.sync_all()
+
+
+async def _sync_parallel(service: SyncService, from_date, to_date) -> dict:
+    result = await service.sync_parallel(from_date, to_date)
+    return {"status": "partial" if result["errors"] else "success", **result}
+
+
+_SYNC_OPS = {
+    "init": _sync_init,
+    "accounts": _sync_accounts,
+    "transactions": _sync_transactions,
+    "all": _sync_all,
+    "parallel": _sync_parallel,
+}
 
 
-@router.post("/sync/transactions")
-async def sync_transactions(
+@router.post("/sync/{op}")
+async def run_sync(
+    op: str,
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
 ):
-    """Sync transactions from Qonto."""
-    try:
-        service = SyncService()
-        stats = await service.sync_transactions(from_date, to_date)
+    """
+    Run a sync operation against Qonto.
+
+    - init: create the default categories
+    - accounts: sync bank accounts
+    - transactions: sync transactions (optionally between from_date and to_date)
+    - all: sync accounts and transactions
+    - parallel: init + accounts concurrently, then transactions, in one request;
+      status is "partial" if any step failed, with details under "errors"
+    """
+    handler = _SYNC_OPS.get(op)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sync operation: {op}")
 
-        return {
-            "status": "success",
-            **stats,
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/sync/all")
-async def sync_all():
-    """Sync all data from Qonto (accounts and transactions)."""
     try:
-        service = SyncService()
-        result = await service.sync_all()
-
-        return {
-            "status": "success",
-            **result,
-        }
+        result = await handler(get_sync_service(), from_date, to_date)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {"status": "success", **result}
+
 
 # ==================== Transaction Endpoints ====================
 
@@ -124,7 +140,12 @@ async def list_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
 ):
-    """List transactions with filters."""
+    """List transactions with filters.
+
+    The filtered transactions are loaded before the response starts, so
+    storage errors surface as a 500; only the requested page is converted
+    and serialized, one row at a time.
+    """
     storage = get_storage()
     data = storage.get_transactions(
         start_date=start_date,
@@ -133,21 +154,26 @@ async def list_transactions(
         project_id=project_id,
         side=side,
     )
-    items = _to_list(data)
-    total = len(items)
+    total = len(data) if data is not None else 0
 
     # Pagination
     start_idx = (page - 1) * page_size
     end_idx = start_idx + page_size
-    page_items = items[start_idx:end_idx]
+    if isinstance(data, pd.DataFrame):
+        page_items = _iter_rows(data.iloc[start_idx:end_idx])
+    else:
+        page_items = (data or [])[start_idx:end_idx]
+    pages = (total + page_size - 1) // page_size if total > 0 else 0
 
-    return {
-        "items": page_items,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": (total + page_size - 1) // page_size if total > 0 else 0,
-    }
+    def generate():
+        yield b'{"items":['
+        for i, row in enumerate(page_items):
+            yield (b"," if i else b"") + json.dumps(jsonable_encoder(row), allow_nan=False).encode()
+        yield (
+            f'],"total":{total},"page":{page},"page_size":{page_size},"pages":{pages}}}'
+        ).encode()
+
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.patch("/transactions/{transaction_id}")
@@ -292,10 +318,11 @@ async def get_yearly_pl(
 # ==================== KPI Endpoints ====================
 
 @router.get("/kpis/dashboard")
+@singleflight("kpi:dashboard")
 async def get_dashboard():
-    """Get dashboard KPIs."""
+    """Get dashboard KPIs (concurrent requests share one computation)."""
     service = ExcelFinancialService()
-    return service.get_dashboard_kpis()
+    return await run_in_threadpool(service.get_dashboard_kpis)
 
 
 @router.get("/kpis/projects")
@@ -1,6 +1,7 @@
 """Qonto API client for fetching banking data."""
 
 import asyncio
+import importlib.util
 from datetime import datetime, date
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
@@ -66,10 +67,13 @@ class QontoClient:
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
         if self._client is None or self._client.is_closed:
+            # HTTP/2 when the h2 package (httpx[http2]) is installed, so concurrent
+            # page requests share one connection. httpx already negotiates gzip.
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
                 headers=self.headers,
                 timeout=30.0,
+                http2=importlib.util.find_spec("h2") is not None,
             )
         return self._client
 
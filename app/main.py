@@ -6,12 +6,14 @@ Almacenamiento en Excel/Google Sheets.
 """
 
 import os
+import asyncio
 import logging
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.integrations.qonto_client import get_qonto_client
 from app.api.excel_api import router as excel_router
 from app.api.transactions import router as transactions_router
 from app.api.projects import router as projects_router
@@ -35,6 +37,23 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Use uvloop for every event loop created in this process (uvicorn workers and
+# the Mangum handler alike). It ships with uvicorn[standard]; fall back to the
+# stdlib loop when it is not installed.
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    logger.info("uvloop not installed, using default asyncio event loop")
+
+# Serialize JSON responses with orjson when it is installed; it is several
+# times faster than the stdlib json module FastAPI uses by default.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -64,6 +83,7 @@ API para integración con Qonto y generación de reportes financieros.
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=DefaultResponse,
 )
 
 # Configure CORS
@@ -109,6 +129,12 @@ async def root():
     }
 
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close the shared Qonto HTTP connection pool."""
+    await get_qonto_client().close()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -118,9 +144,20 @@ async def health_check():
     }
 
 
-# Vercel serverless handler
-from mangum import Mangum
-handler = Mangum(app, lifespan="off")
+# Serverless handler. Vercel's Python runtime speaks ASGI natively, so the app
+# is exposed directly there and skips Mangum's Lambda event translation.
+MANGUM_TEXT_MIME_TYPES = [
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/vnd.api+json",
+]
+
+if os.getenv("VERCEL"):
+    handler = app
+else:
+    from mangum import Mangum
+    handler = Mangum(app, lifespan="off", text_mime_types=MANGUM_TEXT_MIME_TYPES)
 
 
 if __name__ == "__main__":
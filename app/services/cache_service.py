@@ -1,10 +1,11 @@
 """Redis caching service for KPIs and expensive queries."""
 
+import asyncio
 import json
 import logging
 import os
 from datetime import timedelta
-from typing import Any, Optional, Callable, TypeVar
+from typing import Any, Dict, Optional, Callable, TypeVar
 from functools import wraps
 import hashlib
 
@@ -197,6 +198,52 @@ def cached(prefix: str, ttl_seconds: int = 300):
     return decorator
 
 
+# In-flight calls shared by concurrent identical requests
+_inflight: Dict[str, "asyncio.Future"] = {}
+
+
+def singleflight(prefix: str):
+    """
+    Decorator collapsing concurrent identical async calls into one.
+
+    The first caller for a given prefix + arguments starts the function as its
+    own task; callers arriving while it is still running await the same result
+    instead of recomputing it. Cancelling a caller doesn't cancel the task.
+    Nothing is kept once the call finishes.
+
+    Usage:
+        @singleflight("kpi:dashboard")
+        async def get_dashboard():
+            ...
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = f"{prefix}:{cache_key(*args, **kwargs)}"
+
+            future = _inflight.get(key)
+            if future is not None:
+                logger.debug(f"Joining in-flight call: {key}")
+            else:
+                future = asyncio.ensure_future(func(*args, **kwargs))
+                _inflight[key] = future
+
+                def done(f: "asyncio.Future") -> None:
+                    _inflight.pop(key, None)
+                    # Mark retrieved so a failure nobody awaits anymore isn't logged
+                    if not f.cancelled():
+                        f.exception()
+
+                future.add_done_callback(done)
+
+            # Shielded so a cancelled caller stops waiting without cancelling
+            # the call the other callers share
+            return await asyncio.shield(future)
+
+        return wrapper
+    return decorator
+
+
 class CachedKPIService:
     """Wrapper for FinancialService with caching."""
 
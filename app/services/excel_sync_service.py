@@ -1,5 +1,6 @@
 """Sync service for Qonto data - works with any storage backend."""
 
+import asyncio
 from datetime import datetime, date
 from typing import Optional, Dict, Any, List
 import logging
@@ -243,6 +244,57 @@ class SyncService:
             "transactions": transactions,
         }
 
+    async def sync_parallel(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        Initialize categories, sync accounts and sync transactions in one call.
+
+        Categories and accounts don't depend on each other and run concurrently.
+        Transactions run last since they need both for account lookup and
+        auto-categorization, and are skipped if either failed. Failures are
+        reported per step under "errors" instead of aborting the run.
+        """
+        categories, accounts = await asyncio.gather(
+            self.initialize_categories(),
+            self.sync_accounts(),
+            return_exceptions=True,
+        )
+        errors = {}
+        if isinstance(categories, Exception):
+            errors["categories"] = str(categories)
+            categories = None
+        if isinstance(accounts, Exception):
+            errors["accounts"] = str(accounts)
+            accounts = []
+
+        transactions = None
+        if errors:
+            errors["transactions"] = "Skipped: categories or accounts failed to sync"
+        else:
+            transactions = await self.sync_transactions(from_date, to_date)
+
+        return {
+            "categories": categories,
+            "accounts_synced": len(accounts),
+            "transactions": transactions,
+            "errors": errors,
+        }
+
 
 # Backwards compatibility alias
 ExcelSyncService = SyncService
+
+
+# Singleton instance
+_sync_service: Optional[SyncService] = None
+
+
+def get_sync_service() -> SyncService:
+    """Get or create sync service singleton (shares one storage and Qonto client)."""
+    global _sync_service
+    if _sync_service is None:
+        _sync_service = SyncService()
+    return _sync_service
@@ -8,6 +8,8 @@ Simple setup:
 """
 
 import os
+import atexit
+import importlib.util
 from datetime import datetime, date
 from typing import Optional, List, Dict, Any
 import logging
@@ -16,6 +18,16 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+# Shared by every AirtableStorage instance so keep-alive connections (and their
+# TLS sessions) are reused across requests instead of opening a new connection
+# for each call. HTTP/2 is used when the h2 package is installed.
+_http_client = httpx.Client(
+    timeout=30,
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=40, max_keepalive_connections=20),
+)
+atexit.register(_http_client.close)
+
 
 class AirtableStorage:
     """Storage backend using Airtable."""
@@ -51,16 +63,15 @@ class AirtableStorage:
         if record_id:
             url = f"{url}/{record_id}"
 
-        with httpx.Client(timeout=30) as client:
-            response = client.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                params=params,
-                json=json,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = _http_client.request(
+            method=method,
+            url=url,
+            headers=self.headers,
+            params=params,
+            json=json,
+        )
+        response.raise_for_status()
+        return response.json()
 
     def _get_all_records(self, table: str, filter_formula: Optional[str] = None) -> List[Dict]:
         """Get all records from a table with pagination."""